@@ -0,0 +1,72 @@
+"""Memory used by the AST per source line and time spent in the transformer.
+
+The lark tree is built first, then only ASTTransformer.transform() is timed
+and the memory retained by the resulting GlobalScope is measured with
+tracemalloc.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generate_source import generate_source  # noqa: E402
+from xlang.parser import build_lark_parser  # noqa: E402
+from xlang.transformer import ASTTransformer  # noqa: E402
+
+
+def measure_time(source: str, repeat: int) -> float:
+    tree = build_lark_parser(True).parse(source)
+    transformer = ASTTransformer()
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        ast = transformer.transform(tree)
+        best = min(best, time.perf_counter() - start)
+        del ast
+    return best
+
+
+def measure_memory(source: str) -> int:
+    tree = build_lark_parser(True).parse(source)
+    transformer = ASTTransformer()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ast = transformer.transform(tree)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del ast
+    return retained
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("files", nargs="*")
+    arg_parser.add_argument("--functions", type=int, default=500)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    if args.files:
+        sources = {}
+        for file_name in args.files:
+            with open(file_name) as f:
+                sources[file_name] = f.read()
+    else:
+        sources = {"<generated>": generate_source(args.functions)}
+
+    for name, source in sources.items():
+        lines = source.count("\n") + 1
+        elapsed = measure_time(source, args.repeat)
+        retained = measure_memory(source)
+        print(f"{name}: {lines} lines")
+        print(f"  transformer {elapsed:8.3f}s")
+        print(
+            f"  ast memory  {retained / 1e6:8.2f} MB, {retained / lines:8.1f} bytes/line"
+        )
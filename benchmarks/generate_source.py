@@ -0,0 +1,78 @@
+"""Generates large, valid xlang translation units for the benchmarks.
+
+The generated program has a library of helper functions that use structs,
+enums, loops, conditionals, matches and strings. main() only calls the first
+few helpers, like the generated sources with large helper libraries we run.
+"""
+
+import argparse
+
+HELPER_TEMPLATE = """
+struct Point{i} {{
+    x: i32,
+    y: i32 = 2,
+}}
+
+enum Shape{i} {{
+    Circle {{radius: i32}},
+    Square {{side: i32, label: string = "square"}},
+    Empty,
+}}
+
+// helper {i}: exercises most statements of the language
+func helper_{i}(_ a: i32, b: i32 = 3): i32 {{
+    var total: i32 = a;
+    var point: Point{i} = Point{i}(x: a, y: b);
+    var shape: Shape{i} = Shape{i}.Circle{{radius: a}};
+    var counter: i32 = 0;
+    loop {{
+        if (counter >= 10) {{
+            break;
+        }} elif (counter == 3) {{
+            total = total + point.x * 2;
+        }} else {{
+            total = total - 1;
+        }}
+        counter = counter + 1;
+    }}
+    match (shape) {{
+        Circle {{ radius }} => {{
+            total = total + radius;
+        }}
+        _ => {{
+            total = total % 7;
+        }}
+    }}
+    var text: string = "helper\\t{i}\\n";
+    text.append('c');
+    if (not text.length() == 0) {{
+        total = total + {call};
+    }}
+    return total;
+}}
+"""
+
+
+def generate_source(num_functions: int, num_called: int = 10) -> str:
+    parts = []
+    for i in range(num_functions):
+        # Chains of up to 10 helpers, so only a few are reachable from main.
+        if i % 10 == 0:
+            call = "1"
+        else:
+            call = f"helper_{i - 1}(a, b=2)"
+        parts.append(HELPER_TEMPLATE.format(i=i, call=call))
+
+    main_body = "\n".join(
+        f"    print(helper_{i}({i}));" for i in range(min(num_called, num_functions))
+    )
+    parts.append(f"\nfunc main() {{\n{main_body}\n}}\n")
+    return "".join(parts)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--functions", type=int, default=1000)
+    arg_parser.add_argument("--called", type=int, default=10)
+    args = arg_parser.parse_args()
+    print(generate_source(args.functions, args.called))
@@ -0,0 +1,60 @@
+"""Parse throughput of the lark and the recursive descent frontend in MB/s.
+
+Parses a generated translation unit (or the given .xl files) with both
+frontends and checks that they produce the same GlobalScope.dump().
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generate_source import generate_source  # noqa: E402
+from xlang.parser import FRONTENDS, get_parser  # noqa: E402
+
+
+def measure(frontend: str, source: str, repeat: int):
+    parser = get_parser(frontend)
+    best = float("inf")
+    dump = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        ast = parser.parse(source)
+        best = min(best, time.perf_counter() - start)
+        # Only keep the dump, a live AST slows down the garbage collector
+        # during the next measurement.
+        dump = json.dumps(ast.dump())
+        del ast
+    return best, dump
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("files", nargs="*")
+    arg_parser.add_argument("--functions", type=int, default=500)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    if args.files:
+        sources = {}
+        for file_name in args.files:
+            with open(file_name) as f:
+                sources[file_name] = f.read()
+    else:
+        sources = {"<generated>": generate_source(args.functions)}
+
+    for name, source in sources.items():
+        size_mb = len(source.encode()) / 1e6
+        print(f"{name}: {size_mb:.2f} MB")
+        dumps = {}
+        for frontend in FRONTENDS:
+            elapsed, dumps[frontend] = measure(frontend, source, args.repeat)
+            print(f"  {frontend:5} {elapsed:8.3f}s {size_mb / elapsed:8.2f} MB/s")
+        if len(set(dumps.values())) != 1:
+            print("  ERROR: frontends produced different ASTs")
+            sys.exit(1)
@@ -1,24 +1,66 @@
 import argparse
+import os
 import sys
 import re
 import json
+import time
 
-from xlang.parser import Parser
-from xlang.interpreter import Interpreter
-from xlang.xl_ast import GlobalScope
+from xlang.parser import FRONTENDS, get_parser
+from xlang.rd_parser import load_function_bodies
+from xlang.program_cache import CACHE_DIR_NAME, ProgramCache
+from xlang.incremental import IncrementalValidator
+from xlang.bytecode import compile_function, disassemble
+from xlang.c_backend import CGenerator, NativeEngine
+from xlang.callgraph import CallGraph
+from xlang.interpreter import ENGINES, get_interpreter
+from xlang.transpiler import PythonEngine
+from xlang.xl_ast import Function, GlobalScope, LineTable
 from xlang.validation_pass import validation_pass
 from xlang.exceptions import ContextException, InterpreterAssertionError
 
 
-def run(code: str, parse_only: bool = False):
+def cache_options(args) -> str:
+    # The frontend and options decide which function bodies are validated, a
+    # program validated only from main must not be reused for a full validation.
+    return f"frontend={args.frontend},validate={args.validate},parse_only={args.parse_only}"
+
+
+def compile_program(code: str, args, chunk_index: int) -> GlobalScope:
+    reachable_only = None if args.validate is None else args.validate == "reachable"
+    cache = ProgramCache(args.file) if args.cache else None
+    if cache:
+        cached_ast = cache.load(code, chunk_index, cache_options(args))
+        if cached_ast is not None:
+            return cached_ast
+
+    ast: GlobalScope = get_parser(args.frontend).parse(code)
+    if args.parse_only:
+        # the dump contains all functions, also with the lazy frontend
+        load_function_bodies(ast)
+    validation_pass(ast, reachable_only)
+
+    if cache:
+        cache.store(code, ast, chunk_index, cache_options(args))
+    return ast
+
+
+def run(code: str, args, chunk_index: int = 0):
     try:
-        parser = Parser()
-        ast: GlobalScope = parser.parse(code)
-        validation_pass(ast)
-        if parse_only:
+        ast = compile_program(code, args, chunk_index)
+        if args.parse_only:
             print(json.dumps(ast.dump(), indent=2))
+        elif args.dump_bytecode:
+            dump_bytecode(code, ast)
+        elif args.emit_c:
+            print(CGenerator(ast).program(), end="")
         else:
-            interpreter = Interpreter()
+            interpreter = get_interpreter(
+                args.engine, args.max_call_depth, args.columnar_structs
+            )
+            if args.cache and isinstance(interpreter, (PythonEngine, NativeEngine)):
+                interpreter.use_cache(
+                    ProgramCache(args.file), code, chunk_index, cache_options(args)
+                )
             interpreter.run(ast)
     # assert() is used in tests, so we crash here to detect failed assertions.
     # Other exceptions are fine, we check for those with // CHECK statements.
@@ -31,13 +73,127 @@ def run(code: str, parse_only: bool = False):
     return True
 
 
+def dump_bytecode(code: str, ast: GlobalScope):
+    line_table = LineTable(code)
+    for function_name in CallGraph(ast).reachable():
+        function = ast.functions[function_name]
+        assert isinstance(function, Function)
+        print(disassemble(compile_function(ast, function), line_table))
+        print()
+
+
+def watch(args):
+    """Validates the file again whenever it is saved, until interrupted.
+
+    Only the functions that changed, or whose dependencies changed, since the
+    last successful validation are validated again.
+    """
+    validators = {}
+    modified = None
+    while True:
+        try:
+            mtime = os.stat(args.file).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime is not None and mtime != modified:
+            modified = mtime
+            with open(args.file, "r") as f:
+                code = f.read()
+            if args.split_input_file:
+                code_chunks = re.split("^//-{3,}$", code, flags=re.MULTILINE)
+            else:
+                code_chunks = [code]
+            for chunk_index, chunk in enumerate(code_chunks):
+                validator = validators.setdefault(chunk_index, IncrementalValidator())
+                start = time.perf_counter()
+                try:
+                    ast = validator.validate(chunk)
+                except ContextException as ex:
+                    ex.print(chunk, args.file)
+                    continue
+                print(
+                    f"{args.file}: ok, validated {len(validator.revalidated)} of "
+                    f"{len(ast.functions)} functions in "
+                    f"{time.perf_counter() - start:.2f}s",
+                    flush=True,
+                )
+        time.sleep(0.5)
+
+
 if __name__ == "__main__":
     arg_parser = argparse.ArgumentParser(description="xlang interpreter")
     arg_parser.add_argument("file")
     arg_parser.add_argument("--split-input-file", action="store_true")
     arg_parser.add_argument("--parse-only", action="store_true")
+    arg_parser.add_argument(
+        "--frontend",
+        choices=FRONTENDS,
+        default="lark",
+        help="lazy only parses and validates functions reachable from main",
+    )
+    arg_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="tree",
+        help="closure compiles the functions into Python closures, vm into "
+        "bytecode for a stack machine and python into Python source, before "
+        "running them, native builds the program with the C compiler and supports "
+        "no enum variant fields and no printing of structs or arrays",
+    )
+    arg_parser.add_argument(
+        "--max-call-depth",
+        type=int,
+        help="maximum depth of xlang calls, only with --engine vm, only limited by "
+        "memory by default",
+    )
+    arg_parser.add_argument(
+        "--columnar-structs",
+        action="store_true",
+        help="store arrays of structs with only number members as one array per "
+        "member, only with --engine tree",
+    )
+    arg_parser.add_argument(
+        "--dump-bytecode",
+        action="store_true",
+        help="print the bytecode of the functions reachable from main "
+        "instead of running the program",
+    )
+    arg_parser.add_argument(
+        "--emit-c",
+        action="store_true",
+        help="print the C source of the native engine instead of running the program",
+    )
+    arg_parser.add_argument(
+        "--validate",
+        choices=("all", "reachable"),
+        help="validate all functions or only those reachable from main, "
+        "defaults to all, except for the lazy frontend",
+    )
+    arg_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"cache validated programs in {CACHE_DIR_NAME} next to the file, "
+        "and the generated Python code or binary with --engine python or native",
+    )
+
+    arg_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="validate the file again on every change, without running it",
+    )
 
     args = arg_parser.parse_args()
+    if args.max_call_depth is not None and args.engine != "vm":
+        arg_parser.error("--max-call-depth is only supported with --engine vm")
+    if args.columnar_structs and args.engine != "tree":
+        arg_parser.error("--columnar-structs is only supported with --engine tree")
+
+    if args.watch:
+        try:
+            watch(args)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
 
     try:
         with open(args.file, "r") as f:
@@ -48,8 +204,8 @@ if __name__ == "__main__":
 
     if args.split_input_file:
         code_chunks = re.split("^//-{3,}$", code, flags=re.MULTILINE)
-        for chunk in code_chunks:
-            run(chunk, args.parse_only)
+        for chunk_index, chunk in enumerate(code_chunks):
+            run(chunk, args, chunk_index)
     else:
-        if not run(code, args.parse_only):
+        if not run(code, args):
             sys.exit(1)
@@ -16,7 +16,10 @@ config.suffixes = [".xl"]
 lit_cfg_dir = os.path.dirname(__file__)
 main_py_path = os.path.abspath(os.path.join(lit_cfg_dir, "../../main.py"))
 
-config.substitutions.append(("%run", f"python {main_py_path}"))
+# lit -Dengine=closure runs the tests with another execution engine
+engine = lit_config.params.get("engine")
+engine_arg = f" --engine={engine}" if engine else ""
+config.substitutions.append(("%run", f"python {main_py_path}{engine_arg}"))
 
 filecheck_bin = shutil.which("filecheck")
 config.substitutions.append(("%filecheck", f"{filecheck_bin}"))
@@ -1,14 +1,19 @@
-from xlang.parser import Parser
+import contextlib
+import io
+import os
+
+from xlang.parser import get_parser
 from xlang.xl_ast import GlobalScope
-from xlang.interpreter import Interpreter
+from xlang.interpreter import Interpreter, get_interpreter
 from xlang.validation_pass import validation_pass
 from xlang.exceptions import ContextException
 
+LIT_DIR = os.path.join(os.path.dirname(__file__), "..", "lit")
+
 
 def parse(code):
-    parser = Parser()
     try:
-        parser.parse(code)
+        get_parser().parse(code)
     except ContextException as ex:
         ex.print(code)
         raise ex
@@ -16,8 +21,7 @@ def parse(code):
 
 def validate(code):
     try:
-        parser = Parser()
-        ast: GlobalScope = parser.parse(code)
+        ast: GlobalScope = get_parser().parse(code)
         validation_pass(ast)
     except ContextException as ex:
         ex.print(code)
@@ -27,11 +31,31 @@ def validate(code):
 
 def run(code):
     try:
-        parser = Parser()
-        ast: GlobalScope = parser.parse(code)
+        ast: GlobalScope = get_parser().parse(code)
         validation_pass(ast)
         interpreter = Interpreter()
         interpreter.run(ast)
     except ContextException as ex:
         ex.print(code)
         raise ex
+
+
+def run_output(engine, code, error_type=True):
+    """Output of the program with an engine, with the error it stops with.
+    None if the program does not validate. The python and native engines
+    report errors as ContextExceptions, pass error_type=False to compare
+    their errors by message only."""
+    try:
+        ast = get_parser().parse(code)
+        validation_pass(ast)
+    except ContextException:
+        return None
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            get_interpreter(engine).run(ast)
+        except Exception as ex:
+            if error_type:
+                return output.getvalue(), type(ex), str(ex)
+            return output.getvalue(), str(ex)
+    return output.getvalue()
@@ -0,0 +1,166 @@
+import pytest
+
+from xlang.bytecode import Opcode, compile_function, disassemble
+from xlang.exceptions import ContextException
+from xlang.interpreter import get_interpreter
+from xlang.parser import get_parser
+from xlang.validation_pass import validation_pass
+from xlang.xl_ast import LineTable
+from .conftest import run_output
+
+
+def test_recursion_and_match():
+    code = """
+        enum Shape {
+            Circle { radius: i32 },
+            Square { side: i32 },
+        }
+
+        func area(shape: Shape): i32 {
+            match (shape) {
+                Circle { radius } => {
+                    return 3 * radius * radius;
+                }
+                Square { side } => {
+                    return side * side;
+                }
+            }
+            return 0;
+        }
+
+        func fib(n: i32): i32 {
+            if (n < 2) {
+                return n;
+            }
+            return fib(n=n - 1) + fib(n=n - 2);
+        }
+
+        func main() {
+            print(area(shape=Shape.Circle { radius: 2 }));
+            print(area(shape=Shape.Square { side: 3 }));
+            print(fib(n=15));
+        }
+        """
+    assert run_output("vm", code) == "12\n9\n610\n"
+
+
+def test_loop_jumps():
+    ast = get_parser().parse(
+        """
+        func main() {
+            var i: i32 = 0;
+            loop {
+                i = i + 1;
+                if (i == 3) {
+                    continue;
+                }
+                if (i > 5) {
+                    break;
+                }
+            }
+        }
+        """
+    )
+    validation_pass(ast)
+    code = compile_function(ast, ast.functions["main"])
+    jumps = [
+        (position, code.arguments[position])
+        for position, opcode in enumerate(code.opcodes)
+        if opcode == Opcode.JUMP
+    ]
+    loop_start = code.opcodes.index(Opcode.LOAD)
+    # continue and the end of the body jump back to the start of the loop
+    assert [target for _, target in jumps].count(loop_start) == 2
+    # break jumps to the RETURN_NONE after the loop
+    assert code.opcodes[-1] == Opcode.RETURN_NONE
+    assert len(code) - 1 in [target for _, target in jumps]
+
+    listing = disassemble(code)
+    assert listing.splitlines()[0] == "func main (frame size 1):"
+    assert f"JUMP          -> {loop_start}" in listing
+    assert "STORE         0 (i)" in listing
+
+
+def test_element_members_are_assigned_in_place():
+    ast = get_parser().parse(
+        """
+        struct P {
+            x: i32,
+            y: i32,
+        }
+
+        func main() {
+            var ps: [P];
+            var p: P;
+            ps.append(p);
+            ps[0].y = ps[0].x + 1;
+            print(ps[0].y);
+        }
+        """
+    )
+    validation_pass(ast)
+    listing = disassemble(compile_function(ast, ast.functions["main"]))
+    assignment = [
+        line.split()[1]
+        for line in listing.splitlines()[1:]
+        if " LOCATE" in line or " STORE_ITEM" in line
+    ]
+    assert assignment == ["LOCATE", "LOCATE_INDEX", "LOCATE_MEMBER", "STORE_ITEM"]
+    assert "LOCATE_MEMBER 1" in listing
+
+
+def test_calls_do_not_use_python_recursion():
+    code = """
+        func depth(n: i32): i32 {
+            if (n == 0) {
+                return 0;
+            }
+            return depth(n=n - 1) + 1;
+        }
+
+        func count(n: i32, total: i32): i32 {
+            if (n == 0) {
+                return total;
+            }
+            return count(n=n - 1, total=total + 1);
+        }
+
+        func main() {
+            print(depth(n=5000));
+            print(count(n=5000, total=0));
+        }
+        """
+    assert run_output("vm", code) == "5000\n5000\n"
+
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    listing = disassemble(compile_function(ast, ast.functions["count"]))
+    assert "TAIL_CALL     count (2 arguments)" in listing
+
+
+def test_max_call_depth():
+    code = """
+        func down(n: i32) {
+            if (n > 0) {
+                down(n=n - 1);
+            }
+        }
+
+        func main() {
+            down(n=20);
+        }
+        """
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    get_interpreter("vm", max_call_depth=22).run(ast)
+    with pytest.raises(
+        ContextException, match="Maximum call depth of 21 exceeded"
+    ) as ex:
+        get_interpreter("vm", max_call_depth=21).run(ast)
+    assert ex.value.function_name == "down"
+    assert LineTable(code).line_column(ex.value.context) == (4, 17)
+
+
+def test_max_call_depth_is_only_supported_by_the_vm():
+    with pytest.raises(ValueError, match="not supported by the tree engine"):
+        get_interpreter("tree", max_call_depth=22)
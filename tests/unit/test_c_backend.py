@@ -0,0 +1,249 @@
+import contextlib
+import io
+import os
+import shutil
+
+import pytest
+
+from xlang.c_backend import CGenerator, NativeEngine
+from xlang.exceptions import ContextException, InterpreterAssertionError
+from xlang.parser import get_parser
+from xlang.program_cache import ProgramCache
+from xlang.validation_pass import validation_pass
+from .conftest import run_output
+
+pytestmark = pytest.mark.skipif(
+    shutil.which(os.environ.get("CC", "cc")) is None, reason="no C compiler"
+)
+
+
+def validated(code):
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    return ast
+
+
+def test_fixed_width_arithmetic():
+    code = """
+        func main() {
+            var small: u8 = 255;
+            small = small + 1;
+            print(small);
+            var big: i32 = 60000;
+            big = big * big;
+            print(big);
+            var negative: i32 = -7;
+            print(negative / 2);
+            print(negative % 3);
+            const a: f32 = 3.5;
+            const b: f32 = 1.2;
+            print(a * b);
+            print(a / b);
+        }
+        """
+    assert run_output("native", code) == "0\n-694967296\n-4\n2\n4.2\n2.0\n"
+
+
+def test_f32_matches_interpreters():
+    code = """
+        func main() {
+            const a: f32 = 0.1;
+            const b: f32 = 0.2;
+            const c: f32 = -7.5;
+            const d: f32 = 2.0;
+            const e: f32 = 3.0;
+            print(a + b);
+            print(c / d);
+            print(c % d);
+            print(d / e);
+            print(d % e);
+            print(a * a * a * a * a);
+            print(e * 10000000000000000.0);
+        }
+        """
+    output = run_output("tree", code)
+    assert (
+        output
+        == "0.30000000000000004\n-4.0\n0.5\n0.0\n2.0\n1.0000000000000004e-05\n3e+16\n"
+    )
+    assert run_output("native", code) == output
+
+
+def test_runtime_error_context():
+    code = """
+        func get(values: [i32]): i32 {
+            return values[3];
+        }
+
+        func main() {
+            var values: [i32];
+            print(get(values=values));
+        }
+        """
+    with pytest.raises(ContextException) as ex:
+        NativeEngine().run(validated(code))
+    assert str(ex.value) == "Array index out of bounds"
+    assert ex.value.context == code.index("values[3]")
+
+
+def test_failed_assertion():
+    code = """
+        func main() {
+            print(1);
+            assert(1 == 2);
+        }
+        """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), pytest.raises(InterpreterAssertionError):
+        NativeEngine().run(validated(code))
+    assert output.getvalue() == "1\n"
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        ("exit 3", "Native program failed with exit code 3"),
+        ("kill -SEGV $$", "Native program was killed by SIGSEGV"),
+    ],
+)
+def test_failure_without_error_line(tmp_path, script, message):
+    binary = tmp_path / "program"
+    binary.write_text(f"#!/bin/sh\n{script}\n")
+    binary.chmod(0o755)
+    with pytest.raises(ContextException) as ex:
+        NativeEngine().execute(str(binary), 5)
+    assert str(ex.value) == message
+    assert ex.value.context == 5
+
+
+def test_enum_fields_are_rejected():
+    code = """
+        enum Shape {
+            Circle { radius: f32 },
+            Point,
+        }
+
+        func main() {
+            var s: Shape = Shape.Point;
+        }
+        """
+    with pytest.raises(ContextException) as ex:
+        CGenerator(validated(code)).program()
+    assert ex.value.context == code.index("Shape {")
+
+
+def test_unchanged_structs_and_arrays_are_copied():
+    code = """
+        struct Vec3 {
+            x: f32,
+            y: f32,
+            z: f32,
+        }
+
+        struct Segment {
+            start: Vec3,
+            end: Vec3,
+        }
+
+        func dot(_ a: Vec3, _ b: Vec3): f32 {
+            return a.x * b.x + a.y * b.y + a.z * b.z;
+        }
+
+        func main() {
+            var points: [Vec3];
+            points.append(Vec3(x: 1.0, y: 2.0, z: 3.0));
+            points.append(Vec3(x: 4.0, y: 5.0, z: 6.0));
+            var i: i32 = 0;
+            var sum: f32 = 0.0;
+            loop {
+                if (i == points.length()) {
+                    break;
+                }
+                const v: Vec3 = points[i];
+                sum = sum + dot(v, v);
+                i = i + 1;
+            }
+            print(sum);
+            const v3: Vec3 = points[1];
+            var segment: Segment = Segment(start: points[0], end: v3);
+            print(segment.end.y);
+            var copies: [Vec3] = points;
+            print(copies.length());
+        }
+        """
+    assert run_output("native", code) == run_output("tree", code) == "91.0\n5.0\n2\n"
+
+
+@pytest.mark.parametrize(
+    "statements, shared",
+    [
+        ("var q: P = p;\n q.x = 2;", "p;"),
+        ("var q: P = p;\n p.x = 2;", "p;"),
+        ("var ys: [i32] = xs;\n ys.append(1);", "xs;"),
+        ("p = ps[0];\n ps[0].x = 3;", "ps[0];"),
+        ("var h: H = H(p: p);\n bump(value=p.x);", "p);"),
+        ("var h: H = H(p: p);\n print(h.p.x);\n return h.p;", "p);"),
+        ("var q: P;\n loop { p.x = p.x + 1; q = p; break; }", "p;"),
+        ("var q: P = get(p=p);", None),
+    ],
+)
+def test_changed_shared_structs_and_arrays_are_rejected(statements, shared):
+    code = f"""
+        struct P {{
+            x: i32,
+        }}
+
+        struct H {{
+            p: P,
+        }}
+
+        func get(p: *P): P {{
+            return {"p" if shared is None else "P(x: 1)"};
+        }}
+
+        func bump(value: *i32) {{
+            value = value + 1;
+        }}
+
+        func f(): P {{
+            var p: P;
+            var ps: [P];
+            var xs: [i32];
+            ps.append(p);
+            {statements}
+            return P(x: 0);
+        }}
+
+        func main() {{
+            var r: P = f();
+            print(r.x);
+        }}
+        """
+    with pytest.raises(ContextException) as ex:
+        CGenerator(validated(code)).program()
+    if shared is None:
+        assert ex.value.context == code.index("p;")
+    else:
+        assert ex.value.context == code.index(shared, code.index(statements))
+
+
+def test_binary_is_cached(tmp_path, monkeypatch):
+    code = """
+        func main() {
+            print(42);
+        }
+        """
+    ast = validated(code)
+    engine = NativeEngine()
+    engine.use_cache(ProgramCache(str(tmp_path / "test.xl")), code, 0, "")
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run(ast)
+
+    def build(*args):
+        raise AssertionError("not loaded from the cache")
+
+    monkeypatch.setattr("xlang.c_backend.build", build)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        engine.run(ast)
+    assert output.getvalue() == "42\n"
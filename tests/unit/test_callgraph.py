@@ -0,0 +1,70 @@
+import pytest
+
+from xlang.callgraph import CallGraph, build_call_graph
+from xlang.exceptions import ContextException
+from xlang.parser import get_parser
+from xlang.validation_pass import validation_pass
+
+CODE = """
+    func leaf(): i32 {
+        return 1;
+    }
+
+    func append(): i32 {
+        return leaf();
+    }
+
+    func middle(x: i32) {
+        var array: [i32];
+        array.append(leaf());
+        if (x > 0) {
+            middle(x=append());
+        }
+    }
+
+    func unused() {
+        middle(x=1);
+    }
+
+    func main() {
+        middle(x=leaf());
+    }
+    """
+
+
+def test_build_call_graph():
+    assert build_call_graph(get_parser().parse(CODE)) == {
+        "leaf": [],
+        "append": ["leaf"],
+        "middle": ["leaf", "middle", "append"],
+        "unused": ["middle"],
+        "main": ["middle", "leaf"],
+    }
+
+
+def test_callers_and_reachable():
+    call_graph = CallGraph(get_parser().parse(CODE))
+    assert call_graph.callers("middle") == ["middle", "unused", "main"]
+    assert call_graph.reachable() == ["leaf", "append", "middle", "main"]
+    assert call_graph.reachable(["append"]) == ["leaf", "append"]
+
+
+def test_reachable_from_lazy_frontend():
+    ast = get_parser("lazy").parse(CODE)
+    assert CallGraph(ast).reachable() == ["leaf", "append", "middle", "main"]
+    assert ast.functions["unused"].unparsed_body is not None
+
+
+def test_validate_reachable_only():
+    code = """
+        func unused() {
+            var a: i32 = "string";
+        }
+
+        func main() {
+            print(1);
+        }
+        """
+    validation_pass(get_parser().parse(code), reachable_only=True)
+    with pytest.raises(ContextException):
+        validation_pass(get_parser().parse(code))
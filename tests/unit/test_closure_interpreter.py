@@ -0,0 +1,78 @@
+import contextlib
+import io
+
+import pytest
+
+from xlang.exceptions import ContextException
+from xlang.interpreter import get_interpreter
+from xlang.parser import get_parser
+from xlang.validation_pass import validation_pass
+from .conftest import run_output
+
+
+def test_recursion_and_reference_parameters():
+    code = """
+        func fib(n: i32): i32 {
+            if (n < 2) {
+                return n;
+            }
+            return fib(n=n - 1) + fib(n=n - 2);
+        }
+
+        func increment(value: *i32) {
+            value = value + 1;
+        }
+
+        func main() {
+            var count: i32 = 0;
+            loop {
+                increment(value=count);
+                if (count == 3) {
+                    continue;
+                }
+                if (count > 5) {
+                    break;
+                }
+            }
+            print(count);
+            print(fib(n=15));
+        }
+        """
+    assert run_output("closure", code) == "6\n610\n"
+    assert run_output("tree", code) == "6\n610\n"
+
+
+def test_uncalled_functions_are_not_compiled():
+    ast = get_parser().parse(
+        """
+        func unused(): i32 {
+            return 1;
+        }
+
+        func main() {
+            print(2);
+        }
+        """
+    )
+    validation_pass(ast)
+    interpreter = get_interpreter("closure")
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.run(ast)
+    assert "unused" not in interpreter.functions
+
+
+def test_invalid_arguments_raise_when_called():
+    # not validated, the arguments are bound when the call is compiled
+    ast = get_parser().parse(
+        """
+        func add(a: i32): i32 {
+            return a;
+        }
+
+        func main() {
+            add();
+        }
+        """
+    )
+    with pytest.raises(ContextException, match="Missing required keyword argument"):
+        get_interpreter("closure").run(ast)
@@ -0,0 +1,44 @@
+import glob
+import os
+import re
+import shutil
+
+import pytest
+
+from xlang.c_backend import CGenerator
+from xlang.exceptions import ContextException
+from xlang.interpreter import ENGINES
+from xlang.parser import get_parser
+from xlang.validation_pass import validation_pass
+from .conftest import LIT_DIR, run_output
+
+
+def lit_chunks(file_name):
+    with open(file_name) as f:
+        return re.split("^//-{3,}$", f.read(), flags=re.MULTILINE)
+
+
+def is_native_supported(code):
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    try:
+        CGenerator(ast).program()
+    except ContextException:
+        return False
+    return True
+
+
+@pytest.mark.parametrize("engine", [engine for engine in ENGINES if engine != "tree"])
+@pytest.mark.parametrize(
+    "file_name", sorted(glob.glob(os.path.join(LIT_DIR, "*.xl"))), ids=os.path.basename
+)
+def test_lit_sources_match_tree_interpreter(engine, file_name):
+    if engine == "native" and shutil.which(os.environ.get("CC", "cc")) is None:
+        pytest.skip("no C compiler")
+    # the python and native engines only match the tree engine's error messages
+    error_type = engine not in ("python", "native")
+    for chunk in lit_chunks(file_name):
+        expected = run_output("tree", chunk, error_type)
+        if engine == "native" and (expected is None or not is_native_supported(chunk)):
+            continue
+        assert run_output(engine, chunk, error_type) == expected
@@ -0,0 +1,46 @@
+import pytest
+from lark.exceptions import UnexpectedToken
+
+from xlang.exceptions import ContextException, UnexpectedTokenException
+from xlang.parser import Parser, build_lark_parser
+from xlang.xl_ast import BUILTIN_CONTEXT, LineTable
+
+
+def test_line_table():
+    line_table = LineTable("ab\n\ncd\n")
+    assert line_table.line_column(0) == (1, 1)
+    assert line_table.line_column(1) == (1, 2)
+    assert line_table.line_column(2) == (1, 3)
+    assert line_table.line_column(3) == (2, 1)
+    assert line_table.line_column(5) == (3, 2)
+    assert line_table.line_column(BUILTIN_CONTEXT) == (0, 0)
+    assert [line_table.line(n) for n in range(1, 5)] == ["ab", "", "cd", ""]
+
+
+def test_line_column_matches_lark():
+    code = "func main() {\n    print(1);\n  /* a\n comment */  print(2)\n}\n"
+    with pytest.raises(UnexpectedTokenException) as ex:
+        Parser().parse(code)
+    with pytest.raises(UnexpectedToken) as lark_ex:
+        build_lark_parser(True).parse(code)
+    line_column = (lark_ex.value.line, lark_ex.value.column)
+    assert LineTable(code).line_column(ex.value.context) == line_column
+
+
+def test_print(capsys):
+    code = "\n".join(f"line{i}" for i in range(1, 10))
+    ex = ContextException("message", code.index("ne7"))
+    ex.function_name = "main"
+    ex.function_parse_context = 0
+    ex.print(code, "test.xl")
+    assert capsys.readouterr().out.split("\n") == [
+        "In function main @ test.xl:1:1",
+        "test.xl:7:3 message",
+        "line3",
+        "line4",
+        "line5",
+        "line6",
+        "line7",
+        "  ^",
+        "",
+    ]
@@ -0,0 +1,106 @@
+import pytest
+
+from xlang.callgraph import iter_nodes
+from xlang.exceptions import ContextException
+from xlang.incremental import IncrementalValidator
+from xlang.rd_parser import RDParser
+from xlang.validation_pass import validation_pass
+
+CODE = """
+    struct Point {
+        x: i32,
+        y: i32,
+    }
+
+    func length(p: Point): i32 {
+        return p.x + p.y;
+    }
+
+    func twice(x: i32): i32 {
+        return x * 2;
+    }
+
+    func main() {
+        var p: Point = Point(x: 1, y: 2);
+        print(length(p=p));
+        print(twice(x=3));
+    }
+    """
+
+
+def full_validation(code):
+    ast = RDParser().parse(code)
+    validation_pass(ast)
+    return ast
+
+
+def test_first_validation_validates_everything():
+    validator = IncrementalValidator()
+    ast = validator.validate(CODE)
+    assert validator.revalidated == ["length", "twice", "main"]
+    assert ast.dump() == full_validation(CODE).dump()
+
+
+def test_only_edited_function_is_revalidated():
+    validator = IncrementalValidator()
+    validator.validate(CODE)
+    assert validator.revalidated == ["length", "twice", "main"]
+
+    validator.validate(CODE)
+    assert validator.revalidated == []
+
+    code = CODE.replace("return x * 2;", "return x * 3;")
+    ast = validator.validate(code)
+    assert validator.revalidated == ["twice"]
+    assert ast.dump() == full_validation(code).dump()
+
+
+def test_signature_change_revalidates_dependents():
+    validator = IncrementalValidator()
+    validator.validate(CODE)
+
+    code = CODE.replace("y: i32,\n", "y: u8,\n")
+    validator.validate(code)
+    assert validator.revalidated == ["length", "main"]
+
+    code = code.replace("func twice(x: i32): i32", "func twice(x: i64): i64")
+    validator.validate(code)
+    assert validator.revalidated == ["twice", "main"]
+
+
+def test_moved_functions_get_new_contexts():
+    validator = IncrementalValidator()
+    validator.validate(CODE)
+
+    code = "\n\n// a comment\n" + CODE
+    ast = validator.validate(code)
+    assert validator.revalidated == []
+    fresh = full_validation(code)
+    assert ast.dump() == fresh.dump()
+    for name, function in ast.functions.items():
+        contexts = [node.context for node in iter_nodes(function.statements)]
+        expected = [
+            node.context for node in iter_nodes(fresh.functions[name].statements)
+        ]
+        assert contexts == expected
+
+
+def test_error_is_reported_until_fixed():
+    validator = IncrementalValidator()
+    validator.validate(CODE)
+
+    with pytest.raises(ContextException):
+        validator.validate(CODE.replace("return x * 2;", 'return "2";'))
+
+    # the failed version is not remembered
+    code = CODE.replace("return x * 2;", "return x * 4;")
+    validator.validate(code)
+    assert validator.revalidated == ["twice"]
+
+
+def test_reused_functions_keep_frame_size():
+    validator = IncrementalValidator()
+    validator.validate(CODE)
+    ast = validator.validate(CODE.replace("return x * 2;", "return x * 4;"))
+    assert ast.functions["main"].frame_size == 1
+    assert ast.functions["length"].frame_size == 1
@@ -0,0 +1,374 @@
+import contextlib
+import io
+
+import pytest
+
+from xlang.interpreter import Interpreter, get_interpreter
+from xlang.interpreter_datatypes import (
+    NumberArray,
+    StringBuilder,
+    StructColumns,
+    Value,
+    ValueType,
+)
+from xlang.parser import get_parser
+from xlang.validation_pass import validation_pass
+from xlang.xl_ast import PrimitiveType, VariableType, VariableTypeEnum
+from .conftest import run_output
+
+
+def array_value(*elements):
+    return Value(
+        type=ValueType.PRIMITIVE,
+        value=list(elements),
+        primitive_type=PrimitiveType.I32,
+        is_array=True,
+    )
+
+
+def test_lazy_copy_shares_payload_until_written():
+    interpreter = Interpreter()
+    interpreter.pinned = []
+    values = array_value(1, 2)
+    copy = interpreter.lazy_copy(values)
+    assert copy.value is values.value
+
+    interpreter.unshare(copy)
+    copy.value.append(3)
+    assert values.value == [1, 2]
+    assert copy.value == [1, 2, 3]
+
+
+def test_unshare_without_live_copies_does_not_copy():
+    interpreter = Interpreter()
+    interpreter.pinned = []
+    values = array_value(1, 2)
+    payload = values.value
+    interpreter.lazy_copy(values)
+    interpreter.unshare(values)
+    assert values.value is payload
+
+
+def test_arguments_are_copied_on_write():
+    code = """
+        struct In {
+            x: i32 = 1,
+        }
+
+        struct Out {
+            inner: In,
+        }
+
+        func id_out(_ o: Out): Out {
+            return o;
+        }
+
+        func id_in(_ i: In): In {
+            return i;
+        }
+
+        func bump(value: *i32, copy: In) {
+            value = value + 10;
+            print(copy.x);
+        }
+
+        func grow(_ values: [i32]) {
+            var mine: [i32] = values;
+            mine.append(3);
+            mine[0] = 99;
+            print(mine.length());
+        }
+
+        func main() {
+            var s: In;
+            bump(value=s.x, copy=s);
+            print(s.x);
+
+            var o: Out;
+            var q: In = o.inner;
+            var t: Out = id_out(o);
+            q.x = 5;
+            print(t.inner.x);
+
+            var values: [i32];
+            values.append(1);
+            grow(values);
+            grow(values);
+            print(values.length());
+            print(values[0]);
+
+            var a: In;
+            var b: In;
+            a = b;
+            var c: In = id_in(a);
+            b.x = 8;
+            print(a.x);
+            print(c.x);
+        }
+        """
+    output = "1\n11\n1\n2\n2\n1\n1\n8\n1\n"
+    for engine in ("tree", "closure", "vm"):
+        assert run_output(engine, code) == output
+
+
+def test_number_arrays_are_buffers():
+    values = Interpreter().default_variable_value(
+        VariableType(
+            variable_type=VariableTypeEnum.ARRAY,
+            array_type=VariableType(
+                variable_type=VariableTypeEnum.PRIMITIVE,
+                primitive_type=PrimitiveType.U8,
+            ),
+        )
+    )
+    assert isinstance(values.value, NumberArray)
+    assert values.value.buffer.typecode == "B"
+
+    code = """
+        func fill(_ values: [u8]) {
+            var mine: [u8] = values;
+            mine.append(3);
+            print(mine.length());
+        }
+
+        func main() {
+            var values: [u8];
+            var floats: [f32];
+            var names: [string];
+            values.append(1);
+            values.append(2);
+            values[0] = values[1] + 5;
+            fill(values);
+            floats.append(1.5);
+            names.append("a");
+            print(values[0]);
+            print(values.length());
+            print(floats[0]);
+            print(names[0]);
+        }
+        """
+    output = "3\n7\n2\n1.5\na\n"
+    for engine in ("tree", "closure", "vm"):
+        assert run_output(engine, code) == output
+
+
+def test_out_of_range_numbers_turn_number_arrays_into_lists():
+    code = """
+        struct P {
+            x: u8,
+        }
+
+        func decrement(value: *u8) {
+            value = value - 1;
+        }
+
+        func main() {
+            var u: u8 = 0;
+            u = u - 1;
+            var values: [u8];
+            values.append(u);
+            values.append(1);
+            values[1] = values[1] + 255;
+            var bytes: [u8];
+            bytes.append(0);
+            decrement(value=bytes[0]);
+            var small: [i8];
+            var minus: i8 = -100;
+            small.append(1);
+            small[0] = small[0] + minus + minus;
+            var ps: [P];
+            var p: P;
+            ps.append(p);
+            ps[0].x = ps[0].x - 1;
+            ps.append(p);
+            ps[1].x = ps[1].x + 150 + 150;
+            print(values[0]);
+            print(values[1]);
+            print(bytes[0]);
+            print(small[0]);
+            print(ps[0].x);
+            print(ps[1].x);
+        }
+        """
+    output = "-1\n256\n-1\n-199\n-1\n300\n"
+    for engine in ("tree", "closure", "vm"):
+        assert run_output(engine, code) == output
+
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    interpreter = Interpreter(columnar_structs=True)
+    columnar_output = io.StringIO()
+    with contextlib.redirect_stdout(columnar_output):
+        interpreter.run(ast)
+    assert columnar_output.getvalue() == output
+
+
+def test_struct_arrays_can_be_columnar():
+    code = """
+        struct P {
+            x: i32,
+            y: f32,
+        }
+
+        struct Named {
+            name: string,
+            p: P,
+        }
+
+        func bump(value: *i32) {
+            value = value + 100;
+        }
+
+        func move(p: *P) {
+            p.x = p.x + 1000;
+        }
+
+        func read(_ p: P, _ ps: [P]): i32 {
+            var mine: [P] = ps;
+            mine[0].x = 77;
+            return p.x + mine[0].x;
+        }
+
+        func main() {
+            var ps: [P];
+            var p: P;
+            p.x = 1;
+            p.y = 0.5;
+            ps.append(p);
+            p.x = 2;
+            ps.append(p);
+            p.x = 3;
+            ps.append(p);
+            print(ps.length());
+            ps[1].x = ps[0].x + ps[2].x;
+            print(ps[1].x);
+            var q: P = ps[2];
+            q.x = 30;
+            print(ps[2].x);
+            bump(value=ps[0].x);
+            print(ps[0].x);
+            move(p=ps[0]);
+            print(ps[0].x);
+            print(read(ps[1], ps));
+            print(ps[0].x);
+
+            var names: [Named];
+            var n: Named;
+            n.p.x = 5;
+            names.append(n);
+            names[0].p.x = 6;
+            print(names[0].p.x);
+        }
+        """
+    output = "3\n4\n30\n101\n1101\n81\n1101\n6\n"
+    for engine in ("tree", "closure", "vm"):
+        assert run_output(engine, code) == output
+
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    interpreter = Interpreter(columnar_structs=True)
+    columnar_output = io.StringIO()
+    with contextlib.redirect_stdout(columnar_output):
+        interpreter.run(ast)
+    assert columnar_output.getvalue() == output
+    ps = interpreter.frame[0].value
+    assert isinstance(ps, StructColumns)
+    assert [column.buffer.typecode for column in ps.columns] == ["i", "d"]
+    # Named has a string member, its arrays keep a list of structs
+    assert isinstance(interpreter.frame[3].value, list)
+
+
+def test_assigned_structs_are_not_columnar():
+    code = """
+        struct P {
+            x: i32,
+        }
+
+        struct Q {
+            x: i32,
+        }
+
+        func main() {
+            var ps: [P];
+            var p: P;
+            ps.append(p);
+            ps.append(p);
+            var q: P = P(x: 8);
+            ps[1] = q;
+            q.x = 100;
+            print(ps[1].x);
+            var r: P = ps[0];
+            r = q;
+            print(ps[0].x);
+
+            var qs: [Q];
+            var s: Q;
+            qs.append(s);
+            print(qs.length());
+        }
+        """
+    output = "100\n100\n1\n"
+    for engine in ("tree", "closure", "vm"):
+        assert run_output(engine, code) == output
+
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    interpreter = Interpreter(columnar_structs=True)
+    columnar_output = io.StringIO()
+    with contextlib.redirect_stdout(columnar_output):
+        interpreter.run(ast)
+    assert columnar_output.getvalue() == output
+    assert isinstance(interpreter.frame[0].value, list)
+    assert isinstance(interpreter.frame[4].value, StructColumns)
+
+
+def test_columnar_structs_are_only_supported_by_the_tree_engine():
+    with pytest.raises(ValueError, match="not supported by the vm engine"):
+        get_interpreter("vm", columnar_structs=True)
+
+
+def test_appended_strings_are_joined_when_read():
+    code = """
+        struct Log {
+            text: string,
+        }
+
+        func add(_ c: char, line: *string) {
+            line.append(c);
+        }
+
+        func main() {
+            var s: string = "x";
+            s.append('a');
+            add('b', line=s);
+            s.append("cd");
+            print(s);
+            print(s.length());
+            print(s[2]);
+            print(s == "xabcd");
+
+            var log: Log;
+            add('1', line=log.text);
+            add('2', line=log.text);
+            var logs: [Log];
+            logs.append(log);
+            add('3', line=log.text);
+            var first: Log = logs[0];
+            print(first.text);
+            print(log.text);
+            print(log);
+        }
+        """
+    output = run_output("tree", code)
+    assert output.startswith("xabcd\n5\nb\ntrue\n12\n123\n")
+    assert run_output("closure", code) == output
+    assert run_output("vm", code) == output
+
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    interpreter = Interpreter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.run(ast)
+    (s, log, logs, first) = interpreter.frame
+    assert isinstance(s, StringBuilder)
+    assert isinstance(log.value[0], StringBuilder)
@@ -1,6 +1,10 @@
+import os
+import tempfile
+
 import pytest
 from .conftest import parse
 from xlang.exceptions import UnexpectedCharacterException, UnexpectedTokenException
+from xlang.parser import Parser, build_lark_parser, lark_cache_path
 
 
 def test_missing_semicolon():
@@ -43,3 +47,69 @@ def test_const_without_value():
             }
             """
         )
+
+
+def test_transform_during_parse_matches_tree_transform():
+    code = """
+        enum Shape {
+            Circle {radius: f32},
+            Point,
+        }
+        struct Pair {
+            a: i32,
+            b: i32 = 5,
+        }
+        func add(_ a: i32, b: i32 = 2): i32 {
+            return a + b * -a;
+        }
+        func main() {
+            var p: Pair = Pair(a: 1);
+            var s: Shape = Shape.Circle{radius: 1.5};
+            match (s) {
+                Circle { radius } => { print(radius); }
+                _ => { print("other"); }
+            }
+            if (not p.a == 1) { print(add(1, b=3)); } else { print('x'); }
+        }
+        """
+    tree_ast = Parser(build_tree=True).parse(code)
+    inline_ast = Parser(build_tree=False).parse(code)
+    assert tree_ast.dump() == inline_ast.dump()
+
+
+def test_ast_nodes_have_no_instance_dict():
+    ast = Parser().parse(
+        """
+        func main() {
+            var a: i32 = 1 + 2;
+            if (a > 2) { print(a); } elif (a > 1) { print(1); }
+        }
+        """
+    )
+    function = ast.functions["main"]
+    definition, if_statement = function.statements
+    for node in (function, definition, definition.value, if_statement):
+        assert not hasattr(node, "__dict__")
+    assert isinstance(if_statement.elif_statements, list)
+
+
+def test_lark_cache_is_private(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tmp_path))
+    cache_path = lark_cache_path("ast")
+    assert cache_path is not None
+    assert os.path.dirname(cache_path) == str(tmp_path / f"xlang-lark-{os.getuid()}")
+    assert os.stat(os.path.dirname(cache_path)).st_mode & 0o777 == 0o700
+    assert lark_cache_path("tree") != cache_path
+
+    os.chmod(os.path.dirname(cache_path), 0o777)
+    assert lark_cache_path("ast") is None
+
+
+def test_unwritable_lark_cache(monkeypatch, tmp_path):
+    # a file in place of the directory, writing the cache fails
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(
+        "xlang.parser.lark_cache_path", lambda name: str(tmp_path / "file" / name)
+    )
+    lark_parser = build_lark_parser.__wrapped__(False)
+    assert "main" in lark_parser.parse("func main() {}").functions
@@ -0,0 +1,55 @@
+from xlang.parser import get_parser
+from xlang.program_cache import ProgramCache, cache_key
+from xlang.validation_pass import validation_pass
+
+CODE = """
+struct Point {
+    x: i32,
+}
+func main() {
+    var p: Point = Point(x: 5);
+    print(p.x);
+}
+"""
+
+
+def compile_code(code):
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    return ast
+
+
+def test_store_and_load(tmp_path):
+    cache = ProgramCache(str(tmp_path / "test.xl"))
+    assert cache.load(CODE) is None
+
+    ast = compile_code(CODE)
+    cache.store(CODE, ast)
+    cached_ast = cache.load(CODE)
+    assert cached_ast is not None
+    assert cached_ast.dump() == ast.dump()
+
+
+def test_chunks_are_cached_separately(tmp_path):
+    cache = ProgramCache(str(tmp_path / "test.xl"))
+    other_code = CODE.replace("5", "6")
+    cache.store(CODE, compile_code(CODE), 0)
+    cache.store(other_code, compile_code(other_code), 1)
+    assert cache.load(CODE, 0) is not None
+    assert cache.load(other_code, 1) is not None
+    assert cache.load(other_code, 0) is None
+
+
+def test_changed_source_is_a_miss(tmp_path):
+    cache = ProgramCache(str(tmp_path / "test.xl"))
+    cache.store(CODE, compile_code(CODE))
+    assert cache_key(CODE) != cache_key(CODE + "\n")
+    assert cache.load(CODE + "\n") is None
+
+
+def test_corrupt_cache_file_is_a_miss(tmp_path):
+    cache = ProgramCache(str(tmp_path / "test.xl"))
+    cache.store(CODE, compile_code(CODE))
+    with open(cache.cache_path(0), "wb") as f:
+        f.write(cache_key(CODE).encode() + b"\nnot a pickle")
+    assert cache.load(CODE) is None
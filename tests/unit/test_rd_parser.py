@@ -0,0 +1,134 @@
+import glob
+import os
+import re
+
+import pytest
+
+from xlang.exceptions import (
+    ContextException,
+    UnexpectedCharacterException,
+    UnexpectedTokenException,
+)
+from xlang.parser import Parser
+from xlang.rd_parser import RDParser, load_function_body, load_function_bodies
+from xlang.validation_pass import validation_pass
+
+LIT_DIR = os.path.join(os.path.dirname(__file__), "..", "lit")
+
+
+def parse_result(parser, code):
+    try:
+        return parser.parse(code).dump()
+    except ContextException as ex:
+        return type(ex), str(ex), ex.context
+
+
+@pytest.mark.parametrize(
+    "file_name", sorted(glob.glob(os.path.join(LIT_DIR, "*.xl"))), ids=os.path.basename
+)
+def test_lit_sources_match_lark_frontend(file_name):
+    with open(file_name) as f:
+        chunks = re.split("^//-{3,}$", f.read(), flags=re.MULTILINE)
+    for chunk in chunks:
+        assert parse_result(RDParser(), chunk) == parse_result(Parser(), chunk)
+
+
+def test_missing_semicolon():
+    with pytest.raises(UnexpectedTokenException):
+        RDParser().parse(
+            """
+            func main() {
+                print(5)
+            }
+            """
+        )
+
+
+def test_missing_whitespace_after_keyword():
+    with pytest.raises(UnexpectedTokenException):
+        RDParser().parse("func main() { var(b): i32; }")
+
+
+def test_unclosed_string():
+    with pytest.raises(UnexpectedCharacterException):
+        RDParser().parse(
+            """
+            func main() {
+                print("
+            """
+        )
+
+
+def test_escape_sequences():
+    ast = RDParser().parse(
+        r"""
+        func main() {
+            print("a\tb\n\"c\"\\\0");
+            print('\'');
+        }
+        """
+    )
+    statements = ast.functions["main"].statements
+    assert statements[0].params[0].value.value == 'a\tb\n"c"\\\0'
+    assert statements[1].params[0].value.value == "'"
+
+
+@pytest.mark.parametrize(
+    "file_name", sorted(glob.glob(os.path.join(LIT_DIR, "*.xl"))), ids=os.path.basename
+)
+def test_lazy_bodies_match_rd_frontend(file_name):
+    with open(file_name) as f:
+        chunks = re.split("^//-{3,}$", f.read(), flags=re.MULTILINE)
+    for chunk in chunks:
+        try:
+            ast = RDParser(lazy=True).parse(chunk)
+            load_function_bodies(ast)
+            result = ast.dump()
+        except ContextException as ex:
+            result = type(ex), str(ex), ex.context
+        assert result == parse_result(RDParser(), chunk)
+
+
+def test_lazy_body_skips_braces_in_literals_and_comments():
+    code = """
+        func f() {
+            print("}{");  // }
+            print('}');   /* { */
+            if (true) { print(1); }
+        }
+        func main() { f(); }
+        """
+    ast = RDParser(lazy=True).parse(code)
+    function = ast.functions["f"]
+    assert function.statements == []
+    assert code[function.unparsed_body.end_pos - 1] == "}"
+    load_function_body(function)
+    assert function.unparsed_body is None
+    assert len(function.statements) == 3
+
+
+def test_lazy_validation_skips_unreachable_functions():
+    ast = RDParser(lazy=True).parse(
+        """
+        func unused() { this is not valid }
+        func used(): i32 { return 1; }
+        func main() { print(used()); }
+        """
+    )
+    validation_pass(ast)
+    assert ast.functions["unused"].unparsed_body is not None
+    assert ast.functions["used"].unparsed_body is None
+
+
+def test_lazy_syntax_error_in_reachable_function():
+    code = """
+        func used() { print(1) }
+        func main() { used(); }
+        """
+    ast = RDParser(lazy=True).parse(code)
+    with pytest.raises(UnexpectedTokenException) as ex:
+        validation_pass(ast)
+    with pytest.raises(UnexpectedTokenException) as rd_ex:
+        RDParser().parse(code)
+    assert ex.value.context == rd_ex.value.context
+    assert ex.value.expected_tokens == rd_ex.value.expected_tokens
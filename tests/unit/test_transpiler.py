@@ -0,0 +1,200 @@
+import contextlib
+import io
+
+import pytest
+
+from xlang.exceptions import ContextException
+from xlang.parser import get_parser
+from xlang.program_cache import ProgramCache
+from xlang.transpiler import PythonEngine, Transpiler
+from xlang.validation_pass import validation_pass
+from .conftest import run_output
+
+
+def test_reference_parameters():
+    code = """
+        struct Counter {
+            count: i32,
+        }
+
+        func increment(value: *i32) {
+            value = value + 1;
+        }
+
+        func increment_twice(value: *i32) {
+            increment(value=value);
+            increment(value=value);
+        }
+
+        func main() {
+            var count: i32 = 0;
+            increment_twice(value=count);
+            print(count);
+            var counter: Counter = Counter(count: 5);
+            increment(value=counter.count);
+            print(counter.count);
+            var counts: [i32];
+            counts.append(7);
+            increment(value=counts[0]);
+            print(counts[0]);
+        }
+        """
+    assert run_output("python", code) == "2\n6\n8\n"
+
+
+def test_arguments_are_copied():
+    code = """
+        func fill(values: [i32]) {
+            values.append(1);
+            print(values.length());
+        }
+
+        func main() {
+            var values: [i32];
+            fill(values=values);
+            fill(values=values);
+            print(values.length());
+        }
+        """
+    assert run_output("python", code) == "1\n1\n0\n"
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm", "python"])
+def test_aliasing_matches_other_engines(engine):
+    # primitives, strings and enums are copied, structs and arrays are shared
+    code = """
+        enum Color {
+            Red,
+            Green,
+        }
+
+        enum Shape {
+            Box { p: P },
+            Dot,
+        }
+
+        struct P {
+            x: i32,
+            c: Color = Color.Green,
+        }
+
+        struct H {
+            p: P,
+            xs: [i32],
+        }
+
+        func bump(_ p: P): P {
+            var mine: P = p;
+            mine.x = mine.x + 100;
+            return mine;
+        }
+
+        func bump_ref(p: *P) {
+            p.x = p.x + 1000;
+        }
+
+        func main() {
+            var s: string = "a";
+            var t: string = s;
+            t.append('b');
+            var c: Color = Color.Green;
+            var d: Color = c;
+            d = Color.Red;
+            print(s);
+            print(c);
+
+            var p: P = P(x: 1, c: d);
+            d = Color.Green;
+            var px: i32 = p.x;
+            px = 5;
+            print(p.x);
+            print(p.c);
+            var q: P;
+            q = p;
+            q.x = 2;
+            print(p.x);
+
+            var ps: [P];
+            ps.append(p);
+            ps[0] = q;
+            q.x = 3;
+            var first: P = ps[0];
+            print(first.x);
+
+            var b: P = bump(p);
+            print(p.x);
+            print(b.x);
+            bump_ref(p=p);
+            print(q.x);
+
+            var h: H = H(p: p);
+            h.p.x = 7;
+            print(p.x);
+            var xs: [i32];
+            xs.append(1);
+            h.xs = xs;
+            xs.append(2);
+            var hxs: [i32] = h.xs;
+            print(hxs.length());
+
+            var shape: Shape = Shape.Box { p: p };
+            p.x = 9;
+            var other: Shape = shape;
+            shape = Shape.Dot;
+            match (other) {
+                Box { p } => {
+                    print(p.x);
+                }
+                Dot => {
+                    print(0);
+                }
+            }
+        }
+        """
+    output = "a\nGreen\n1\nRed\n2\n3\n3\n103\n1003\n7\n2\n9\n"
+    assert run_output(engine, code) == output
+
+
+def test_runtime_error_context():
+    code = """
+        func get(values: [i32]): i32 {
+            return values[3];
+        }
+
+        func main() {
+            var values: [i32];
+            print(get(values=values));
+        }
+        """
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    with pytest.raises(ContextException) as ex:
+        PythonEngine().run(ast)
+    assert str(ex.value) == "Array index out of bounds"
+    assert ex.value.context == code.index("return values[3]")
+    assert ex.value.function_name == "get"
+
+
+def test_generated_code_is_cached(tmp_path, monkeypatch):
+    code = """
+        func main() {
+            print(42);
+        }
+        """
+    ast = get_parser().parse(code)
+    validation_pass(ast)
+    cache = ProgramCache(str(tmp_path / "test.xl"))
+    engine = PythonEngine()
+    engine.use_cache(cache, code, 0, "")
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run(ast)
+    assert cache.load_python(code) == Transpiler(ast).module()
+
+    def transpile(self):
+        raise AssertionError("not loaded from the cache")
+
+    monkeypatch.setattr(Transpiler, "module", transpile)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        engine.run(ast)
+    assert output.getvalue() == "42\n"
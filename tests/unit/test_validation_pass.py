@@ -1,3 +1,6 @@
+import pickle
+from dataclasses import FrozenInstanceError
+
 import pytest
 from xlang.xl_ast import VariableTypeEnum, PrimitiveType
 from xlang.exceptions import TypeMismatchException
@@ -299,3 +302,117 @@ def test_compare_operator_type_fail2():
             }
             """
         )
+
+
+def test_types_are_interned():
+    ast = validate(
+        """
+        struct MyStruct {
+            a: [i32],
+        }
+
+        func f(_ a: [i32], _ b: MyStruct): MyStruct {
+            return b;
+        }
+
+        func main() {
+            var a: [i32];
+            var s: MyStruct = MyStruct(a: a);
+            f(a, s);
+        }
+        """
+    )
+    f = ast.functions["f"]
+    assert (
+        ast.structs["MyStruct"].members[0].param_type is f.function_params[0].param_type
+    )
+    assert f.return_type is f.function_params[1].param_type
+    copied = pickle.loads(pickle.dumps(ast))
+    assert copied.functions["f"].return_type is f.return_type
+    with pytest.raises(FrozenInstanceError):
+        f.return_type.type_name = "Other"
+
+
+def test_call_arguments_are_bound():
+    ast = validate(
+        """
+        func f(_ a: i32, c: i32, b: i32 = 2): i32 {
+            return a + b + c;
+        }
+
+        func main() {
+            print(f(1, c=3));
+        }
+        """
+    )
+    f = ast.functions["f"]
+    call = ast.functions["main"].statements[0].params[0].value
+    (a, c, b) = f.function_params
+    assert call.bound_arguments == [
+        (call.params[0].value, a),
+        (call.params[1].value, c),
+        (b.default_value, b),
+    ]
+
+
+def test_struct_member_offsets():
+    ast = validate(
+        """
+        struct Inner {
+            x: i32,
+            y: i32,
+        }
+
+        struct Outer {
+            name: string,
+            inner: Inner,
+        }
+
+        func main() {
+            var o: Outer = Outer(inner: Inner(x: 1));
+            print(o.inner.y);
+        }
+        """
+    )
+    assert ast.structs["Inner"].offsets == {"x": 0, "y": 1}
+    assert ast.structs["Outer"].offsets == {"name": 0, "inner": 1}
+    statements = ast.functions["main"].statements
+    (field_init,) = statements[0].value.field_inits
+    assert field_init.offset == 1
+    assert field_init.value.field_inits[0].offset == 0
+    access = statements[1].params[0].value
+    assert access.offset is None
+    assert access.variable_access.offset == 1
+    assert access.variable_access.variable_access.offset == 1
+
+
+def test_match_arm_table():
+    ast = validate(
+        """
+        enum Token {
+            Plus,
+            Number { base: i32, value: i32 },
+            Minus,
+            Star,
+        }
+
+        func main() {
+            var t: Token = Token.Number { value: 3, base: 10 };
+            match (t) {
+                Star => {}
+                _ => {}
+                Number { value } => {}
+            }
+        }
+        """
+    )
+    entries = ast.enums["Token"].entries
+    assert [entry.discriminant for entry in entries.values()] == [0, 1, 2, 3]
+    assert entries["Number"].offsets == {"base": 0, "value": 1}
+    definition, match = ast.functions["main"].statements
+    assert [field_init.offset for field_init in definition.value.field_inits] == [
+        1,
+        0,
+    ]
+    assert match.arm_table == [1, 2, 1, 0]
+    assert match.arms[2].pattern.binding_offsets == [1]
@@ -1,6 +1,6 @@
 import pytest
 from xlang.exceptions import ContextException
-from .conftest import validate
+from .conftest import run, validate
 
 
 def test_variable_access_as_statement():
@@ -59,3 +59,91 @@ def test_nested_variable_access_as_statement():
             }
             """
         )
+
+
+def test_variable_slots():
+    ast = validate(
+        """
+        func f(a: i32, b: i32) {
+            if (a > b) {
+                var c: i32 = a;
+            } else {
+                var d: i32 = b;
+                var e: i32 = d;
+            }
+            var f: i32 = b;
+        }
+
+        func main() {
+            f(a=1, b=2);
+        }
+        """
+    )
+    function = ast.functions["f"]
+    # parameters first, the scopes of if and else share slots
+    if_statement, f_definition = function.statements
+    assert if_statement.statements[0].slot == 2
+    assert [s.slot for s in if_statement.else_statement.statements] == [2, 3]
+    assert if_statement.else_statement.statements[1].value.slot == 2
+    assert f_definition.slot == 2
+    assert f_definition.value.slot == 1
+    assert function.frame_size == 4
+
+
+def test_shadowed_variable_in_definition(capsys):
+    run(
+        """
+        func main() {
+            var x: i32 = 1;
+            if (true) {
+                var x: i32 = x + 1;
+                print(x);
+            }
+            print(x);
+        }
+        """
+    )
+    assert capsys.readouterr().out == "2\n1\n"
+
+
+def test_definition_copies_primitive(capsys):
+    run(
+        """
+        func main() {
+            var x: i32 = 1;
+            var y: i32 = x;
+            y = 2;
+            print(x);
+            print(y);
+        }
+        """
+    )
+    assert capsys.readouterr().out == "1\n2\n"
+
+
+def test_reference_parameters_assign_location(capsys):
+    run(
+        """
+        struct Named {
+            name: string,
+        }
+
+        func grow(s: *string) {
+            s.append('!');
+        }
+
+        func main() {
+            var s: string = "a";
+            grow(s=s);
+            var named: Named = Named(name: "b");
+            grow(s=named.name);
+            var names: [string];
+            names.append("c");
+            grow(s=names[0]);
+            print(s);
+            print(named.name);
+            print(names[0]);
+        }
+        """
+    )
+    assert capsys.readouterr().out == "a!\nb!\nc!\n"
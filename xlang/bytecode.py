@@ -0,0 +1,619 @@
+"""Compiles validated functions into bytecode for the stack machine in xlang.vm.
+
+A function compiles into a Code object, a flat list of instructions. Each
+instruction is an opcode and a single argument. Expressions push their value
+on the value stack, the values are the ones of xlang.runtime. Assignments and
+reference arguments push the container and key of the location they write,
+like Interpreter.locate_variable. Statements leave the stack empty.
+Variables live in the frame slots assigned by the validation pass, control
+flow uses absolute jump targets.
+"""
+
+import operator
+from enum import IntEnum
+from typing import Any, List, Optional, Set, Tuple
+
+from xlang.exceptions import ContextException, InternalCompilerError
+from xlang.runtime import default_primitive_value
+from xlang.xl_ast import (
+    BaseExpression,
+    BaseFunction,
+    Break,
+    BuiltinFunction,
+    CompareOperation,
+    Constant,
+    Continue,
+    EnumVariantInitialization,
+    Function,
+    FunctionCall,
+    GlobalScope,
+    If,
+    LineTable,
+    Loop,
+    MathOperation,
+    Match,
+    ParseContext,
+    PrimitiveType,
+    Return,
+    Statement,
+    StructInitialization,
+    UnaryOperation,
+    VariableAccess,
+    VariableAssign,
+    VariableDeclaration,
+    VariableDefinition,
+    VariableType,
+    VariableTypeEnum,
+)
+from xlang.xl_builtins import (
+    BUILTIN_FUNCTIONS,
+    get_builtin_array_methods,
+    get_builtin_primitive_methods,
+)
+from xlang.utils import bind_call_arguments
+
+
+class Opcode(IntEnum):
+    # variables and constants
+    CONST = 1  # value -> push value
+    LOAD = 2  # slot -> push frame[slot]
+    STORE = 3  # slot -> frame[slot] = pop
+    LOAD_REF = 4  # slot of a reference parameter -> push its value
+    DEFAULT = 5  # variable type -> push a new default value of the type
+    POP = 6
+    ENUM_VALUE = 7  # (enum name, entry name) -> push a new enum Value
+    MEMBER = 8  # offset -> push pop().value[offset]
+    INDEX = 9  # pop index, pop value -> push the element or character
+    STRING = 10  # join the StringBuilder on top of the stack into a string
+    COPY = 11  # copy the enum on top of the stack, see Runtime.stored
+    LAZY_COPY = 12  # lazy copy of the argument on top of the stack
+    # locations, a container and a key on top of the stack
+    LOCATE = 13  # slot -> push frame, slot
+    LOCATE_REF = 14  # slot of a reference parameter -> push its location
+    LOCATE_MEMBER = 15  # offset -> replace the location with the member's
+    LOCATE_INDEX = 16  # pop index, replace the location with the element's
+    STORE_ITEM = 17  # pop location, pop primitive value, store it there
+    ASSIGN = 18  # pop location, pop value, Runtime.assign it there
+    REFERENCE = 19  # pop location, push the argument of a reference parameter
+    # operators
+    MATH = 20  # (operator function, operator)
+    COMPARE = 21  # (operator function, operator)
+    ENUM_COMPARE = 22  # operator
+    NOT = 23
+    NEGATE = 24
+    STRUCT_INIT = 25  # (struct name, field offsets, field names)
+    ENUM_INIT = 26  # (enum name, variant name, field offsets, field names)
+    # calls
+    CALL = 27  # (function name, argument count, pinned argument count)
+    TAIL_CALL = 28  # like CALL, replaces the frame
+    CALL_BUILTIN = 29  # (function call, argument count)
+    CALL_METHOD = 30  # (method call, argument count), receiver first
+    STRING_APPEND = 31  # method call, pop value, pop location of the string
+    RETURN = 32  # return pop
+    RETURN_NONE = 33
+    # control flow
+    JUMP = 34  # target
+    JUMP_IF_FALSE = 35  # target, pops the condition
+    MATCH = 36  # targets by discriminant, pushes the enum payload
+    BIND = 37  # (field offset, slot) -> frame[slot] = field of the payload
+    RAISE = 38  # exception, raised when executed
+
+
+MATH_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.floordiv,
+    "%": operator.mod,
+}
+
+COMPARE_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+class Code:
+    """Bytecode of one function."""
+
+    def __init__(self, name: str, frame_size: int, param_count: int):
+        self.name = name
+        self.frame_size = frame_size
+        self.param_count = param_count
+        self.opcodes: List[int] = []
+        self.arguments: List[Any] = []
+        # source offset of the statement each instruction belongs to
+        self.contexts: List[ParseContext] = []
+        # names of the variables in each slot, for the disassembler
+        self.slot_names: List[List[str]] = [[] for _ in range(frame_size)]
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+
+class Compiler:
+    """Compiles one function body into a Code object."""
+
+    def __init__(self, global_scope: GlobalScope, code: Code):
+        self.global_scope = global_scope
+        self.code = code
+        self.context: ParseContext = -1
+        # (start of the loop, jumps to patch with the end of the loop)
+        self.loops: List[Tuple[int, List[int]]] = []
+        # slots of the reference parameters, they hold a Reference if a
+        # primitive was passed
+        self.reference_slots: Set[int] = set()
+
+    def emit(self, opcode: Opcode, argument: Any = None) -> int:
+        self.code.opcodes.append(int(opcode))
+        self.code.arguments.append(argument)
+        self.code.contexts.append(self.context)
+        return len(self.code) - 1
+
+    def patch(self, position: int, target: Any):
+        self.code.arguments[position] = target
+
+    def name_slot(self, slot: Optional[int], name: str):
+        if slot is not None and name not in self.code.slot_names[slot]:
+            self.code.slot_names[slot].append(name)
+
+    def statements(self, statements: List[Statement]):
+        for statement in statements:
+            self.statement(statement)
+
+    def statement(self, statement: Statement):
+        self.context = statement.context
+        if isinstance(statement, VariableDeclaration):
+            self.name_slot(statement.slot, statement.name)
+            variable_type = statement.variable_type
+            if variable_type.variable_type == VariableTypeEnum.PRIMITIVE:
+                # primitives are immutable, the default value is a constant
+                self.emit(Opcode.CONST, default_primitive_value(variable_type))
+            else:
+                self.emit(Opcode.DEFAULT, variable_type)
+            self.emit(Opcode.STORE, statement.slot)
+        elif isinstance(statement, VariableDefinition):
+            self.name_slot(statement.slot, statement.name)
+            self.stored_value(statement.value)
+            self.emit(Opcode.STORE, statement.slot)
+        elif isinstance(statement, VariableAssign):
+            self.variable_assign(statement)
+        elif isinstance(statement, (FunctionCall, VariableAccess)):
+            self.expression(statement)
+            self.emit(Opcode.POP)
+        elif isinstance(statement, Loop):
+            start = len(self.code)
+            self.loops.append((start, []))
+            self.statements(statement.statements)
+            self.emit(Opcode.JUMP, start)
+            _, break_jumps = self.loops.pop()
+            for jump in break_jumps:
+                self.patch(jump, len(self.code))
+        elif isinstance(statement, If):
+            self.if_statement(statement)
+        elif isinstance(statement, Match):
+            self.match_statement(statement)
+        elif isinstance(statement, Return):
+            if isinstance(statement.value, FunctionCall) and (
+                statement.value.function_name in self.global_scope.functions
+            ):
+                self.function_call(statement.value, Opcode.TAIL_CALL)
+            elif statement.value:
+                self.expression(statement.value)
+                self.emit(Opcode.RETURN)
+            else:
+                self.emit(Opcode.RETURN_NONE)
+        elif isinstance(statement, Continue):
+            self.emit(Opcode.JUMP, self.loops[-1][0])
+        elif isinstance(statement, Break):
+            self.loops[-1][1].append(self.emit(Opcode.JUMP))
+        else:
+            raise InternalCompilerError("unhandled statement")
+
+    def stored_value(self, expression: BaseExpression):
+        """Pushes the value of expression as it is stored in a variable,
+        member or field, only enums are copied, see Runtime.stored."""
+        self.expression(expression)
+        value_type = expression.type
+        if value_type is None or value_type.variable_type == VariableTypeEnum.ENUM:
+            self.emit(Opcode.COPY)
+
+    def variable_assign(self, statement: VariableAssign):
+        self.expression(statement.value)
+        variable_access = statement.variable_access
+        slot = variable_access.slot
+        is_primitive = (
+            variable_access.type is not None
+            and variable_access.type.variable_type == VariableTypeEnum.PRIMITIVE
+        )
+        if slot is None:
+            # an enum access, it is not stored anywhere
+            self.emit(Opcode.POP)
+        elif (
+            is_primitive
+            and slot not in self.reference_slots
+            and variable_access.array_access is None
+            and variable_access.variable_access is None
+        ):
+            self.name_slot(slot, variable_access.variable_name)
+            self.emit(Opcode.STORE, slot)
+        else:
+            self.locate(variable_access)
+            # the location holds a primitive, there is no Value to update
+            self.emit(Opcode.STORE_ITEM if is_primitive else Opcode.ASSIGN)
+
+    def if_statement(self, statement: If):
+        # the validation pass checked that all conditions are bool
+        branches = [(statement.condition, statement.statements)] + [
+            (elif_statement.condition, elif_statement.statements)
+            for elif_statement in statement.elif_statements
+        ]
+        end_jumps = []
+        for condition, statements in branches:
+            self.expression(condition)
+            next_branch = self.emit(Opcode.JUMP_IF_FALSE)
+            self.statements(statements)
+            end_jumps.append(self.emit(Opcode.JUMP))
+            self.patch(next_branch, len(self.code))
+        if statement.else_statement:
+            self.statements(statement.else_statement.statements)
+        for jump in end_jumps:
+            self.patch(jump, len(self.code))
+
+    def match_statement(self, statement: Match):
+        if statement.arm_table is None:
+            raise InternalCompilerError("Match statement was not validated")
+        self.expression(statement.scrutinee)
+        match = self.emit(Opcode.MATCH)
+        arm_targets = []
+        end_jumps = []
+        for arm in statement.arms:
+            pattern = arm.pattern
+            arm_targets.append(len(self.code))
+            for binding, offset, slot in zip(
+                pattern.bindings, pattern.binding_offsets, pattern.binding_slots
+            ):
+                self.name_slot(slot, binding)
+                self.emit(Opcode.BIND, (offset, slot))
+            self.emit(Opcode.POP)  # the payload
+            self.statements(arm.statements)
+            end_jumps.append(self.emit(Opcode.JUMP))
+        self.patch(match, [arm_targets[arm] for arm in statement.arm_table])
+        for jump in end_jumps:
+            self.patch(jump, len(self.code))
+
+    def expression(self, expression: BaseExpression):
+        if isinstance(expression, FunctionCall):
+            self.function_call(expression)
+        elif isinstance(expression, VariableAccess):
+            self.variable_access(expression)
+        elif isinstance(expression, Constant):
+            if not expression.type:
+                raise InternalCompilerError("Expression type not set")
+            self.emit(Opcode.CONST, expression.value)
+        elif isinstance(expression, MathOperation):
+            self.expression(expression.operand1)
+            self.expression(expression.operand2)
+            if expression.operator not in MATH_OPERATORS:
+                raise InternalCompilerError("Unknown operator")
+            self.emit(
+                Opcode.MATH,
+                (MATH_OPERATORS[expression.operator], expression.operator),
+            )
+        elif isinstance(expression, CompareOperation):
+            self.compare_operation(expression)
+        elif isinstance(expression, UnaryOperation):
+            self.expression(expression.operand)
+            if expression.operator == "not":
+                self.emit(Opcode.NOT)
+            elif expression.operator == "-":
+                self.emit(Opcode.NEGATE)
+            else:
+                raise InternalCompilerError(
+                    f"Unknown unary operator: {expression.operator}"
+                )
+        elif isinstance(expression, StructInitialization):
+            self.field_inits(expression.field_inits)
+            self.emit(
+                Opcode.STRUCT_INIT,
+                (expression.struct_name, *self.field_offsets(expression.field_inits)),
+            )
+        elif isinstance(expression, EnumVariantInitialization):
+            self.field_inits(expression.field_inits)
+            self.emit(
+                Opcode.ENUM_INIT,
+                (
+                    expression.enum_name,
+                    expression.variant_name,
+                    *self.field_offsets(expression.field_inits),
+                ),
+            )
+        else:
+            raise InternalCompilerError("Unknown expression")
+
+    def compare_operation(self, expression: CompareOperation):
+        self.expression(expression.operand1)
+        self.expression(expression.operand2)
+        operand_type = expression.operand1.type
+        if not operand_type:
+            raise InternalCompilerError("Expression type not set")
+        if operand_type.variable_type == VariableTypeEnum.ENUM:
+            self.emit(Opcode.ENUM_COMPARE, expression.operator)
+        elif operand_type.primitive_type in (
+            PrimitiveType.STRING,
+            PrimitiveType.BOOL,
+        ) and expression.operator not in ("==", "!="):
+            self.emit(
+                Opcode.RAISE,
+                Exception(f"invalid operator for type {operand_type.primitive_type}"),
+            )
+        elif expression.operator not in COMPARE_OPERATORS:
+            raise InternalCompilerError("Unknown operator")
+        else:
+            self.emit(
+                Opcode.COMPARE,
+                (COMPARE_OPERATORS[expression.operator], expression.operator),
+            )
+
+    def field_inits(self, field_inits):
+        for field_init in field_inits:
+            self.expression(field_init.value)
+
+    def field_offsets(self, field_inits) -> Tuple[List[int], List[str]]:
+        """The offsets of the initialized fields, with their names for the
+        disassembler."""
+        return (
+            [field_init.offset for field_init in field_inits],
+            [field_init.field_name for field_init in field_inits],
+        )
+
+    def variable_access(self, variable_access: VariableAccess):
+        slot = variable_access.slot
+        if slot is None:
+            self.enum_access(variable_access)
+            return
+        self.name_slot(slot, variable_access.variable_name)
+        method_call = variable_access.method_call
+        value_type = variable_access.type
+        if method_call is not None:
+            value_type = method_call.receiver_type
+            if value_type is None:
+                raise InternalCompilerError("Method call was not validated")
+            if (
+                value_type.primitive_type == PrimitiveType.STRING
+                and method_call.function_name == "append"
+            ):
+                # strings are immutable, the receiver is replaced
+                self.locate(variable_access)
+                self.call_arguments(self.method(method_call), method_call)
+                self.emit(Opcode.STRING_APPEND, method_call)
+                return
+        if slot in self.reference_slots:
+            self.emit(Opcode.LOAD_REF, slot)
+        else:
+            self.emit(Opcode.LOAD, slot)
+        self.access(variable_access)
+        if value_type is None or value_type.primitive_type == PrimitiveType.STRING:
+            self.emit(Opcode.STRING)
+        if method_call is not None:
+            method = self.method(method_call)
+            self.call_arguments(method, method_call)
+            self.emit(Opcode.CALL_METHOD, (method_call, len(method.function_params)))
+
+    def access(self, variable_access: VariableAccess):
+        """Replaces the value on top of the stack with the element and member
+        that variable_access accesses, the element comes first."""
+        if variable_access.array_access is not None:
+            self.expression(variable_access.array_access)
+            self.emit(Opcode.INDEX)
+        member_access = variable_access.variable_access
+        if member_access is not None:
+            self.emit(Opcode.MEMBER, member_access.offset)
+            self.access(member_access)
+
+    def locate(self, variable_access: VariableAccess):
+        """Pushes the container and key of the accessed variable, member or
+        element, for assigning it or passing it to a reference parameter."""
+        slot = variable_access.slot
+        self.name_slot(slot, variable_access.variable_name)
+        if slot in self.reference_slots:
+            self.emit(Opcode.LOCATE_REF, slot)
+        else:
+            self.emit(Opcode.LOCATE, slot)
+        self.locate_access(variable_access)
+
+    def locate_access(self, variable_access: VariableAccess):
+        if variable_access.array_access is not None:
+            self.expression(variable_access.array_access)
+            self.emit(Opcode.LOCATE_INDEX)
+        member_access = variable_access.variable_access
+        if member_access is not None:
+            self.emit(Opcode.LOCATE_MEMBER, member_access.offset)
+            self.locate_access(member_access)
+
+    def enum_access(self, variable_access: VariableAccess):
+        enum_name = variable_access.variable_name
+        if enum_name not in self.global_scope.enums:
+            # no slot and not an enum, the validation pass did not run
+            self.emit(
+                Opcode.RAISE,
+                ContextException(
+                    f"Unknown variable: {enum_name}", variable_access.context
+                ),
+            )
+        elif variable_access.variable_access is None:
+            self.emit(
+                Opcode.RAISE,
+                ContextException(
+                    "Enum access must specify a member", variable_access.context
+                ),
+            )
+        else:
+            entry_name = variable_access.variable_access.variable_name
+            self.emit(Opcode.ENUM_VALUE, (enum_name, entry_name))
+
+    def call_arguments(self, function: BaseFunction, function_call: FunctionCall):
+        """Pushes the arguments, returns the number of arguments that pin a
+        location, see Runtime.reference_argument."""
+        try:
+            bound_arguments = bind_call_arguments(
+                function_call, function.function_params, function_call.function_name
+            )
+        except ContextException as ex:
+            self.emit(Opcode.RAISE, ex)
+            return 0
+        pinned_arguments = 0
+        for argument_expr, param in bound_arguments:
+            if param.reference and not isinstance(argument_expr, VariableAccess):
+                self.emit(
+                    Opcode.RAISE,
+                    ContextException(
+                        "Reference parameters can only be variables",
+                        argument_expr.context,
+                    ),
+                )
+                return pinned_arguments
+            argument_type = argument_expr.type
+            is_primitive = (
+                argument_type is not None
+                and argument_type.variable_type == VariableTypeEnum.PRIMITIVE
+            )
+            if param.reference:
+                assert isinstance(argument_expr, VariableAccess)
+                if argument_expr.slot is None:
+                    # an enum access, the Value is passed
+                    self.enum_access(argument_expr)
+                    continue
+                self.locate(argument_expr)
+                self.emit(Opcode.REFERENCE)
+                if is_primitive:
+                    pinned_arguments += 1
+            else:
+                self.expression(argument_expr)
+                if not is_primitive:
+                    # primitives are immutable, the others are copied
+                    self.emit(Opcode.LAZY_COPY)
+        return pinned_arguments
+
+    def function_call(
+        self, function_call: FunctionCall, call_opcode: Opcode = Opcode.CALL
+    ):
+        function_name = function_call.function_name
+        function: BaseFunction
+        if function_name in self.global_scope.functions:
+            function = self.global_scope.functions[function_name]
+        elif function_name in BUILTIN_FUNCTIONS:
+            function = BUILTIN_FUNCTIONS[function_name]
+        else:
+            self.emit(
+                Opcode.RAISE, Exception(f"Unknown function called: {function_name}")
+            )
+            return
+        pinned_arguments = self.call_arguments(function, function_call)
+        argument_count = len(function.function_params)
+        if isinstance(function, BuiltinFunction):
+            self.emit(Opcode.CALL_BUILTIN, (function_call, argument_count))
+        else:
+            self.emit(call_opcode, (function_name, argument_count, pinned_arguments))
+
+    def method(self, method_call: FunctionCall) -> BaseFunction:
+        receiver_type = method_call.receiver_type
+        if receiver_type is None:
+            raise InternalCompilerError("Method call was not validated")
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            methods = get_builtin_array_methods()
+        else:
+            methods = get_builtin_primitive_methods()[receiver_type.primitive_type]
+        return methods[method_call.function_name]
+
+
+def compile_function(global_scope: GlobalScope, function: Function) -> Code:
+    code = Code(function.name, function.frame_size, len(function.function_params))
+    for slot, param in enumerate(function.function_params):
+        code.slot_names[slot].append(param.name)
+    compiler = Compiler(global_scope, code)
+    compiler.reference_slots = {
+        slot for slot, param in enumerate(function.function_params) if param.reference
+    }
+    compiler.statements(function.statements)
+    compiler.context = function.context
+    compiler.emit(Opcode.RETURN_NONE)
+    return code
+
+
+def type_name(variable_type: VariableType) -> str:
+    if variable_type.variable_type == VariableTypeEnum.ARRAY:
+        assert variable_type.array_type
+        return f"[{type_name(variable_type.array_type)}]"
+    elif variable_type.variable_type == VariableTypeEnum.PRIMITIVE:
+        assert variable_type.primitive_type
+        return variable_type.primitive_type.name.lower()
+    return str(variable_type.type_name)
+
+
+def format_argument(code: Code, opcode: Opcode, argument: Any) -> str:
+    if opcode in (
+        Opcode.LOAD,
+        Opcode.LOAD_REF,
+        Opcode.STORE,
+        Opcode.LOCATE,
+        Opcode.LOCATE_REF,
+    ):
+        return f"{argument} ({'/'.join(code.slot_names[argument])})"
+    elif opcode == Opcode.CONST:
+        return repr(argument)
+    elif opcode in (Opcode.JUMP, Opcode.JUMP_IF_FALSE):
+        return f"-> {argument}"
+    elif opcode in (Opcode.MATH, Opcode.COMPARE):
+        return argument[1]
+    elif opcode == Opcode.DEFAULT:
+        return type_name(argument)
+    elif opcode == Opcode.ENUM_VALUE:
+        return f"{argument[0]}.{argument[1]}"
+    elif opcode == Opcode.STRUCT_INIT:
+        return f"{argument[0]} ({', '.join(argument[2])})"
+    elif opcode == Opcode.ENUM_INIT:
+        return f"{argument[0]}.{argument[1]} ({', '.join(argument[3])})"
+    elif opcode in (Opcode.CALL, Opcode.TAIL_CALL):
+        return f"{argument[0]} ({argument[1]} arguments)"
+    elif opcode in (Opcode.CALL_BUILTIN, Opcode.CALL_METHOD):
+        return f"{argument[0].function_name} ({argument[1]} arguments)"
+    elif opcode == Opcode.STRING_APPEND:
+        return argument.function_name
+    elif opcode == Opcode.MATCH:
+        return ", ".join(
+            f"{discriminant} -> {target}"
+            for discriminant, target in enumerate(argument)
+        )
+    elif opcode == Opcode.BIND:
+        offset, slot = argument
+        return f"{offset} -> {slot} ({'/'.join(code.slot_names[slot])})"
+    elif opcode == Opcode.RAISE:
+        return repr(str(argument))
+    elif argument is None:
+        return ""
+    return str(argument)
+
+
+def disassemble(code: Code, line_table: Optional[LineTable] = None) -> str:
+    """Human readable listing of the instructions, with the source line of
+    the statements if a line table is given."""
+    lines = [f"func {code.name} (frame size {code.frame_size}):"]
+    previous_line = None
+    for position, (opcode_value, argument, context) in enumerate(
+        zip(code.opcodes, code.arguments, code.contexts)
+    ):
+        opcode = Opcode(opcode_value)
+        line = ""
+        if line_table is not None:
+            line_number = line_table.line_column(context)[0]
+            if line_number != previous_line:
+                line = str(line_number)
+                previous_line = line_number
+        text = f"{line:>6} {position:>5}  {opcode.name:<14}"
+        lines.append(f"{text}{format_argument(code, opcode, argument)}".rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,1380 @@
+"""Native backend that lowers validated programs to C and builds them with cc.
+
+Supported are programs that use primitives, structs, arrays and enums whose
+variants have no fields. Integers have the fixed width of their
+PrimitiveType and wrap around, f32 is a C double like the Python floats of
+the interpreters. Division and modulo round
+towards negative infinity like in the interpreters. Strings are immutable
+byte strings and chars are bytes, so only ASCII characters are supported.
+
+Structs are C structs with value semantics, arrays are pointers to a growable
+buffer. Values passed by value are copied deeply, like in the interpreters.
+The interpreters share a struct or array between all the variables, members
+and elements it is stored in. A struct or array read from a variable, member
+or element and stored in a second place is copied instead. This is only
+allowed where the sharing can not be observed, see CGenerator.stored.
+Memory is never freed, the programs are expected to be short-lived.
+
+Runtime errors are written to stderr with their parse context and reported
+by NativeEngine as ContextExceptions.
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
+
+from xlang.callgraph import CallGraph, iter_nodes
+from xlang.exceptions import (
+    ContextException,
+    InternalCompilerError,
+    InterpreterAssertionError,
+)
+from xlang.program_cache import ProgramCache
+from xlang.utils import bind_call_arguments
+from xlang.xl_ast import (
+    BaseExpression,
+    BaseFunction,
+    Break,
+    CompareOperation,
+    Constant,
+    ConstantType,
+    Continue,
+    EnumType,
+    EnumVariantInitialization,
+    Function,
+    FunctionCall,
+    GlobalScope,
+    If,
+    Loop,
+    MathOperation,
+    Match,
+    Node,
+    ParseContext,
+    PrimitiveType,
+    Return,
+    Statement,
+    StructInitialization,
+    StructType,
+    UnaryOperation,
+    VariableAccess,
+    VariableAssign,
+    VariableDeclaration,
+    VariableDefinition,
+    VariableType,
+    VariableTypeEnum,
+)
+from xlang.xl_builtins import (
+    get_builtin_array_methods,
+    get_builtin_functions,
+    get_builtin_primitive_methods,
+)
+from xlang.xl_types import primitive
+
+C_TYPES = {
+    PrimitiveType.I8: "int8_t",
+    PrimitiveType.I16: "int16_t",
+    PrimitiveType.I32: "int32_t",
+    PrimitiveType.I64: "int64_t",
+    PrimitiveType.U8: "uint8_t",
+    PrimitiveType.U16: "uint16_t",
+    PrimitiveType.U32: "uint32_t",
+    PrimitiveType.U64: "uint64_t",
+    PrimitiveType.F32: "double",
+    PrimitiveType.BOOL: "bool",
+    PrimitiveType.CHAR: "char",
+    PrimitiveType.STRING: "xl_string",
+}
+
+SIGNED_TYPES = (
+    PrimitiveType.I8,
+    PrimitiveType.I16,
+    PrimitiveType.I32,
+    PrimitiveType.I64,
+)
+UNSIGNED_TYPES = (
+    PrimitiveType.U8,
+    PrimitiveType.U16,
+    PrimitiveType.U32,
+    PrimitiveType.U64,
+)
+WIDE_UNSIGNED_TYPES = (PrimitiveType.U32, PrimitiveType.U64)
+
+# prefix of the error lines the native program writes to stderr
+ERROR_MARKER = "xlang-error"
+
+RUNTIME = r"""#include <math.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef struct {
+    int64_t length;
+    const char *data;
+} xl_string;
+
+static _Noreturn void xl_fail(int64_t context, const char *kind, const char *message) {
+    fflush(stdout);
+    fprintf(stderr, "\n" "%s %lld %s %s\n", "xlang-error", (long long)context, kind, message);
+    exit(1);
+}
+
+static void xl_assert(bool value, int64_t context) {
+    if (!value) {
+        xl_fail(context, "assert", "assertion failed");
+    }
+}
+
+static void *xl_alloc(size_t size) {
+    void *memory = calloc(1, size ? size : 1);
+    if (!memory) {
+        xl_fail(-1, "error", "out of memory");
+    }
+    return memory;
+}
+
+static int64_t xl_floordiv(int64_t a, int64_t b, int64_t context) {
+    if (b == 0) {
+        xl_fail(context, "error", "integer division or modulo by zero");
+    }
+    int64_t quotient = a / b;
+    if (a % b != 0 && ((a < 0) != (b < 0))) {
+        quotient--;
+    }
+    return quotient;
+}
+
+static int64_t xl_mod(int64_t a, int64_t b, int64_t context) {
+    if (b == 0) {
+        xl_fail(context, "error", "integer division or modulo by zero");
+    }
+    int64_t remainder = a % b;
+    if (remainder != 0 && ((remainder < 0) != (b < 0))) {
+        remainder += b;
+    }
+    return remainder;
+}
+
+static uint64_t xl_udiv(uint64_t a, uint64_t b, int64_t context) {
+    if (b == 0) {
+        xl_fail(context, "error", "integer division or modulo by zero");
+    }
+    return a / b;
+}
+
+static uint64_t xl_umod(uint64_t a, uint64_t b, int64_t context) {
+    if (b == 0) {
+        xl_fail(context, "error", "integer division or modulo by zero");
+    }
+    return a % b;
+}
+
+/* float // and % of Python, from float_divmod in CPython's floatobject.c */
+static double xl_ffloordiv(double a, double b, int64_t context) {
+    if (b == 0) {
+        xl_fail(context, "error", "float floor division by zero");
+    }
+    double remainder = fmod(a, b);
+    double quotient = (a - remainder) / b;
+    if (remainder != 0 && ((b < 0) != (remainder < 0))) {
+        quotient -= 1.0;
+    }
+    if (quotient == 0) {
+        return copysign(0.0, a / b);
+    }
+    double floored = floor(quotient);
+    if (quotient - floored > 0.5) {
+        floored += 1.0;
+    }
+    return floored;
+}
+
+static double xl_fmod(double a, double b, int64_t context) {
+    if (b == 0) {
+        xl_fail(context, "error", "float modulo");
+    }
+    double remainder = fmod(a, b);
+    if (remainder == 0) {
+        return copysign(0.0, b);
+    }
+    if ((remainder < 0) != (b < 0)) {
+        remainder += b;
+    }
+    return remainder;
+}
+
+/* -1, 0 or 1, comparing a signed with an unsigned 64 bit integer */
+static int xl_compare_signed_unsigned(int64_t a, uint64_t b) {
+    if (a < 0 || (uint64_t)a < b) {
+        return -1;
+    }
+    return (uint64_t)a == b ? 0 : 1;
+}
+
+static void xl_print_i64(int64_t value) {
+    printf("%lld\n", (long long)value);
+}
+
+static void xl_print_u64(uint64_t value) {
+    printf("%llu\n", (unsigned long long)value);
+}
+
+static void xl_print_bool(bool value) {
+    puts(value ? "true" : "false");
+}
+
+static void xl_print_char(char value) {
+    putchar(value);
+    putchar('\n');
+}
+
+static void xl_print_string(xl_string value) {
+    fwrite(value.data, 1, (size_t)value.length, stdout);
+    putchar('\n');
+}
+
+/* Formats like Python's repr() of the shortest decimal that reads back as
+   the same double. */
+static void xl_print_f32(double value) {
+    if (isnan(value)) {
+        puts("nan");
+        return;
+    }
+    if (isinf(value)) {
+        puts(value > 0 ? "inf" : "-inf");
+        return;
+    }
+    char scientific[48];
+    for (int precision = 1; precision <= 17; precision++) {
+        snprintf(scientific, sizeof scientific, "%.*e", precision - 1, value);
+        if (strtod(scientific, NULL) == value) {
+            break;
+        }
+    }
+    char digits[32];
+    int digit_count = 0;
+    const char *position = scientific;
+    bool negative = *position == '-';
+    if (negative) {
+        position++;
+    }
+    for (; *position != 'e'; position++) {
+        if (*position != '.') {
+            digits[digit_count++] = *position;
+        }
+    }
+    int exponent = atoi(position + 1);
+    while (digit_count > 1 && digits[digit_count - 1] == '0') {
+        digit_count--;
+    }
+    digits[digit_count] = '\0';
+    if (negative) {
+        putchar('-');
+    }
+    if (exponent >= 16 || exponent < -4) {
+        putchar(digits[0]);
+        if (digit_count > 1) {
+            printf(".%s", digits + 1);
+        }
+        printf("e%c%02d\n", exponent < 0 ? '-' : '+', abs(exponent));
+    } else if (exponent < 0) {
+        fputs("0.", stdout);
+        for (int i = -1; i > exponent; i--) {
+            putchar('0');
+        }
+        printf("%s\n", digits);
+    } else {
+        for (int i = 0; i <= exponent; i++) {
+            putchar(i < digit_count ? digits[i] : '0');
+        }
+        printf(".%s\n", digit_count > exponent + 1 ? digits + exponent + 1 : "0");
+    }
+}
+
+static bool xl_string_equal(xl_string a, xl_string b) {
+    return a.length == b.length && memcmp(a.data, b.data, (size_t)a.length) == 0;
+}
+
+static char xl_string_at(xl_string string, int64_t index, int64_t context) {
+    if (index < 0 || index >= string.length) {
+        xl_fail(context, "error", "String index out of bounds");
+    }
+    return string.data[index];
+}
+
+static xl_string xl_string_concat(xl_string a, xl_string b) {
+    char *data = xl_alloc((size_t)(a.length + b.length));
+    memcpy(data, a.data, (size_t)a.length);
+    memcpy(data + a.length, b.data, (size_t)b.length);
+    return (xl_string){a.length + b.length, data};
+}
+
+static xl_string xl_string_append_char(xl_string string, char value) {
+    return xl_string_concat(string, (xl_string){1, &value});
+}
+
+static xl_string xl_string_map(xl_string string, int (*map)(int)) {
+    char *data = xl_alloc((size_t)string.length);
+    for (int64_t i = 0; i < string.length; i++) {
+        data[i] = (char)map((unsigned char)string.data[i]);
+    }
+    return (xl_string){string.length, data};
+}
+
+static int xl_lower(int c) {
+    return c >= 'A' && c <= 'Z' ? c + 32 : c;
+}
+
+static int xl_upper(int c) {
+    return c >= 'a' && c <= 'z' ? c - 32 : c;
+}
+"""
+
+
+def c_string(data: bytes) -> str:
+    """C string literal of the bytes."""
+    characters = []
+    for byte in data:
+        if byte in b'"\\?':
+            characters.append("\\" + chr(byte))
+        elif 32 <= byte < 127:
+            characters.append(chr(byte))
+        else:
+            characters.append(f"\\{byte:03o}")
+    return '"' + "".join(characters) + '"'
+
+
+def member_name(name: str) -> str:
+    # members are prefixed, xlang names can be C keywords
+    return f"m_{name}"
+
+
+SHARED_ERROR = (
+    "Structs and arrays stored in more than one variable, member or element "
+    "are only supported by the native backend if neither is changed afterwards"
+)
+
+# store target of the values of return statements, see CGenerator.stored
+RETURNED = "<returned>"
+
+
+def local_name(name: str, slot: Optional[int]) -> str:
+    return f"v_{name}_{slot}"
+
+
+def root_name(variable_access: VariableAccess) -> str:
+    """The local that an access chain starts at."""
+    return local_name(variable_access.variable_name, variable_access.slot)
+
+
+class CGenerator:
+    """Generates the C program of a validated program."""
+
+    def __init__(self, global_scope: GlobalScope):
+        self.global_scope = global_scope
+        # array types by name, in the order they are used
+        self.array_types: Dict[str, VariableType] = {}
+        self.lines: List[str] = []
+        self.indent = 0
+        # per function: reference parameters, types of the locals
+        self.references: Set[str] = set()
+        self.local_types: Dict[str, VariableType] = {}
+        self.temporaries = 0
+        # per function, see stored: the nodes that change each local, the
+        # locals that are returned and the source ranges of the loops
+        self.changes: Dict[str, List[Node]] = {}
+        self.returned: Set[str] = set()
+        self.loop_ranges: List[Tuple[ParseContext, ParseContext]] = []
+        # the statement that is generated and the local it stores its value
+        # in, RETURNED if the value is returned, None if it is copied
+        self.statement_node: Optional[Statement] = None
+        self.store_target: Optional[str] = None
+
+    def line(self, text: str):
+        self.lines.append("    " * self.indent + text if text else "")
+
+    def program(self) -> str:
+        if "main" not in self.global_scope.functions:
+            raise Exception("No main function found")
+        functions = []
+        for function_name in CallGraph(self.global_scope).reachable():
+            function = self.global_scope.functions[function_name]
+            assert isinstance(function, Function)
+            functions.append(function)
+
+        # function bodies first, they collect the array types
+        for function in functions:
+            self.function(function)
+        function_lines = self.lines
+        self.lines = []
+        for struct_type in self.global_scope.structs.values():
+            self.struct_functions(struct_type)
+        # array functions can add the arrays of their elements
+        generated: Set[str] = set()
+        while len(generated) < len(self.array_types):
+            for name, array_type in list(self.array_types.items()):
+                if name not in generated:
+                    generated.add(name)
+                    self.array_functions(name, array_type)
+        helper_lines = self.lines
+
+        self.lines = [RUNTIME]
+        self.type_definitions()
+        for function in functions:
+            self.line(f"static {self.signature(function)};")
+        self.line("")
+        self.lines.extend(helper_lines)
+        self.lines.extend(function_lines)
+        self.line("int main(void) {")
+        self.line("    xl_main();")
+        self.line("    return 0;")
+        self.line("}")
+        return "\n".join(self.lines) + "\n"
+
+    def type_definitions(self):
+        for enum_type in self.global_scope.enums.values():
+            if self.is_fixed_enum(enum_type):
+                self.enum_definition(enum_type)
+        for struct_type in self.global_scope.structs.values():
+            self.line(
+                f"typedef struct xl_s_{struct_type.name} xl_s_{struct_type.name};"
+            )
+        for name in self.array_types:
+            self.line(f"typedef struct {name} {name};")
+        self.line("")
+        for struct_type in self.struct_order():
+            self.line(f"struct xl_s_{struct_type.name} {{")
+            for member in struct_type.members:
+                member_type = self.c_type(member.param_type, member.context)
+                self.line(f"    {member_type} {member_name(member.name)};")
+            if not struct_type.members:
+                self.line("    char empty;")
+            self.line("};")
+            self.line("")
+        for name, array_type in self.array_types.items():
+            assert array_type.array_type
+            element_type = self.c_type(array_type.array_type, -1)
+            self.line(f"struct {name} {{")
+            self.line("    int64_t length;")
+            self.line("    int64_t capacity;")
+            self.line(f"    {element_type} *data;")
+            self.line("};")
+            self.line("")
+        for struct_type in self.global_scope.structs.values():
+            struct_name = f"xl_s_{struct_type.name}"
+            self.line(f"static {struct_name} xl_default_s_{struct_type.name}(void);")
+            self.line(
+                f"static {struct_name} xl_copy_s_{struct_type.name}({struct_name} value);"
+            )
+        for name, array_type in self.array_types.items():
+            assert array_type.array_type
+            element_type = self.c_type(array_type.array_type, -1)
+            self.line(f"static {name} *{name}_new(void);")
+            self.line(f"static {name} *{name}_copy({name} *array);")
+            self.line(
+                f"static void {name}_append({name} *array, {element_type} value);"
+            )
+            self.line(
+                f"static {element_type} *{name}_at({name} *array, int64_t index, int64_t context);"
+            )
+        self.line("")
+
+    def is_fixed_enum(self, enum_type: EnumType) -> bool:
+        return all(not entry.fields for entry in enum_type.entries.values())
+
+    def fixed_enum(self, enum_name: str) -> EnumType:
+        enum_type = self.global_scope.enums[enum_name]
+        if not self.is_fixed_enum(enum_type):
+            raise ContextException(
+                f"Enum {enum_name} has variants with fields, not supported by the "
+                "native backend",
+                enum_type.context,
+            )
+        return enum_type
+
+    def enum_definition(self, enum_type: EnumType):
+        constants = ", ".join(
+            f"XL_{enum_type.name}_{entry_name}" for entry_name in enum_type.entries
+        )
+        self.line(f"enum {{ {constants} }};")
+        names = ", ".join(
+            c_string(entry_name.encode()) for entry_name in enum_type.entries
+        )
+        self.line(
+            f"static const char *const xl_e_{enum_type.name}_names[] = {{ {names} }};"
+        )
+
+    def struct_order(self) -> List[StructType]:
+        """Structs after the structs they contain by value."""
+        ordered: List[StructType] = []
+        visiting: Set[str] = set()
+
+        def visit(struct_type: StructType):
+            if struct_type in ordered:
+                return
+            if struct_type.name in visiting:
+                raise ContextException(
+                    f"Struct {struct_type.name} contains itself", struct_type.context
+                )
+            visiting.add(struct_type.name)
+            for member in struct_type.members:
+                if member.param_type.variable_type == VariableTypeEnum.STRUCT:
+                    assert member.param_type.type_name
+                    visit(self.global_scope.structs[member.param_type.type_name])
+            visiting.remove(struct_type.name)
+            ordered.append(struct_type)
+
+        for struct_type in self.global_scope.structs.values():
+            visit(struct_type)
+        return ordered
+
+    def c_type(self, variable_type: VariableType, context: ParseContext) -> str:
+        base_type = variable_type.variable_type
+        if base_type == VariableTypeEnum.PRIMITIVE:
+            assert variable_type.primitive_type
+            return C_TYPES[variable_type.primitive_type]
+        elif base_type == VariableTypeEnum.ARRAY:
+            return f"{self.array_name(variable_type, context)} *"
+        elif base_type == VariableTypeEnum.STRUCT:
+            return f"xl_s_{variable_type.type_name}"
+        elif base_type == VariableTypeEnum.ENUM:
+            assert variable_type.type_name
+            self.fixed_enum(variable_type.type_name)
+            return "int32_t"
+        raise ContextException("Type not supported by the native backend", context)
+
+    def type_id(self, variable_type: VariableType) -> str:
+        if variable_type.variable_type == VariableTypeEnum.PRIMITIVE:
+            assert variable_type.primitive_type
+            return variable_type.primitive_type.name.lower()
+        elif variable_type.variable_type == VariableTypeEnum.ARRAY:
+            assert variable_type.array_type
+            return f"a_{self.type_id(variable_type.array_type)}"
+        elif variable_type.variable_type == VariableTypeEnum.STRUCT:
+            return f"s_{variable_type.type_name}"
+        return f"e_{variable_type.type_name}"
+
+    def array_name(self, variable_type: VariableType, context: ParseContext) -> str:
+        assert variable_type.array_type
+        # checks that the element type is supported
+        self.c_type(variable_type.array_type, context)
+        name = f"xl_{self.type_id(variable_type)}"
+        self.array_types.setdefault(name, variable_type)
+        return name
+
+    def needs_copy(self, variable_type: VariableType) -> bool:
+        if variable_type.variable_type == VariableTypeEnum.ARRAY:
+            return True
+        elif variable_type.variable_type == VariableTypeEnum.STRUCT:
+            assert variable_type.type_name
+            struct_type = self.global_scope.structs[variable_type.type_name]
+            return any(
+                self.needs_copy(member.param_type) for member in struct_type.members
+            )
+        return False
+
+    def copied(self, value: str, variable_type: VariableType) -> str:
+        if not self.needs_copy(variable_type):
+            return value
+        if variable_type.variable_type == VariableTypeEnum.ARRAY:
+            return f"{self.array_name(variable_type, -1)}_copy({value})"
+        return f"xl_copy_s_{variable_type.type_name}({value})"
+
+    def struct_functions(self, struct_type: StructType):
+        struct_name = f"xl_s_{struct_type.name}"
+        self.line(f"static {struct_name} xl_default_s_{struct_type.name}(void) {{")
+        values = [
+            f".{member_name(member.name)} = {self.member_default(member)}"
+            for member in struct_type.members
+        ]
+        self.line(f"    return ({struct_name}){{{', '.join(values)}}};")
+        self.line("}")
+        self.line("")
+        self.line(
+            f"static {struct_name} xl_copy_s_{struct_type.name}({struct_name} value) {{"
+        )
+        for member in struct_type.members:
+            if self.needs_copy(member.param_type):
+                member_value = f"value.{member_name(member.name)}"
+                self.line(
+                    f"    {member_value} = {self.copied(member_value, member.param_type)};"
+                )
+        self.line("    return value;")
+        self.line("}")
+        self.line("")
+
+    def array_functions(self, name: str, array_type: VariableType):
+        element = array_type.array_type
+        assert element
+        element_type = self.c_type(element, -1)
+        self.line(f"static {name} *{name}_new(void) {{")
+        self.line(f"    return xl_alloc(sizeof({name}));")
+        self.line("}")
+        self.line("")
+        self.line(f"static void {name}_append({name} *array, {element_type} value) {{")
+        self.line("    if (array->length == array->capacity) {")
+        self.line(
+            "        array->capacity = array->capacity ? array->capacity * 2 : 8;"
+        )
+        self.line(
+            "        array->data = realloc(array->data, "
+            f"(size_t)array->capacity * sizeof({element_type}));"
+        )
+        self.line("        if (!array->data) {")
+        self.line('            xl_fail(-1, "error", "out of memory");')
+        self.line("        }")
+        self.line("    }")
+        self.line("    array->data[array->length++] = value;")
+        self.line("}")
+        self.line("")
+        self.line(f"static {name} *{name}_copy({name} *array) {{")
+        self.line(f"    {name} *copy = {name}_new();")
+        self.line("    for (int64_t i = 0; i < array->length; i++) {")
+        self.line(
+            f"        {name}_append(copy, {self.copied('array->data[i]', element)});"
+        )
+        self.line("    }")
+        self.line("    return copy;")
+        self.line("}")
+        self.line("")
+        self.line(
+            f"static {element_type} *{name}_at({name} *array, int64_t index, int64_t context) {{"
+        )
+        self.line("    if (index < 0 || index >= array->length) {")
+        self.line('        xl_fail(context, "error", "Array index out of bounds");')
+        self.line("    }")
+        self.line("    return &array->data[index];")
+        self.line("}")
+        self.line("")
+
+    def ordered_params(self, function: BaseFunction):
+        # bind_call_arguments binds the positional parameters first
+        return sorted(
+            enumerate(function.function_params),
+            key=lambda param: not param[1].positional_only,
+        )
+
+    def signature(self, function: Function) -> str:
+        return_type = (
+            self.c_type(function.return_type, function.context)
+            if function.return_type
+            else "void"
+        )
+        parameters = []
+        for slot, param in self.ordered_params(function):
+            param_type = self.c_type(param.param_type, param.context)
+            pointer = "*" if param.reference else ""
+            parameters.append(f"{param_type} {pointer}{local_name(param.name, slot)}")
+        return f"{return_type} xl_{function.name}({', '.join(parameters) or 'void'})"
+
+    def function(self, function: Function):
+        self.references = set()
+        self.local_types = {}
+        self.temporaries = 0
+        for slot, param in self.ordered_params(function):
+            name = local_name(param.name, slot)
+            self.local_types[name] = param.param_type
+            if param.reference:
+                self.references.add(name)
+        self.find_changes(function)
+        self.line(f"static {self.signature(function)} {{")
+        self.indent += 1
+        self.statements(function.statements)
+        if function.return_type:
+            self.line(
+                f'xl_fail({function.context}, "error", "Function returned no value");'
+            )
+        self.indent -= 1
+        self.line("}")
+        self.line("")
+
+    def block(self, statements: List[Statement]):
+        self.indent += 1
+        self.statements(statements)
+        self.indent -= 1
+        self.line("}")
+
+    def statements(self, statements: List[Statement]):
+        for statement in statements:
+            self.statement(statement)
+
+    def find_changes(self, function: Function):
+        """Collects the statements and calls of the function that change a
+        local, one of its members or one of its elements, the returned locals
+        and the loops."""
+        self.changes = {}
+        self.returned = set()
+        self.loop_ranges = []
+        for node in iter_nodes(function.statements):
+            if isinstance(node, VariableAssign):
+                self.add_change(node.variable_access, node)
+            elif isinstance(node, VariableAccess):
+                method_call = node.method_call
+                if method_call is not None and method_call.function_name == "append":
+                    self.add_change(node, node)
+            elif isinstance(node, FunctionCall):
+                for argument_expr, param in node.bound_arguments or ():
+                    if param.reference and isinstance(argument_expr, VariableAccess):
+                        self.add_change(argument_expr, node)
+            elif isinstance(node, Return):
+                if isinstance(node.value, VariableAccess):
+                    self.returned.add(root_name(node.value))
+            elif isinstance(node, Loop):
+                end = max(
+                    (inner.context for inner in iter_nodes(node.statements)),
+                    default=node.context,
+                )
+                self.loop_ranges.append((node.context, end))
+
+    def add_change(self, variable_access: VariableAccess, node: Node):
+        if variable_access.slot is not None:
+            self.changes.setdefault(root_name(variable_access), []).append(node)
+
+    def is_changed_after(self, name: str, statement: Statement) -> bool:
+        """Whether the local can be changed after the statement ran: by a
+        later statement, or by any statement of a loop around it."""
+        context = statement.context
+        loops = [
+            (start, end) for start, end in self.loop_ranges if start <= context <= end
+        ]
+        return any(
+            node is not statement
+            and (
+                node.context > context
+                or any(start <= node.context <= end for start, end in loops)
+            )
+            for node in self.changes.get(name, ())
+        )
+
+    def statement(self, statement: Statement):
+        self.statement_node = statement
+        self.store_target = None
+        if isinstance(statement, VariableDefinition):
+            self.store_target = local_name(statement.name, statement.slot)
+        elif isinstance(statement, VariableAssign):
+            self.store_target = root_name(statement.variable_access)
+        elif isinstance(statement, Return):
+            self.store_target = RETURNED
+
+        if isinstance(statement, VariableDeclaration):
+            self.define(
+                statement.name,
+                statement.slot,
+                statement.variable_type,
+                self.default_value(statement.variable_type, statement.context),
+                statement.context,
+            )
+        elif isinstance(statement, VariableDefinition):
+            self.define(
+                statement.name,
+                statement.slot,
+                statement.variable_type,
+                self.converted(self.stored(statement.value), statement.variable_type),
+                statement.context,
+            )
+        elif isinstance(statement, VariableAssign):
+            value = self.expression(self.stored(statement.value))
+            self.assign(statement.variable_access, value)
+        elif isinstance(statement, FunctionCall):
+            self.line(f"{self.function_call(statement)};")
+        elif isinstance(statement, VariableAccess):
+            method_call = statement.method_call
+            if (
+                method_call is not None
+                and method_call.function_name == "append"
+                and method_call.receiver_type is not None
+                and method_call.receiver_type.variable_type
+                == VariableTypeEnum.PRIMITIVE
+            ):
+                self.string_append(statement, method_call)
+            else:
+                self.line(f"{self.variable_access(statement)};")
+        elif isinstance(statement, Loop):
+            self.line("for (;;) {")
+            self.block(statement.statements)
+        elif isinstance(statement, If):
+            self.line(f"if ({self.expression(statement.condition)}) {{")
+            self.block(statement.statements)
+            for elif_statement in statement.elif_statements:
+                self.line(f"else if ({self.expression(elif_statement.condition)}) {{")
+                self.block(elif_statement.statements)
+            if statement.else_statement:
+                self.line("else {")
+                self.block(statement.else_statement.statements)
+        elif isinstance(statement, Match):
+            self.match_statement(statement)
+        elif isinstance(statement, Return):
+            if statement.value:
+                if self.is_referenced(statement.value):
+                    # the caller can change it after the function returned
+                    raise ContextException(SHARED_ERROR, statement.value.context)
+                self.line(f"return {self.expression(statement.value)};")
+            else:
+                self.line("return;")
+        elif isinstance(statement, Continue):
+            self.line("continue;")
+        elif isinstance(statement, Break):
+            self.line("break;")
+        else:
+            raise InternalCompilerError("unhandled statement")
+
+    def stored(self, expression: BaseExpression) -> BaseExpression:
+        """expression, if its value can be stored in a variable, member or
+        element.
+
+        Structs are C values, while the interpreters share a struct or array
+        between all places it is stored in. A struct or array read from a
+        local, member or element is copied. The copy and the original can
+        only be told apart if one of them is changed afterwards, so the local
+        it is read from and the local it is stored in must not be reference
+        parameters, must not be returned, and must not be assigned, appended
+        to or passed to a reference parameter, also through a member or
+        element, after the copy or in a loop around it. Struct
+        initializations in return statements can not copy."""
+        expression_type = expression.type
+        if not (
+            isinstance(expression, VariableAccess)
+            and expression.method_call is None
+            and expression_type is not None
+            and expression_type.variable_type
+            in (VariableTypeEnum.STRUCT, VariableTypeEnum.ARRAY)
+        ):
+            return expression
+        assert self.statement_node is not None
+        names = [root_name(expression)]
+        if self.store_target is not None:
+            names.append(self.store_target)
+        for name in names:
+            if (
+                name == RETURNED
+                or name in self.references
+                or name in self.returned
+                or self.is_changed_after(name, self.statement_node)
+            ):
+                raise ContextException(SHARED_ERROR, expression.context)
+        return expression
+
+    def is_referenced(self, expression: BaseExpression) -> bool:
+        # returned locals are not stored anywhere else once the function returns
+        return (
+            isinstance(expression, VariableAccess)
+            and local_name(expression.variable_name, expression.slot) in self.references
+        )
+
+    def define(
+        self,
+        name: str,
+        slot: Optional[int],
+        variable_type: VariableType,
+        value: str,
+        context: ParseContext,
+    ):
+        variable = local_name(name, slot)
+        self.local_types[variable] = variable_type
+        self.line(f"{self.c_type(variable_type, context)} {variable} = {value};")
+
+    def match_statement(self, statement: Match):
+        # if chains instead of a switch, break leaves the enclosing loop
+        scrutinee = f"match_{self.temporaries}"
+        self.temporaries += 1
+        self.line("{")
+        self.indent += 1
+        self.line(f"int32_t {scrutinee} = {self.expression(statement.scrutinee)};")
+        enum_type = statement.scrutinee.type
+        assert enum_type is not None and enum_type.type_name is not None
+        wildcard_arm = None
+        keyword_name = "if"
+        seen: Set[str] = set()
+        for arm in statement.arms:
+            variant_name = arm.pattern.variant_name
+            if arm.pattern.is_wildcard:
+                if wildcard_arm is None:
+                    wildcard_arm = arm
+                continue
+            if variant_name is None or variant_name in seen:
+                continue
+            seen.add(variant_name)
+            constant = f"XL_{enum_type.type_name}_{variant_name}"
+            self.line(f"{keyword_name} ({scrutinee} == {constant}) {{")
+            keyword_name = "else if"
+            self.block(arm.statements)
+        if wildcard_arm is not None:
+            self.line("else {" if seen else "{")
+            self.block(wildcard_arm.statements)
+        else:
+            self.line("else {" if seen else "{")
+            self.line(
+                f'    xl_fail({statement.context}, "error", "No match arm was selected; '
+                'should have been caught by exhaustiveness check");'
+            )
+            self.line("}")
+        self.indent -= 1
+        self.line("}")
+
+    def converted(self, expression: BaseExpression, variable_type: VariableType) -> str:
+        """The expression converted to the variable type, integer constants
+        and values are converted by C."""
+        return self.expression(expression)
+
+    def expression(self, expression: BaseExpression) -> str:
+        if isinstance(expression, FunctionCall):
+            return self.function_call(expression)
+        elif isinstance(expression, VariableAccess):
+            return self.variable_access(expression)
+        elif isinstance(expression, Constant):
+            return self.constant(expression)
+        elif isinstance(expression, MathOperation):
+            return self.math_operation(expression)
+        elif isinstance(expression, CompareOperation):
+            return self.compare_operation(expression)
+        elif isinstance(expression, UnaryOperation):
+            operand = self.expression(expression.operand)
+            if expression.operator == "not":
+                return f"(!{operand})"
+            elif expression.operator == "-":
+                assert expression.type
+                return f"(({self.c_type(expression.type, expression.context)})(-{operand}))"
+            raise InternalCompilerError(
+                f"Unknown unary operator: {expression.operator}"
+            )
+        elif isinstance(expression, StructInitialization):
+            struct_type = self.global_scope.structs[expression.struct_name]
+            inits = {
+                field_init.field_name: field_init.value
+                for field_init in expression.field_inits
+            }
+            values = []
+            for member in struct_type.members:
+                if member.name in inits:
+                    value = self.expression(self.stored(inits[member.name]))
+                else:
+                    value = self.member_default(member)
+                values.append(f".{member_name(member.name)} = {value}")
+            return f"((xl_s_{struct_type.name}){{{', '.join(values)}}})"
+        elif isinstance(expression, EnumVariantInitialization):
+            self.fixed_enum(expression.enum_name)
+            return f"XL_{expression.enum_name}_{expression.variant_name}"
+        raise InternalCompilerError("Unknown expression")
+
+    def constant(self, constant: Constant) -> str:
+        value = constant.value
+        if constant.constant_type == ConstantType.INTEGER:
+            if -(2**31) <= value < 2**31:
+                return f"({value})" if value < 0 else str(value)
+            elif -(2**63) <= value < 2**63:
+                return f"INT64_C({value})"
+            return f"UINT64_C({value})"
+        elif constant.constant_type == ConstantType.FLOAT:
+            return repr(value)
+        elif constant.constant_type == ConstantType.BOOL:
+            return "true" if value else "false"
+        elif constant.constant_type == ConstantType.CHAR:
+            if len(value.encode()) != 1:
+                raise ContextException(
+                    "Only ASCII characters are supported by the native backend",
+                    constant.context,
+                )
+            return f"((char){ord(value)})"
+        data = value.encode()
+        return f"((xl_string){{{len(data)}, {c_string(data)}}})"
+
+    def math_operation(self, expression: MathOperation) -> str:
+        assert expression.type and expression.type.primitive_type
+        result_type = expression.type.primitive_type
+        c_type = C_TYPES[result_type]
+        operand1 = f"(({c_type}){self.expression(expression.operand1)})"
+        operand2 = f"(({c_type}){self.expression(expression.operand2)})"
+        context = expression.context
+        operator = expression.operator
+        if operator in ("+", "-", "*"):
+            return f"(({c_type})({operand1} {operator} {operand2}))"
+        elif operator not in ("/", "%"):
+            raise InternalCompilerError("Unknown operator")
+        if result_type == PrimitiveType.F32:
+            function = "xl_ffloordiv" if operator == "/" else "xl_fmod"
+        elif result_type in UNSIGNED_TYPES:
+            function = "xl_udiv" if operator == "/" else "xl_umod"
+        else:
+            function = "xl_floordiv" if operator == "/" else "xl_mod"
+        return f"(({c_type}){function}({operand1}, {operand2}, {context}))"
+
+    def compare_operation(self, expression: CompareOperation) -> str:
+        operand1 = self.expression(expression.operand1)
+        operand2 = self.expression(expression.operand2)
+        type1 = expression.operand1.type
+        type2 = expression.operand2.type
+        assert type1 and type2
+        operator = expression.operator
+        if operator not in ("==", "!=", ">=", ">", "<", "<="):
+            raise InternalCompilerError("Unknown operator")
+        primitive1 = type1.primitive_type
+        primitive2 = type2.primitive_type
+        if primitive1 == PrimitiveType.STRING:
+            if operator not in ("==", "!="):
+                raise ContextException(
+                    f"invalid operator for type {primitive1}", expression.context
+                )
+            negation = "!" if operator == "!=" else ""
+            return f"({negation}xl_string_equal({operand1}, {operand2}))"
+        # C converts signed operands to unsigned ones of at least the same
+        # rank, u8 and u16 are promoted to int instead
+        if primitive1 in SIGNED_TYPES and primitive2 in WIDE_UNSIGNED_TYPES:
+            return f"(xl_compare_signed_unsigned({operand1}, {operand2}) {operator} 0)"
+        elif primitive1 in WIDE_UNSIGNED_TYPES and primitive2 in SIGNED_TYPES:
+            return f"(-xl_compare_signed_unsigned({operand2}, {operand1}) {operator} 0)"
+        return f"({operand1} {operator} {operand2})"
+
+    def member_default(self, member) -> str:
+        if member.default_value is not None:
+            return self.expression(member.default_value)
+        return self.default_value(member.param_type, member.context)
+
+    def default_value(self, variable_type: VariableType, context: ParseContext) -> str:
+        base_type = variable_type.variable_type
+        if base_type == VariableTypeEnum.PRIMITIVE:
+            primitive_type = variable_type.primitive_type
+            if primitive_type == PrimitiveType.STRING:
+                return '((xl_string){0, ""})'
+            elif primitive_type == PrimitiveType.BOOL:
+                return "false"
+            elif primitive_type == PrimitiveType.CHAR:
+                return f'(xl_fail({context}, "error", "primitive type not handled"), 0)'
+            return "0"
+        elif base_type == VariableTypeEnum.ARRAY:
+            return f"{self.array_name(variable_type, context)}_new()"
+        elif base_type == VariableTypeEnum.STRUCT:
+            return f"xl_default_s_{variable_type.type_name}()"
+        # enums have no default value, like in the interpreters
+        return f'(xl_fail({context}, "error", "Unknown variable type"), 0)'
+
+    def access_steps(
+        self, variable_access: VariableAccess
+    ) -> Tuple[str, List[Tuple[str, object, VariableType]]]:
+        """The root local of an access chain, and the member and index
+        accesses on it with the type they are applied to. Indexing comes
+        before member access, like in the validation pass."""
+        variable = local_name(variable_access.variable_name, variable_access.slot)
+        current_type = self.local_types[variable]
+        root = f"(*{variable})" if variable in self.references else variable
+        steps: List[Tuple[str, object, VariableType]] = []
+        node: Optional[VariableAccess] = variable_access
+        is_root = True
+        while node is not None:
+            if not is_root:
+                steps.append(("member", node.variable_name, current_type))
+                assert current_type.type_name
+                struct_type = self.global_scope.structs[current_type.type_name]
+                current_type = next(
+                    member.param_type
+                    for member in struct_type.members
+                    if member.name == node.variable_name
+                )
+            if node.array_access is not None:
+                steps.append(("index", node.array_access, current_type))
+                if current_type.variable_type == VariableTypeEnum.ARRAY:
+                    assert current_type.array_type
+                    current_type = current_type.array_type
+                else:
+                    current_type = primitive(PrimitiveType.CHAR)
+            node = node.variable_access
+            is_root = False
+        return root, steps
+
+    def apply_step(
+        self, value: str, step: Tuple[str, object, VariableType], context: ParseContext
+    ) -> str:
+        kind, argument, value_type = step
+        if kind == "member":
+            assert isinstance(argument, str)
+            return f"{value}.{member_name(argument)}"
+        assert isinstance(argument, BaseExpression)
+        index = self.expression(argument)
+        if value_type.variable_type == VariableTypeEnum.ARRAY:
+            name = self.array_name(value_type, context)
+            return f"(*{name}_at({value}, {index}, {context}))"
+        return f"xl_string_at({value}, {index}, {context})"
+
+    def lvalue(self, variable_access: VariableAccess) -> Tuple[str, bool]:
+        """The accessed value, and whether it can be assigned. Characters of
+        strings are copies."""
+        value, steps = self.access_steps(variable_access)
+        for step in steps:
+            value = self.apply_step(value, step, variable_access.context)
+        is_character = bool(steps) and (
+            steps[-1][0] == "index"
+            and steps[-1][2].variable_type != VariableTypeEnum.ARRAY
+        )
+        return value, not is_character
+
+    def variable_access(self, variable_access: VariableAccess) -> str:
+        if variable_access.slot is None:
+            return self.enum_access(variable_access)
+        value, _ = self.lvalue(variable_access)
+        if variable_access.method_call is not None:
+            value = self.method_call(value, variable_access.method_call)
+        return value
+
+    def enum_access(self, variable_access: VariableAccess) -> str:
+        enum_name = variable_access.variable_name
+        if enum_name not in self.global_scope.enums:
+            raise ContextException(
+                f"Unknown variable: {enum_name}", variable_access.context
+            )
+        if variable_access.variable_access is None:
+            raise ContextException(
+                "Enum access must specify a member", variable_access.context
+            )
+        self.fixed_enum(enum_name)
+        return f"XL_{enum_name}_{variable_access.variable_access.variable_name}"
+
+    def assign(self, variable_access: VariableAccess, value: str):
+        target, assignable = self.lvalue(variable_access)
+        if assignable:
+            self.line(f"{target} = {value};")
+        else:
+            # assigning a character of a string has no effect, like in the interpreters
+            self.line(f"(void)({value});")
+            self.line(f"(void){target};")
+
+    def string_append(self, variable_access: VariableAccess, method_call: FunctionCall):
+        arguments = self.call_arguments(self.builtin_method(method_call), method_call)
+        (argument_expression, argument), *_ = arguments
+        argument_type = argument_expression.type
+        assert argument_type
+        receiver = VariableAccess(
+            context=variable_access.context,
+            type=None,
+            variable_name=variable_access.variable_name,
+            array_access=variable_access.array_access,
+            variable_access=variable_access.variable_access,
+            slot=variable_access.slot,
+        )
+        target, _ = self.lvalue(receiver)
+        if argument_type.primitive_type == PrimitiveType.CHAR:
+            self.assign(receiver, f"xl_string_append_char({target}, {argument})")
+        elif argument_type.primitive_type == PrimitiveType.STRING:
+            self.assign(receiver, f"xl_string_concat({target}, {argument})")
+        else:
+            raise ContextException(
+                "append() can only accept char or string arguments",
+                method_call.context,
+            )
+
+    def call_arguments(
+        self, function: BaseFunction, function_call: FunctionCall
+    ) -> List[Tuple[BaseExpression, str]]:
+        bound_arguments = bind_call_arguments(
+            function_call, function.function_params, function_call.function_name
+        )
+        arguments: List[Tuple[BaseExpression, str]] = []
+        for argument_expr, param in bound_arguments:
+            if param.reference:
+                if not isinstance(argument_expr, VariableAccess):
+                    raise ContextException(
+                        "Reference parameters can only be variables",
+                        argument_expr.context,
+                    )
+                value, assignable = self.lvalue(argument_expr)
+                if not assignable:
+                    # characters of strings are passed as copies
+                    value = f"(char){{{value}}}"
+                arguments.append((argument_expr, f"&{value}"))
+            else:
+                value = self.expression(argument_expr)
+                if param.param_type.variable_type != VariableTypeEnum.BUILTIN_GENERIC:
+                    value = f"(({self.c_type(param.param_type, param.context)}){value})"
+                assert argument_expr.type
+                arguments.append(
+                    (argument_expr, self.copied(value, argument_expr.type))
+                )
+        return arguments
+
+    def function_call(self, function_call: FunctionCall) -> str:
+        function_name = function_call.function_name
+        context = function_call.context
+        if function_name in self.global_scope.functions:
+            function = self.global_scope.functions[function_name]
+            arguments = self.call_arguments(function, function_call)
+            values = ", ".join(value for _, value in arguments)
+            return f"xl_{function_name}({values})"
+        elif function_name == "print":
+            (argument, value), *_ = self.call_arguments(
+                get_builtin_functions()["print"], function_call
+            )
+            return self.print_call(argument, value)
+        elif function_name == "assert":
+            (_, value), *_ = self.call_arguments(
+                get_builtin_functions()["assert"], function_call
+            )
+            return f"xl_assert({value}, {context})"
+        raise ContextException(
+            f"Function {function_name} is not supported by the native backend", context
+        )
+
+    def print_call(self, argument: BaseExpression, value: str) -> str:
+        value_type = argument.type
+        assert value_type
+        primitive_type = value_type.primitive_type
+        if value_type.variable_type == VariableTypeEnum.ENUM:
+            return f"puts(xl_e_{value_type.type_name}_names[{value}])"
+        elif value_type.variable_type != VariableTypeEnum.PRIMITIVE:
+            raise ContextException(
+                "Printing structs and arrays is not supported by the native backend",
+                argument.context,
+            )
+        elif primitive_type in SIGNED_TYPES:
+            return f"xl_print_i64({value})"
+        elif primitive_type in UNSIGNED_TYPES:
+            return f"xl_print_u64({value})"
+        elif primitive_type == PrimitiveType.F32:
+            return f"xl_print_f32({value})"
+        elif primitive_type == PrimitiveType.BOOL:
+            return f"xl_print_bool({value})"
+        elif primitive_type == PrimitiveType.CHAR:
+            return f"xl_print_char({value})"
+        return f"xl_print_string({value})"
+
+    def builtin_method(self, method_call: FunctionCall) -> BaseFunction:
+        receiver_type = method_call.receiver_type
+        if receiver_type is None:
+            raise InternalCompilerError("Method call was not validated")
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            return get_builtin_array_methods()[method_call.function_name]
+        return get_builtin_primitive_methods()[receiver_type.primitive_type][
+            method_call.function_name
+        ]
+
+    def method_call(self, receiver: str, method_call: FunctionCall) -> str:
+        arguments = self.call_arguments(self.builtin_method(method_call), method_call)
+        receiver_type = method_call.receiver_type
+        assert receiver_type is not None
+        name = method_call.function_name
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            array_name = self.array_name(receiver_type, method_call.context)
+            if name == "append":
+                return f"{array_name}_append({receiver}, {arguments[0][1]})"
+            elif name == "length":
+                return f"({receiver})->length"
+        elif receiver_type.primitive_type == PrimitiveType.STRING:
+            if name == "toLowerCase":
+                return f"xl_string_map({receiver}, xl_lower)"
+            elif name == "toUpperCase":
+                return f"xl_string_map({receiver}, xl_upper)"
+            elif name == "length":
+                return f"({receiver}).length"
+        elif receiver_type.primitive_type == PrimitiveType.CHAR and name == "int":
+            return f"((uint32_t)(unsigned char){receiver})"
+        raise ContextException(
+            f"Method {name} is not supported by the native backend", method_call.context
+        )
+
+
+def compiler_command(source_path: str, binary_path: str) -> List[str]:
+    compiler = os.environ.get("CC", "cc")
+    return [
+        compiler,
+        "-O2",
+        "-std=c11",
+        "-fwrapv",
+        "-o",
+        binary_path,
+        source_path,
+        "-lm",
+    ]
+
+
+def build(c_source: str, build_dir: str, name: str = "program") -> str:
+    """Compiles the C source in build_dir, returns the path of the binary."""
+    source_path = os.path.join(build_dir, f"{name}.c")
+    binary_path = os.path.join(build_dir, name)
+    with open(source_path, "w") as f:
+        f.write(c_source)
+    if shutil.which(os.environ.get("CC", "cc")) is None:
+        raise Exception("The native backend needs a C compiler (cc or $CC)")
+    result = subprocess.run(
+        compiler_command(source_path, binary_path), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise InternalCompilerError(f"C compiler failed:\n{result.stderr}")
+    return binary_path
+
+
+class NativeEngine:
+    """Builds the program with the C compiler and runs the binary."""
+
+    def __init__(self):
+        self.cache: Optional[Tuple[ProgramCache, int]] = None
+
+    def use_cache(
+        self, cache: ProgramCache, source_code: str, chunk_index: int, options: str
+    ):
+        """Keep the binary in the cache directory, it is built again when the
+        generated C source changes."""
+        self.cache = (cache, chunk_index)
+
+    def run(self, ast: GlobalScope):
+        c_source = CGenerator(ast).program()
+        # errors without a location of their own are reported at main
+        context = ast.functions["main"].context
+        if self.cache is not None:
+            cache, chunk_index = self.cache
+            binary = self.cached_binary(cache, chunk_index, c_source)
+            self.execute(binary, context)
+        else:
+            with tempfile.TemporaryDirectory() as build_dir:
+                self.execute(build(c_source, build_dir), context)
+
+    def cached_binary(
+        self, cache: ProgramCache, chunk_index: int, c_source: str
+    ) -> str:
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        name = os.path.basename(cache.cache_path(chunk_index, "native"))
+        source_path = os.path.join(cache.cache_dir, f"{name}.c")
+        binary_path = os.path.join(cache.cache_dir, name)
+        try:
+            with open(source_path) as f:
+                if f.read() == c_source and os.path.exists(binary_path):
+                    return binary_path
+        except OSError:
+            pass
+        return build(c_source, cache.cache_dir, name)
+
+    def execute(self, binary: str, context: ParseContext):
+        """Runs the binary, its runtime errors are raised as
+        ContextExceptions, at context if they have no location."""
+        sys.stdout.flush()
+        result = subprocess.run([binary], capture_output=True)
+        sys.stdout.write(result.stdout.decode(errors="replace"))
+        stderr = result.stderr.decode(errors="replace")
+        error_lines = [
+            line for line in stderr.splitlines() if line.startswith(ERROR_MARKER + " ")
+        ]
+        other_output = "\n".join(
+            line for line in stderr.splitlines() if line and line not in error_lines
+        )
+        if other_output:
+            print(other_output, file=sys.stderr)
+        if error_lines:
+            _, error_context, kind, message = error_lines[-1].split(" ", 3)
+            if int(error_context) >= 0:
+                context = int(error_context)
+            if kind == "assert":
+                raise InterpreterAssertionError(message, context)
+            raise ContextException(message, context)
+        if result.returncode < 0:
+            try:
+                signal_name = signal.Signals(-result.returncode).name
+            except ValueError:
+                signal_name = f"signal {-result.returncode}"
+            raise ContextException(
+                f"Native program was killed by {signal_name}", context
+            )
+        if result.returncode != 0:
+            raise ContextException(
+                f"Native program failed with exit code {result.returncode}", context
+            )
@@ -0,0 +1,104 @@
+"""Whole-program call graph, built from the FunctionCall nodes of the AST.
+
+Only calls between the functions of the program are part of the graph,
+builtin functions and methods are not. Function bodies from the lazy
+frontend are parsed when their calls are first needed.
+"""
+
+from dataclasses import fields, is_dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from xlang.rd_parser import load_function_body
+from xlang.xl_ast import FunctionCall, GlobalScope, VariableAccess, VariableType
+
+
+CHILD_FIELDS: Dict[type, Tuple[str, ...]] = {}
+
+
+def child_fields(node_class: type) -> Tuple[str, ...]:
+    names = CHILD_FIELDS.get(node_class)
+    if names is None:
+        names = tuple(
+            f.name for f in fields(node_class) if f.name not in ("context", "type")
+        )
+        CHILD_FIELDS[node_class] = names
+    return names
+
+
+def iter_nodes(nodes: Iterable) -> Iterator:
+    """All AST nodes in and below nodes, in source order."""
+    stack = list(reversed(list(nodes)))
+    while stack:
+        node = stack.pop()
+        yield node
+        children: List[Any] = []
+        for name in child_fields(type(node)):
+            value = getattr(node, name)
+            if isinstance(value, list):
+                children.extend(item for item in value if is_dataclass(item))
+            elif is_dataclass(value) and not isinstance(value, VariableType):
+                children.append(value)
+        stack.extend(reversed(children))
+
+
+def called_functions(global_scope: GlobalScope, function_name: str) -> List[str]:
+    """Functions of the program called by a function, in order of the first call."""
+    function = global_scope.functions[function_name]
+    load_function_body(function)
+    # Method calls are FunctionCall nodes too, but always call builtins.
+    methods = set()
+    calls: Dict[str, None] = {}
+    for node in iter_nodes(function.statements):
+        if isinstance(node, VariableAccess) and node.method_call is not None:
+            methods.add(id(node.method_call))
+        elif (
+            isinstance(node, FunctionCall)
+            and id(node) not in methods
+            and node.function_name in global_scope.functions
+        ):
+            calls[node.function_name] = None
+    return list(calls)
+
+
+class CallGraph:
+    """Calls between the functions of a program.
+
+    The callees of a function are computed the first time they are needed, so
+    walking the graph from main only looks at the reachable functions.
+    """
+
+    def __init__(self, global_scope: GlobalScope):
+        self.global_scope = global_scope
+        self._callees: Dict[str, List[str]] = {}
+
+    def callees(self, function_name: str) -> List[str]:
+        if function_name not in self._callees:
+            self._callees[function_name] = called_functions(
+                self.global_scope, function_name
+            )
+        return self._callees[function_name]
+
+    def callers(self, function_name: str) -> List[str]:
+        return [
+            name
+            for name in self.global_scope.functions
+            if function_name in self.callees(name)
+        ]
+
+    def reachable(self, roots: Iterable[str] = ("main",)) -> List[str]:
+        """Functions reachable from the roots, including the roots, in the
+        order of the functions in the program."""
+        pending = [name for name in roots if name in self.global_scope.functions]
+        reached = set(pending)
+        while pending:
+            for callee in self.callees(pending.pop()):
+                if callee not in reached:
+                    reached.add(callee)
+                    pending.append(callee)
+        return [name for name in self.global_scope.functions if name in reached]
+
+
+def build_call_graph(global_scope: GlobalScope) -> Dict[str, List[str]]:
+    """The complete call graph, function name to called function names."""
+    call_graph = CallGraph(global_scope)
+    return {name: call_graph.callees(name) for name in global_scope.functions}
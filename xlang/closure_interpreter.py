@@ -0,0 +1,770 @@
+"""Execution engine that compiles every function into a tree of closures.
+
+Each AST node is compiled once into a Python closure specialised for its node
+kind, operator and the types recorded by the validation pass, so running the
+program does not dispatch on the node classes again. The values are the ones
+of the tree-walking interpreter, see xlang.runtime. Statement closures take
+the frame of the running function and return None or an execution change,
+("return", value), ("break", None) or ("continue", None), like the statements
+of xlang.interpreter.Interpreter. Expression closures take the frame and
+return the value.
+
+Function bodies are compiled on their first call, functions that are never
+called are never compiled.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from xlang.exceptions import ContextException, InternalCompilerError
+from xlang.interpreter_datatypes import Reference, StringBuilder
+from xlang.runtime import Runtime, default_primitive_value
+from xlang.xl_ast import (
+    BaseExpression,
+    BaseFunction,
+    Break,
+    BuiltinFunction,
+    CompareOperation,
+    Constant,
+    Continue,
+    EnumVariantInitialization,
+    Function,
+    FunctionCall,
+    GlobalScope,
+    If,
+    Loop,
+    MathOperation,
+    Match,
+    PrimitiveType,
+    Return,
+    Statement,
+    StructInitialization,
+    UnaryOperation,
+    VariableAccess,
+    VariableAssign,
+    VariableDeclaration,
+    VariableDefinition,
+    VariableType,
+    VariableTypeEnum,
+)
+from xlang.xl_builtins import (
+    BUILTIN_FUNCTIONS,
+    get_builtin_array_methods,
+    get_builtin_primitive_methods,
+)
+from xlang.utils import bind_call_arguments
+
+# variables by slot, None until the variable is defined
+Frame = List[Any]
+ExecutionChange = Optional[Tuple[str, Any]]
+StatementClosure = Callable[[Frame], ExecutionChange]
+ExpressionClosure = Callable[[Frame], Any]
+# the container and key of a variable, member or element, see
+# Interpreter.locate_variable
+LocationClosure = Callable[[Frame], Tuple[Any, Any]]
+# the element or member of a value
+AccessStep = Callable[[Frame, Any], Any]
+# the location of the element or member of the value at a location
+LocationStep = Callable[[Frame, Any, Any], Tuple[Any, Any]]
+
+BREAK = ("break", None)
+CONTINUE = ("continue", None)
+
+MATH_OPERATIONS: Dict[
+    str, Callable[[ExpressionClosure, ExpressionClosure], ExpressionClosure]
+] = {
+    "+": lambda operand1, operand2: lambda frame: operand1(frame) + operand2(frame),
+    "-": lambda operand1, operand2: lambda frame: operand1(frame) - operand2(frame),
+    "*": lambda operand1, operand2: lambda frame: operand1(frame) * operand2(frame),
+    "/": lambda operand1, operand2: lambda frame: operand1(frame) // operand2(frame),
+    "%": lambda operand1, operand2: lambda frame: operand1(frame) % operand2(frame),
+}
+
+COMPARE_OPERATIONS: Dict[
+    str, Callable[[ExpressionClosure, ExpressionClosure], ExpressionClosure]
+] = {
+    "==": lambda operand1, operand2: lambda frame: operand1(frame) == operand2(frame),
+    "!=": lambda operand1, operand2: lambda frame: operand1(frame) != operand2(frame),
+    ">=": lambda operand1, operand2: lambda frame: operand1(frame) >= operand2(frame),
+    ">": lambda operand1, operand2: lambda frame: operand1(frame) > operand2(frame),
+    "<": lambda operand1, operand2: lambda frame: operand1(frame) < operand2(frame),
+    "<=": lambda operand1, operand2: lambda frame: operand1(frame) <= operand2(frame),
+}
+
+
+def run_block(statements: List[StatementClosure], frame: Frame) -> ExecutionChange:
+    for statement in statements:
+        execution_change = statement(frame)
+        if execution_change:  # break, continue or return
+            return execution_change
+    return None
+
+
+def is_primitive(variable_type: Optional[VariableType]) -> bool:
+    return (
+        variable_type is not None
+        and variable_type.variable_type == VariableTypeEnum.PRIMITIVE
+    )
+
+
+def is_string(variable_type: Optional[VariableType]) -> bool:
+    return is_primitive(variable_type) and (
+        variable_type is not None
+        and variable_type.primitive_type == PrimitiveType.STRING
+    )
+
+
+def string_value(frame: Frame, value: Any) -> Any:
+    if isinstance(value, StringBuilder):
+        return str(value)
+    return value
+
+
+class ClosureInterpreter(Runtime):
+    def run(self, ast: GlobalScope):
+        self.global_scope = ast
+        if "main" not in ast.functions:
+            raise Exception("No main function found")
+        main_function = ast.functions["main"]
+
+        assert isinstance(main_function, Function)
+        # compiled functions by name, see compiled_function
+        self.functions: Dict[str, Callable[[Frame], Any]] = {}
+        self.pinned = []
+        # slots of the reference parameters of the compiled function, they
+        # hold a Reference if a primitive was passed
+        self.reference_slots: Set[int] = set()
+
+        statements = self.statements(main_function.statements)
+        frame: Frame = [None] * main_function.frame_size
+        execution_change = run_block(statements, frame)
+        if execution_change:
+            change_type, value = execution_change
+            if change_type != "return":
+                raise Exception(
+                    f"invalid execution change type in main function: {change_type}"
+                )
+
+    def statements(self, statements: List[Statement]) -> List[StatementClosure]:
+        return [self.statement(statement) for statement in statements]
+
+    def statement(self, statement) -> StatementClosure:
+        if isinstance(statement, VariableDeclaration):
+            slot = statement.slot
+            variable_type = statement.variable_type
+            if is_primitive(variable_type):
+                # primitives are immutable, the default value is shared
+                default = default_primitive_value(variable_type)
+
+                def primitive_declaration(frame):
+                    frame[slot] = default
+
+                return primitive_declaration
+            default_variable_value = self.default_variable_value
+
+            def variable_declaration(frame):
+                frame[slot] = default_variable_value(variable_type)
+
+            return variable_declaration
+        elif isinstance(statement, VariableDefinition):
+            value = self.stored_value(statement.value)
+            slot = statement.slot
+
+            def variable_definition(frame):
+                frame[slot] = value(frame)
+
+            return variable_definition
+        elif isinstance(statement, VariableAssign):
+            return self.variable_assign(statement)
+        elif isinstance(statement, FunctionCall):
+            function_call = self.function_call(statement)
+
+            def function_call_statement(frame):
+                function_call(frame)
+
+            return function_call_statement
+        elif isinstance(statement, Loop):
+            return self.loop(statement)
+        elif isinstance(statement, If):
+            return self.if_statement(statement)
+        elif isinstance(statement, Match):
+            return self.match_statement(statement)
+        elif isinstance(statement, Return):
+            if statement.value:
+                return_value = self.expression(statement.value)
+                return lambda frame: ("return", return_value(frame))
+            return lambda frame: ("return", None)
+        elif isinstance(statement, Continue):
+            return lambda frame: CONTINUE
+        elif isinstance(statement, Break):
+            return lambda frame: BREAK
+        elif isinstance(statement, VariableAccess):
+            variable = self.variable_access(statement)
+
+            def variable_access_statement(frame):
+                variable(frame)
+
+            return variable_access_statement
+        else:
+            raise InternalCompilerError("unhandled statement")
+
+    def stored_value(self, expression: BaseExpression) -> ExpressionClosure:
+        """The value of expression as it is stored in a variable, member or
+        field, only enums are copied, see Runtime.stored."""
+        value = self.expression(expression)
+        value_type = expression.type
+        if value_type is None or value_type.variable_type == VariableTypeEnum.ENUM:
+            stored = self.stored
+            return lambda frame: stored(value(frame))
+        return value
+
+    def variable_assign(self, statement: VariableAssign) -> StatementClosure:
+        value = self.expression(statement.value)
+        variable_access = statement.variable_access
+        slot = variable_access.slot
+        if (
+            is_primitive(variable_access.type)
+            and slot is not None
+            and slot not in self.reference_slots
+            and variable_access.array_access is None
+            and variable_access.variable_access is None
+        ):
+
+            def variable_store(frame):
+                frame[slot] = value(frame)
+
+            return variable_store
+
+        location = self.location(variable_access)
+        if is_primitive(variable_access.type):
+            # the location holds the primitive, there is no Value to update
+
+            def primitive_assign(frame):
+                new_value = value(frame)
+                container, key = location(frame)
+                container[key] = new_value
+
+            return primitive_assign
+        assign = self.assign
+
+        def variable_assign(frame):
+            new_value = value(frame)
+            container, key = location(frame)
+            assign(container, key, new_value)
+
+        return variable_assign
+
+    def loop(self, statement: Loop) -> StatementClosure:
+        body = self.statements(statement.statements)
+
+        def loop(frame):
+            while True:
+                for body_statement in body:
+                    execution_change = body_statement(frame)
+                    if execution_change:  # break, continue or return
+                        if execution_change is BREAK:
+                            return None
+                        elif execution_change is CONTINUE:
+                            break
+                        return execution_change
+
+        return loop
+
+    def if_statement(self, statement: If) -> StatementClosure:
+        # the validation pass checked that all conditions are bool
+        branches = [
+            (
+                self.expression(statement.condition),
+                self.statements(statement.statements),
+            )
+        ]
+        for elif_statement in statement.elif_statements:
+            branches.append(
+                (
+                    self.expression(elif_statement.condition),
+                    self.statements(elif_statement.statements),
+                )
+            )
+        else_statements = (
+            self.statements(statement.else_statement.statements)
+            if statement.else_statement
+            else None
+        )
+
+        if len(branches) == 1:
+            condition, statements = branches[0]
+
+            def if_statement(frame):
+                if condition(frame) is True:
+                    return run_block(statements, frame)
+                if else_statements is not None:
+                    return run_block(else_statements, frame)
+                return None
+
+            return if_statement
+
+        def if_elif_statement(frame):
+            for condition, statements in branches:
+                if condition(frame) is True:
+                    return run_block(statements, frame)
+            if else_statements is not None:
+                return run_block(else_statements, frame)
+            return None
+
+        return if_elif_statement
+
+    def match_statement(self, statement: Match) -> StatementClosure:
+        if statement.arm_table is None:
+            raise InternalCompilerError("Match statement was not validated")
+        scrutinee = self.expression(statement.scrutinee)
+        arms = [
+            (
+                list(zip(arm.pattern.binding_offsets, arm.pattern.binding_slots)),
+                self.statements(arm.statements),
+            )
+            for arm in statement.arms
+        ]
+        # the arm of each discriminant
+        arm_table = [arms[arm_index] for arm_index in statement.arm_table]
+
+        def match_statement(frame):
+            payload = scrutinee(frame).value
+            if isinstance(payload, tuple):
+                bindings, statements = arm_table[payload[0]]
+                for offset, slot in bindings:
+                    # the fields follow the discriminant
+                    frame[slot] = payload[offset + 1]
+            else:
+                bindings, statements = arm_table[payload]
+            return run_block(statements, frame)
+
+        return match_statement
+
+    def expression(self, expression: BaseExpression) -> ExpressionClosure:
+        if isinstance(expression, FunctionCall):
+            return self.function_call(expression)
+        elif isinstance(expression, VariableAccess):
+            return self.variable_access(expression)
+        elif isinstance(expression, Constant):
+            return self.constant(expression)
+        elif isinstance(expression, MathOperation):
+            return self.math_operation(expression)
+        elif isinstance(expression, CompareOperation):
+            return self.compare_operation(expression)
+        elif isinstance(expression, UnaryOperation):
+            return self.unary_operation(expression)
+        elif isinstance(expression, StructInitialization):
+            return self.struct_initialization(expression)
+        elif isinstance(expression, EnumVariantInitialization):
+            return self.enum_variant_initialization(expression)
+        else:
+            raise InternalCompilerError("Unknown expression")
+
+    def constant(self, constant: Constant) -> ExpressionClosure:
+        if not constant.type:
+            raise InternalCompilerError("Expression type not set")
+        value = constant.value
+        return lambda frame: value
+
+    def math_operation(self, expression: MathOperation) -> ExpressionClosure:
+        operand1 = self.expression(expression.operand1)
+        operand2 = self.expression(expression.operand2)
+        if expression.operator not in MATH_OPERATIONS:
+            raise InternalCompilerError("Unknown operator")
+        return MATH_OPERATIONS[expression.operator](operand1, operand2)
+
+    def compare_operation(self, expression: CompareOperation) -> ExpressionClosure:
+        operand1 = self.expression(expression.operand1)
+        operand2 = self.expression(expression.operand2)
+        operator_name = expression.operator
+        operand_type = expression.operand1.type
+        if not operand_type:
+            raise InternalCompilerError("Expression type not set")
+        if operand_type.variable_type == VariableTypeEnum.ENUM:
+            enum_compare = self.enum_compare
+            return lambda frame: enum_compare(
+                operand1(frame), operand2(frame), operator_name
+            )
+        if operand_type.primitive_type in (
+            PrimitiveType.STRING,
+            PrimitiveType.BOOL,
+        ) and operator_name not in ("==", "!="):
+            primitive_type = operand_type.primitive_type
+
+            def invalid_operator(frame):
+                operand1(frame)
+                operand2(frame)
+                raise Exception(f"invalid operator for type {primitive_type}")
+
+            return invalid_operator
+        if operator_name not in COMPARE_OPERATIONS:
+            raise InternalCompilerError("Unknown operator")
+        return COMPARE_OPERATIONS[operator_name](operand1, operand2)
+
+    def unary_operation(self, expression: UnaryOperation) -> ExpressionClosure:
+        operand = self.expression(expression.operand)
+        if expression.operator == "not":
+            return lambda frame: not operand(frame)
+        elif expression.operator == "-":
+            return lambda frame: -operand(frame)
+        else:
+            raise InternalCompilerError(
+                f"Unknown unary operator: {expression.operator}"
+            )
+
+    def variable_access(self, variable_access: VariableAccess) -> ExpressionClosure:
+        if variable_access.slot is None:
+            return self.enum_access(variable_access)
+        method_call = variable_access.method_call
+        if method_call is None:
+            return self.variable_value(variable_access, variable_access.type)
+        receiver_type = method_call.receiver_type
+        if receiver_type is None:
+            raise InternalCompilerError("Method call was not validated")
+        if is_string(receiver_type) and method_call.function_name == "append":
+            return self.string_append_call(variable_access, method_call)
+        receiver = self.variable_value(variable_access, receiver_type)
+        return self.method_call(method_call, receiver)
+
+    def variable_value(
+        self, variable_access: VariableAccess, value_type: Optional[VariableType]
+    ) -> ExpressionClosure:
+        """The accessed variable, element or member, value_type is its type."""
+        slot = variable_access.slot
+        if slot in self.reference_slots:
+
+            def load(frame):
+                value = frame[slot]
+                if isinstance(value, Reference):
+                    return value.container[value.key]
+                return value
+
+        else:
+
+            def load(frame):
+                return frame[slot]
+
+        steps = self.access_steps(variable_access)
+        if value_type is None or is_string(value_type):
+            steps.append(string_value)
+        if not steps:
+            return load
+        if len(steps) == 1:
+            (step,) = steps
+            return lambda frame: step(frame, load(frame))
+
+        def access(frame):
+            value = load(frame)
+            for step in steps:
+                value = step(frame, value)
+            return value
+
+        return access
+
+    def access_steps(self, variable_access: VariableAccess) -> List[AccessStep]:
+        """The steps to the element and member that variable_access accesses,
+        the element comes first, see Interpreter.access_lookup."""
+        steps: List[AccessStep] = []
+        if variable_access.array_access is not None:
+            index = self.expression(variable_access.array_access)
+            index_lookup = self.index_lookup
+            steps.append(lambda frame, value: index_lookup(value, index(frame)))
+        member_access = variable_access.variable_access
+        if member_access is not None:
+            offset = member_access.offset
+            steps.append(lambda frame, struct: struct.value[offset])
+            steps.extend(self.access_steps(member_access))
+        return steps
+
+    def location(self, variable_access: VariableAccess) -> LocationClosure:
+        """The container and key of the accessed variable, member or element,
+        for assigning it or passing it to a reference parameter."""
+        slot = variable_access.slot
+        if slot is None:
+            # an enum access, it is not stored anywhere
+            enum_value = self.enum_access(variable_access)
+            return lambda frame: ([enum_value(frame)], 0)
+        if slot in self.reference_slots:
+
+            def base(frame):
+                value = frame[slot]
+                if isinstance(value, Reference):
+                    return value.container, value.key
+                return frame, slot
+
+        else:
+
+            def base(frame):
+                return frame, slot
+
+        steps = self.location_steps(variable_access)
+        if not steps:
+            return base
+
+        def location(frame):
+            container, key = base(frame)
+            for step in steps:
+                container, key = step(frame, container, key)
+            return container, key
+
+        return location
+
+    def location_steps(self, variable_access: VariableAccess) -> List[LocationStep]:
+        """The steps to the location of the element and member that
+        variable_access accesses, see Interpreter.access_location."""
+        steps: List[LocationStep] = []
+        if variable_access.array_access is not None:
+            index = self.expression(variable_access.array_access)
+            index_location = self.index_location
+            steps.append(
+                lambda frame, container, key: index_location(
+                    container[key], index(frame)
+                )
+            )
+        member_access = variable_access.variable_access
+        if member_access is not None:
+            offset = member_access.offset
+            unshare = self.unshare
+
+            def member_location(frame, container, key):
+                struct = container[key]
+                unshare(struct)
+                return struct.value, offset
+
+            steps.append(member_location)
+            steps.extend(self.location_steps(member_access))
+        return steps
+
+    def enum_access(self, variable_access: VariableAccess) -> ExpressionClosure:
+        enum_name = variable_access.variable_name
+        context = variable_access.context
+        if enum_name not in self.global_scope.enums:
+            # no slot and not an enum, the validation pass did not run
+            def unknown_variable(frame):
+                raise ContextException(f"Unknown variable: {enum_name}", context)
+
+            return unknown_variable
+        if variable_access.variable_access is None:
+
+            def missing_member(frame):
+                raise ContextException("Enum access must specify a member", context)
+
+            return missing_member
+        entry_name = variable_access.variable_access.variable_name
+        enum_value = self.enum_value
+        # Values are mutable, every evaluation creates a new one.
+        return lambda frame: enum_value(enum_name, entry_name)
+
+    def call_arguments(
+        self, function: BaseFunction, function_call: FunctionCall
+    ) -> Tuple[Callable[[Frame], List[Any]], bool]:
+        """The closure evaluating the arguments, and whether the arguments
+        pin a location, see Runtime.reference_argument."""
+        try:
+            bound_arguments = bind_call_arguments(
+                function_call, function.function_params, function_call.function_name
+            )
+            for argument_expr, param in bound_arguments:
+                if param.reference and not isinstance(argument_expr, VariableAccess):
+                    raise ContextException(
+                        "Reference parameters can only be variables",
+                        argument_expr.context,
+                    )
+        except ContextException as ex:
+            # raised when the call is executed, like the tree-walking interpreter
+            error = ex
+
+            def invalid_arguments(frame):
+                raise error
+
+            return invalid_arguments, False
+
+        arguments = []
+        pins = False
+        for argument_expr, param in bound_arguments:
+            if param.reference:
+                assert isinstance(argument_expr, VariableAccess)
+                arguments.append(self.reference_argument_value(argument_expr))
+                pins = pins or is_primitive(argument_expr.type)
+            else:
+                arguments.append(self.copied_argument(argument_expr))
+
+        if not arguments:
+            return (lambda frame: []), pins
+        if len(arguments) == 1:
+            (argument,) = arguments
+            return (lambda frame: [argument(frame)]), pins
+        if len(arguments) == 2:
+            argument1, argument2 = arguments
+            return (lambda frame: [argument1(frame), argument2(frame)]), pins
+        return (lambda frame: [argument(frame) for argument in arguments]), pins
+
+    def reference_argument_value(
+        self, variable_access: VariableAccess
+    ) -> ExpressionClosure:
+        location = self.location(variable_access)
+        reference_argument = self.reference_argument
+        return lambda frame: reference_argument(*location(frame))
+
+    def copied_argument(self, argument_expr: BaseExpression) -> ExpressionClosure:
+        """The argument of a parameter passed by value, primitives are
+        immutable, structs, arrays and enums get a lazy copy."""
+        argument = self.expression(argument_expr)
+        if is_primitive(argument_expr.type):
+            return argument
+        lazy_copy = self.lazy_copy
+        return lambda frame: lazy_copy(argument(frame))
+
+    def function_call(self, function_call: FunctionCall) -> ExpressionClosure:
+        function_name = function_call.function_name
+        function: BaseFunction
+        if function_name in self.global_scope.functions:
+            function = self.global_scope.functions[function_name]
+        elif function_name in BUILTIN_FUNCTIONS:
+            function = BUILTIN_FUNCTIONS[function_name]
+        else:
+
+            def unknown_function(frame):
+                raise Exception(f"Unknown function called: {function_name}")
+
+            return unknown_function
+
+        arguments, pins = self.call_arguments(function, function_call)
+        if isinstance(function, BuiltinFunction):
+            builtin_call = self.builtin_call
+            return lambda frame: builtin_call(function_call, arguments(frame))
+
+        assert isinstance(function, Function)
+        compiled_function = self.compiled_function(function)
+        if not pins:
+            return lambda frame: compiled_function(arguments(frame))
+        pinned = self.pinned
+
+        def call_with_references(frame):
+            pin_count = len(pinned)
+            return_value = compiled_function(arguments(frame))
+            del pinned[pin_count:]
+            return return_value
+
+        return call_with_references
+
+    def compiled_function(self, function: Function) -> Callable[[Frame], Any]:
+        """The function called with its evaluated arguments, the body is
+        compiled on the first call."""
+        if function.name in self.functions:
+            return self.functions[function.name]
+
+        body: Optional[List[StatementClosure]] = None
+        padding = [None] * (function.frame_size - len(function.function_params))
+
+        def call(arguments):
+            nonlocal body
+            if body is None:
+                body = self.function_body(function)
+            # the parameters are in the first slots
+            frame = arguments
+            if padding:
+                frame.extend(padding)
+            for statement in body:
+                execution_change = statement(frame)
+                if execution_change:
+                    change_type, value = execution_change
+                    if change_type == "return":
+                        return value
+                    raise Exception(
+                        f"invalid execution change type in function: {change_type}"
+                    )
+            return None
+
+        self.functions[function.name] = call
+        return call
+
+    def function_body(self, function: Function) -> List[StatementClosure]:
+        reference_slots = self.reference_slots
+        self.reference_slots = {
+            slot
+            for slot, param in enumerate(function.function_params)
+            if param.reference
+        }
+        try:
+            return self.statements(function.statements)
+        finally:
+            self.reference_slots = reference_slots
+
+    def method_call(
+        self, method_call: FunctionCall, receiver: ExpressionClosure
+    ) -> ExpressionClosure:
+        receiver_type = method_call.receiver_type
+        assert receiver_type is not None
+        method_name = method_call.function_name
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            methods = get_builtin_array_methods()
+        elif receiver_type.variable_type == VariableTypeEnum.PRIMITIVE:
+            methods = get_builtin_primitive_methods()[receiver_type.primitive_type]
+        else:
+            # not a method of a builtin type, Runtime.call_method raises
+            methods = {}
+        if method_name not in methods:
+            call_method = self.call_method
+            return lambda frame: call_method(receiver(frame), method_call, [])
+
+        arguments, _ = self.call_arguments(methods[method_name], method_call)
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            if method_name == "length":
+                return lambda frame: len(receiver(frame).value)
+            elif method_name == "append":
+                unshare = self.unshare
+
+                def append(frame):
+                    array = receiver(frame)
+                    (element,) = arguments(frame)
+                    unshare(array)
+                    array.value.append(element)
+
+                return append
+        call_method = self.call_method
+        return lambda frame: call_method(receiver(frame), method_call, arguments(frame))
+
+    def string_append_call(
+        self, variable_access: VariableAccess, method_call: FunctionCall
+    ) -> ExpressionClosure:
+        # strings are immutable, the receiver is replaced
+        location = self.location(variable_access)
+        method = get_builtin_primitive_methods()[PrimitiveType.STRING]["append"]
+        arguments, _ = self.call_arguments(method, method_call)
+        string_append = self.string_append
+
+        def append(frame):
+            container, key = location(frame)
+            (value,) = arguments(frame)
+            string_append(container, key, value, method_call)
+
+        return append
+
+    def struct_initialization(
+        self, expression: StructInitialization
+    ) -> ExpressionClosure:
+        struct_name = expression.struct_name
+        field_inits = [
+            (field_init.offset, self.expression(field_init.value))
+            for field_init in expression.field_inits
+        ]
+        struct_value = self.struct_value
+        return lambda frame: struct_value(
+            struct_name, [(offset, value(frame)) for offset, value in field_inits]
+        )
+
+    def enum_variant_initialization(
+        self, expression: EnumVariantInitialization
+    ) -> ExpressionClosure:
+        enum_name = expression.enum_name
+        variant_name = expression.variant_name
+        field_inits = [
+            (field_init.offset, self.expression(field_init.value))
+            for field_init in expression.field_inits
+        ]
+        variant_value = self.variant_value
+        return lambda frame: variant_value(
+            enum_name,
+            variant_name,
+            [(offset, value(frame)) for offset, value in field_inits],
+        )
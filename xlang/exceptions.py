@@ -1,7 +1,7 @@
 import re
 from typing import List, Optional
 
-from xlang.xl_ast import ParseContext
+from xlang.xl_ast import LineTable, ParseContext
 
 
 # Compiler implementation error, e.g. not handling all cases in an enum
@@ -18,31 +18,43 @@ class ContextException(Exception):
         super().__init__(message)
         self.context = context
 
-    def _format_context(self, file_name: str, context: ParseContext):
-        return f"{file_name}:{context.line}:{context.column}"
+    def _format_context(
+        self, file_name: str, line_table: LineTable, context: ParseContext
+    ):
+        line, column = line_table.line_column(context)
+        return f"{file_name}:{line}:{column}"
 
     def print(self, code, file_name="<source>"):
-        lines = code.split("\n")
+        line_table = LineTable(code)
 
         if self.function_name:
-            if self.function_parse_context:
+            if self.function_parse_context is not None:
                 print(
                     f"In function {self.function_name} @",
-                    self._format_context(file_name, self.function_parse_context),
+                    self._format_context(
+                        file_name, line_table, self.function_parse_context
+                    ),
                 )
             else:
                 print(f"In function {self.function_name}:")
 
-        print(self._format_context(file_name, self.context), str(self))
+        print(self._format_context(file_name, line_table, self.context), str(self))
 
-        start_line = max(0, self.context.line - 5)
-        for line in lines[start_line : self.context.line]:
-            print(line)
-        print(" " * (self.context.column - 1), "^", sep="")
+        line, column = line_table.line_column(self.context)
+        for line_number in range(max(1, line - 4), line + 1):
+            print(line_table.line(line_number))
+        print(" " * (column - 1), "^", sep="")
 
 
 class BaseParseException(ContextException):
-    expected_tokens: List[str] = []
+    def __init__(
+        self,
+        message: str,
+        context: ParseContext,
+        expected_tokens: Optional[List[str]] = None,
+    ):
+        super().__init__(message, context)
+        self.expected_tokens = expected_tokens or []
 
     def print(self, code, file_name="<source>"):
         super().print(code, file_name)
@@ -54,38 +66,40 @@ class BaseParseException(ContextException):
                 for token in self.expected_tokens:
                     print(f"* {token}")
 
-    def process_expected_token(self, ex, accept):
+    @staticmethod
+    def expected_token_name(ex, accept):
         if ex._terminals_by_name and accept in ex._terminals_by_name:
             terminal = ex._terminals_by_name[accept]
             pattern = terminal.pattern.value
             if len(pattern) == 1 or len(pattern) == 2 or re.match("[a-zA-Z]+", pattern):
-                self.expected_tokens.append(pattern)
+                return pattern
             else:
-                self.expected_tokens.append(terminal.name)
-
+                return terminal.name
         else:
-            self.expected_tokens.append(accept)
+            return accept
 
 
 class UnexpectedTokenException(BaseParseException):
-    def __init__(self, ex):
-        super().__init__(
-            f'Unexpected token "{ex.token.value}"', ParseContext.from_exception(ex)
-        )
-
+    @classmethod
+    def from_lark(cls, ex):
         # modeled after UnexpectedInput._format_expected
         accepts = ex.accepts or ex.expected
-        for accept in accepts:
-            self.process_expected_token(ex, accept)
+        return cls(
+            f'Unexpected token "{ex.token.value}"',
+            ex.pos_in_stream,
+            [cls.expected_token_name(ex, accept) for accept in accepts],
+        )
 
 
 class UnexpectedCharacterException(BaseParseException):
-    def __init__(self, ex):
-        super().__init__(f'Cannot parse "{ex.char}"', ParseContext.from_exception(ex))
-
+    @classmethod
+    def from_lark(cls, ex):
         # modeled after UnexpectedInput._format_expected
-        for accept in ex.allowed:
-            self.process_expected_token(ex, accept)
+        return cls(
+            f'Cannot parse "{ex.char}"',
+            ex.pos_in_stream,
+            [cls.expected_token_name(ex, accept) for accept in ex.allowed],
+        )
 
 
 class InterpreterAssertionError(ContextException):
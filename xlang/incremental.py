@@ -0,0 +1,171 @@
+"""Incremental re-validation of a source code that is edited and saved again.
+
+Every function gets a key from a hash of its own text and of the signatures
+of all structs, enums and functions it can refer to. When the source code
+changes, the bodies of functions with an unchanged key are reused from the
+last successful validation. Only the other function bodies are parsed and
+validated again.
+"""
+
+import gc
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from xlang.callgraph import iter_nodes
+from xlang.rd_parser import RDParser
+from xlang.validation_pass import validation_pass
+from xlang.xl_ast import Function, GlobalScope, ParseContext, Statement
+
+IDENTIFIER_RE = re.compile(r"[a-zA-Z_][a-zA-Z_0-9]*")
+
+
+@dataclass(slots=True, kw_only=True)
+class Declaration:
+    name: str
+    is_function: bool
+    # For structs and enums, the signature is the complete declaration.
+    text: str
+    signature: str
+
+
+def parse_declarations(source_code: str):
+    """Parses the source code with the lazy frontend, returns the global scope
+    and the declarations in source order."""
+    parser = RDParser(lazy=True)
+    global_scope = parser.parse(source_code)
+    declarations = []
+    for entry, start_pos, end_pos in parser.declarations:
+        text = source_code[start_pos:end_pos]
+        signature = text
+        if isinstance(entry, Function) and entry.unparsed_body is not None:
+            signature = source_code[start_pos : entry.unparsed_body.start_pos]
+        declarations.append(
+            Declaration(
+                name=entry.name,
+                is_function=isinstance(entry, Function),
+                text=text,
+                signature=signature,
+            )
+        )
+    return global_scope, declarations
+
+
+def function_keys(declarations: List[Declaration]) -> Dict[str, str]:
+    """Hash of each function's text and of the signatures it depends on.
+
+    Every identifier in a text that names a declaration is a dependency, so
+    the dependencies are a superset of the real ones. Signatures include the
+    signatures of their own dependencies, e.g. the structs used as types of
+    struct members.
+    """
+    by_name: Dict[str, List[Declaration]] = defaultdict(list)
+    for declaration in declarations:
+        by_name[declaration.name].append(declaration)
+
+    def references(text: str) -> Set[str]:
+        return set(IDENTIFIER_RE.findall(text)) & by_name.keys()
+
+    signature_references = {
+        name: set().union(*(references(d.signature) for d in named))
+        for name, named in by_name.items()
+    }
+    signature_hashes: Dict[str, str] = {}
+
+    def signature_hash(name: str) -> str:
+        if name not in signature_hashes:
+            closure: Set[str] = set()
+            pending = [name]
+            while pending:
+                reference = pending.pop()
+                if reference not in closure:
+                    closure.add(reference)
+                    pending.extend(signature_references[reference])
+            digest = hashlib.sha256()
+            for reference in sorted(closure):
+                for declaration in by_name[reference]:
+                    digest.update(declaration.signature.encode() + b"\0")
+            signature_hashes[name] = digest.hexdigest()
+        return signature_hashes[name]
+
+    keys = {}
+    for declaration in declarations:
+        if not declaration.is_function:
+            continue
+        digest = hashlib.sha256(declaration.text.encode() + b"\0")
+        for reference in sorted(references(declaration.text)):
+            digest.update(reference.encode() + b"\0")
+            digest.update(signature_hash(reference).encode())
+        keys[declaration.name] = digest.hexdigest()
+    return keys
+
+
+def shift_contexts(statements: List[Statement], offset: int):
+    for node in iter_nodes(statements):
+        node.context += offset
+
+
+@dataclass(slots=True, kw_only=True)
+class ValidatedFunction:
+    key: str
+    context: ParseContext
+    statements: List[Statement]
+    frame_size: int
+
+
+class IncrementalValidator:
+    """Validates new versions of a source code, reusing the validated bodies
+    of functions that did not change since the last successful validation."""
+
+    def __init__(self):
+        self.functions: Dict[str, ValidatedFunction] = {}
+        # names of the functions validated by the last call to validate
+        self.revalidated: List[str] = []
+
+    def validate(self, source_code: str) -> GlobalScope:
+        # The garbage collector would traverse the reused function bodies
+        # over and over while the new version is parsed, but AST nodes do not
+        # form reference cycles.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._validate(source_code)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _validate(self, source_code: str) -> GlobalScope:
+        global_scope, declarations = parse_declarations(source_code)
+        keys = function_keys(declarations)
+
+        reused = set()
+        for name, function in global_scope.functions.items():
+            previous: Optional[ValidatedFunction] = self.functions.get(name)
+            if previous is None or previous.key != keys[name]:
+                continue
+            # The body is unchanged, but may have moved in the source code.
+            if function.context != previous.context:
+                shift_contexts(previous.statements, function.context - previous.context)
+                previous.context = function.context
+            function.statements = previous.statements
+            function.frame_size = previous.frame_size
+            function.unparsed_body = None
+            reused.add(name)
+
+        self.revalidated = [
+            name for name in global_scope.functions if name not in reused
+        ]
+        validation_pass(global_scope, reachable_only=False, validated=reused)
+
+        self.functions = {
+            name: ValidatedFunction(
+                key=keys[name],
+                context=function.context,
+                statements=function.statements,
+                frame_size=function.frame_size,
+            )
+            for name, function in global_scope.functions.items()
+        }
+        return global_scope
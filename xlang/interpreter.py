@@ -1,10 +1,13 @@
-import copy
+from typing import Any, List, Optional
 
+from xlang.c_backend import NativeEngine
+from xlang.closure_interpreter import ClosureInterpreter
+from xlang.transpiler import PythonEngine
+from xlang.vm import VirtualMachine
 from xlang.exceptions import ContextException, InternalCompilerError
-from xlang.interpreter_datatypes import ScopeStack, Value, ValueType
+from xlang.interpreter_datatypes import Reference, StringBuilder, Value, ValueType
+from xlang.runtime import Runtime
 from xlang.xl_ast import (
-    INTEGER_TYPES,
-    NUMBER_TYPES,
     PrimitiveType,
     GlobalScope,
     VariableTypeEnum,
@@ -29,23 +32,25 @@ from xlang.xl_ast import (
     StructInitialization,
     EnumVariantInitialization,
 )
-from xlang.xl_builtins import (
-    BUILTIN_FUNCTIONS,
-    get_builtin_array_methods,
-    get_builtin_primitive_methods,
-)
-from xlang.utils import bind_call_arguments
+from xlang.xl_builtins import BUILTIN_FUNCTIONS
+
 
+class Interpreter(Runtime):
+    """Walks the AST of a validated program, with the values of
+    xlang.runtime."""
 
-class Interpreter:
     def run(self, ast: GlobalScope):
         self.global_scope = ast
         if "main" not in ast.functions:
             raise Exception("No main function found")
         main_function = ast.functions["main"]
-        self.scope_stack = ScopeStack()
 
         assert isinstance(main_function, Function)
+        # variables of the running function, indexed by the slots assigned by
+        # the validation pass
+        self.frame: List[Any] = [None] * main_function.frame_size
+        self.pinned = []
+        self.assigned_struct_names = None
 
         for statement in main_function.statements:
             execution_change = self.statement(statement)
@@ -61,25 +66,18 @@ class Interpreter:
     def statement(self, statement):
         if isinstance(statement, VariableDeclaration):
             value = self.default_variable_value(statement.variable_type)
-            self.scope_stack.set_variable(statement.name, value)
+            self.frame[statement.slot] = value
         elif isinstance(statement, VariableDefinition):
             value = self.expression(statement.value)
-            self.scope_stack.set_variable(statement.name, value)
+            self.frame[statement.slot] = self.stored(value)
         elif isinstance(statement, VariableAssign):
             value = self.expression(statement.value)
-            variable = self.lookup_variable(statement.variable_access)
-            if variable.type == ValueType.ENUM:
-                variable.type = ValueType.ENUM
-                variable.type_name = value.type_name
-                variable.value = value.value
-            else:
-                variable.__dict__.update(value.__dict__)
+            container, key = self.locate_variable(statement.variable_access)
+            self.assign(container, key, value)
         elif isinstance(statement, FunctionCall):
             self.function_call(statement)
         elif isinstance(statement, Loop):
             execution_change = None
-            self.scope_stack.push_scope()
-
             counter = 0
             while True:
                 execution_change = self.statement(statement.statements[counter])
@@ -98,56 +96,31 @@ class Interpreter:
                 if counter == len(statement.statements):
                     counter = 0
 
-            self.scope_stack.pop_scope()
             return execution_change
         elif isinstance(statement, If):
-            value = self.expression(statement.condition)
-            if (
-                value.type != ValueType.PRIMITIVE
-                or value.primitive_type != PrimitiveType.BOOL
-            ):
-                raise InternalCompilerError(
-                    "Returned value from if expression is not bool, "
-                    "should have been checked by validation pass"
-                )
-            if value.value is True:
+            if self.expression(statement.condition) is True:
                 execution_change = None
-                self.scope_stack.push_scope()
                 for statement in statement.statements:
                     execution_change = self.statement(statement)
                     if execution_change:  # break, continue or return
                         break
-                self.scope_stack.pop_scope()
                 return execution_change
 
             for elif_statement in statement.elif_statements:
-                value = self.expression(elif_statement.condition)
-                if (
-                    value.type != ValueType.PRIMITIVE
-                    or value.primitive_type != PrimitiveType.BOOL
-                ):
-                    raise InternalCompilerError(
-                        "Returned value from elif expression is not bool, "
-                        "should have been checked by validation pass"
-                    )
-                if value.value is True:
+                if self.expression(elif_statement.condition) is True:
                     execution_change = None
-                    self.scope_stack.push_scope()
                     for statement in elif_statement.statements:
                         execution_change = self.statement(statement)
                         if execution_change:  # break, continue or return
                             break
-                    self.scope_stack.pop_scope()
                     return execution_change
 
             if statement.else_statement:
                 execution_change = None
-                self.scope_stack.push_scope()
                 for statement in statement.else_statement.statements:
                     execution_change = self.statement(statement)
                     if execution_change:  # break, continue or return
                         break
-                self.scope_stack.pop_scope()
                 return execution_change
         elif isinstance(statement, Match):
             return self.match_statement(statement)
@@ -167,110 +140,130 @@ class Interpreter:
             raise InternalCompilerError("unhandled statement")
 
     def match_statement(self, statement: Match):
-        scrutinee_value = self.expression(statement.scrutinee)
-        if isinstance(scrutinee_value.value, dict):
-            active_variant = scrutinee_value.value["variant"]
-            variant_data = scrutinee_value.value.get("data", {})
+        if statement.arm_table is None:
+            raise InternalCompilerError("Match statement was not validated")
+        payload = self.expression(statement.scrutinee).value
+        if isinstance(payload, tuple):
+            chosen_arm = statement.arms[statement.arm_table[payload[0]]]
+            pattern = chosen_arm.pattern
+            for offset, slot in zip(pattern.binding_offsets, pattern.binding_slots):
+                # the fields follow the discriminant
+                self.frame[slot] = payload[offset + 1]
         else:
-            active_variant = scrutinee_value.value
-            variant_data = {}
-
-        chosen_arm = None
-        for arm in statement.arms:
-            if arm.pattern.is_wildcard:
-                if chosen_arm is None:
-                    chosen_arm = arm
-                continue
-            if arm.pattern.variant_name == active_variant:
-                chosen_arm = arm
-                break
-
-        if chosen_arm is None:
-            raise InternalCompilerError(
-                "No match arm was selected; should have been caught by "
-                "exhaustiveness check"
-            )
-
-        self.scope_stack.push_scope()
-        if not chosen_arm.pattern.is_wildcard:
-            for binding in chosen_arm.pattern.bindings:
-                self.scope_stack.set_variable(binding, variant_data[binding])
+            chosen_arm = statement.arms[statement.arm_table[payload]]
 
         execution_change = None
         for arm_statement in chosen_arm.statements:
             execution_change = self.statement(arm_statement)
             if execution_change:
                 break
-        self.scope_stack.pop_scope()
         return execution_change
 
-    def index_lookup(
-        self,
-        value: Value,
-        array_access: BaseExpression,
-    ) -> Value:
-        index = self.expression(array_access)
-        if value.is_array:
-            if index.value < 0 or index.value >= len(value.value):
-                raise Exception("Array index out of bounds")
-            return value.value[index.value]
-        elif (
-            value.type == ValueType.PRIMITIVE
-            and value.primitive_type == PrimitiveType.STRING
-        ):
-            if index.value < 0 or index.value >= len(value.value):
-                raise Exception("String index out of bounds")
-            return Value(
-                type=ValueType.PRIMITIVE,
-                primitive_type=PrimitiveType.CHAR,
-                value=value.value[index.value],
-            )
-        else:
-            raise Exception("Indexing not supported for this type")
+    def struct_location(self, struct: Value, variable_access: VariableAccess):
+        self.unshare(struct)
+        return self.access_location(
+            struct.value, variable_access.offset, variable_access
+        )
 
-    def struct_lookup(self, struct: Value, variable_access: VariableAccess) -> Value:
-        value = struct.value[variable_access.variable_name]
-        if variable_access.variable_access is not None:
-            value = self.struct_lookup(value, variable_access.variable_access)
+    def struct_lookup(self, struct: Value, variable_access: VariableAccess) -> Any:
+        return self.access_lookup(struct.value[variable_access.offset], variable_access)
 
+    def access_location(self, container, key, variable_access: VariableAccess):
+        """The location of the element and member of container[key] that
+        variable_access accesses, the element comes first."""
+        value = container[key]
+        member_access = variable_access.variable_access
+        if variable_access.array_access is not None:
+            index = self.expression(variable_access.array_access)
+            if member_access is not None and self.is_columnar(value):
+                index = self.checked_index(value, index)
+                self.unshare(value)
+                return value.value.columns[member_access.offset], index
+            container, key = self.index_location(value, index)
+            value = container[key]
+
+        if member_access is not None:
+            if isinstance(value, Value) and value.type == ValueType.STRUCT:
+                container, key = self.struct_location(value, member_access)
+        return container, key
+
+    def access_lookup(self, value: Any, variable_access: VariableAccess) -> Any:
+        """The element and member of value that variable_access accesses."""
+        member_access = variable_access.variable_access
         if variable_access.array_access is not None:
-            value = self.index_lookup(value, variable_access.array_access)
+            index = self.expression(variable_access.array_access)
+            if member_access is not None and self.is_columnar(value):
+                # the member is read straight from its column
+                index = self.checked_index(value, index)
+                return value.value.columns[member_access.offset][index]
+            value = self.index_lookup(value, index)
+
+        if member_access is not None:
+            if isinstance(value, Value) and value.type == ValueType.STRUCT:
+                value = self.struct_lookup(value, member_access)
         return value
 
-    def lookup_variable(self, variable_access: VariableAccess) -> Value:
-        # If the variable name is an enum type, check for enum access
-        if variable_access.variable_name in self.global_scope.enums:
+    def locate_variable(self, variable_access: VariableAccess):
+        """The container and key of the accessed variable, member or element,
+        for assigning it or passing it to a reference parameter."""
+        if variable_access.slot is None:
+            # an enum access, it is not stored anywhere
+            return [self.lookup_variable(variable_access)], 0
+
+        container, key = self.frame, variable_access.slot
+        value = container[key]
+        if isinstance(value, Reference):
+            container, key = value.container, value.key
+        return self.access_location(container, key, variable_access)
+
+    def lookup_variable(self, variable_access: VariableAccess) -> Any:
+        # Variables have a slot, otherwise this is an enum access
+        if (
+            variable_access.slot is None
+            and variable_access.variable_name in self.global_scope.enums
+        ):
             if variable_access.variable_access is None:
                 raise ContextException(
                     "Enum access must specify a member", variable_access.context
                 )
-            enum_def = self.global_scope.enums[variable_access.variable_name]
-            enum_value = enum_def.entries[
-                variable_access.variable_access.variable_name
-            ].name
-            return Value(
-                type=ValueType.ENUM,
-                value=enum_value,
-                type_name=variable_access.variable_name,
+            return self.enum_value(
+                variable_access.variable_name,
+                variable_access.variable_access.variable_name,
             )
 
-        # Try to get the variable from scope
-        value = self.scope_stack.get_variable(variable_access.variable_name)
-        if value is not None:
-            # handle struct access
-            if variable_access.variable_access is not None:
-                if value.type == ValueType.STRUCT:
-                    value = self.struct_lookup(value, variable_access.variable_access)
-
-            if variable_access.array_access is not None:
-                value = self.index_lookup(value, variable_access.array_access)
+        if variable_access.slot is not None:
+            method_call = variable_access.method_call
+            if method_call is not None and method_call.function_name == "append":
+                receiver_type = method_call.receiver_type
+                if (
+                    receiver_type is not None
+                    and receiver_type.primitive_type == PrimitiveType.STRING
+                ):
+                    # strings are immutable, the receiver is replaced
+                    container, key = self.locate_variable(variable_access)
+                    (value,) = self.evaluate_call_parameters(method_call)
+                    self.string_append(container, key, value, method_call)
+                    return None
+
+            value = self.frame[variable_access.slot]
+            if isinstance(value, Reference):
+                value = value.container[value.key]
+            if (
+                variable_access.array_access is not None
+                or variable_access.variable_access is not None
+            ):
+                value = self.access_lookup(value, variable_access)
+            if isinstance(value, StringBuilder):
+                value = str(value)
 
-            if variable_access.method_call is not None:
-                value = self.method_call(value, variable_access.method_call)
+            if method_call is not None:
+                value = self.call_method(
+                    value, method_call, self.evaluate_call_parameters(method_call)
+                )
 
             return value
 
-        # If not found in scope and not an enum, raise error
+        # no slot and not an enum, the validation pass did not run
         raise ContextException(
             f"Unknown variable: {variable_access.variable_name}",
             variable_access.context,
@@ -286,142 +279,77 @@ class Interpreter:
         elif isinstance(expression, MathOperation):
             operand1_value = self.expression(expression.operand1)
             operand2_value = self.expression(expression.operand2)
-            if (
-                not operand1_value.type == ValueType.PRIMITIVE
-                or operand1_value.primitive_type not in NUMBER_TYPES
-                or operand1_value.is_array
-            ):
-                raise Exception(
-                    f"{expression.operator} operator not supported on type: {operand1_value}"
-                )
-            if (
-                not operand2_value.type == ValueType.PRIMITIVE
-                or operand2_value.primitive_type not in NUMBER_TYPES
-                or operand2_value.is_array
-            ):
-                raise Exception(
-                    f"{expression.operator} operator not supported on type: {operand2_value}"
-                )
-            if (
-                operand1_value.primitive_type == PrimitiveType.F32
-                or operand2_value.primitive_type == PrimitiveType.F32
-            ) and operand1_value.primitive_type != operand2_value.primitive_type:
-                raise Exception(
-                    f"{expression.operator} operator only works between int types"
-                    " or float types, not float and int."
-                )
             if expression.operator == "+":
-                value = operand1_value.value + operand2_value.value
+                return operand1_value + operand2_value
             elif expression.operator == "-":
-                value = operand1_value.value - operand2_value.value
+                return operand1_value - operand2_value
             elif expression.operator == "*":
-                value = operand1_value.value * operand2_value.value
+                return operand1_value * operand2_value
             elif expression.operator == "/":
-                value = operand1_value.value // operand2_value.value
+                return operand1_value // operand2_value
             elif expression.operator == "%":
-                value = operand1_value.value % operand2_value.value
+                return operand1_value % operand2_value
             else:
                 raise InternalCompilerError("Unknown operator")
-            if not expression.type:
-                raise InternalCompilerError("Expression type not set")
-            return Value(
-                type=ValueType.PRIMITIVE,
-                value=value,
-                primitive_type=expression.type.primitive_type,
-            )
         elif isinstance(expression, CompareOperation):
             operand1_value = self.expression(expression.operand1)
             operand2_value = self.expression(expression.operand2)
 
-            if (
-                operand1_value.type == ValueType.ENUM
-                and operand2_value.type == ValueType.ENUM
-            ):
+            operand_type = expression.operand1.type
+            if not operand_type:
+                raise InternalCompilerError("Expression type not set")
+            if operand_type.variable_type == VariableTypeEnum.ENUM:
                 return self.enum_compare(
                     operand1_value, operand2_value, expression.operator
                 )
-
-            if (
-                not operand1_value.type == ValueType.PRIMITIVE
-                or operand1_value.is_array
-            ):
-                raise Exception(
-                    f"{expression.operator} operator not supported on type: {operand1_value}"
-                )
-            if (
-                not operand2_value.type == ValueType.PRIMITIVE
-                or operand2_value.is_array
-            ):
-                raise Exception(
-                    f"{expression.operator} operator not supported on type: {operand2_value}"
-                )
-            if not (
-                operand1_value.primitive_type in INTEGER_TYPES
-                and operand2_value.primitive_type in INTEGER_TYPES
-                or operand1_value.primitive_type == operand2_value.primitive_type
-            ):
-                # integer types can be compared to all other integer types,
-                # but string, float and bool can only compare to itself
-                raise Exception(
-                    "comparision operator between two incompatible primitive types: "
-                    f"{operand1_value.primitive_type}, {operand2_value.primitive_type}"
-                )
-            if operand1_value.primitive_type in (
+            if operand_type.primitive_type in (
                 PrimitiveType.STRING,
                 PrimitiveType.BOOL,
             ) and expression.operator not in ("==", "!="):
                 raise Exception(
-                    f"invalid operator for type {operand1_value.primitive_type}"
+                    f"invalid operator for type {operand_type.primitive_type}"
                 )
             if expression.operator == "==":
-                value = operand1_value.value == operand2_value.value
+                return operand1_value == operand2_value
             elif expression.operator == "!=":
-                value = operand1_value.value != operand2_value.value
+                return operand1_value != operand2_value
             elif expression.operator == ">=":
-                value = operand1_value.value >= operand2_value.value
+                return operand1_value >= operand2_value
             elif expression.operator == ">":
-                value = operand1_value.value > operand2_value.value
+                return operand1_value > operand2_value
             elif expression.operator == "<":
-                value = operand1_value.value < operand2_value.value
+                return operand1_value < operand2_value
             elif expression.operator == "<=":
-                value = operand1_value.value <= operand2_value.value
+                return operand1_value <= operand2_value
             else:
                 raise InternalCompilerError("Unknown operator")
-            return Value(
-                type=ValueType.PRIMITIVE,
-                value=value,
-                primitive_type=PrimitiveType.BOOL,
-            )
         elif isinstance(expression, UnaryOperation):
             operand_value = self.expression(expression.operand)
             if expression.operator == "not":
-                if (
-                    not operand_value.type == ValueType.PRIMITIVE
-                    or operand_value.primitive_type != PrimitiveType.BOOL
-                    or operand_value.is_array
-                ):
-                    raise Exception(
-                        f"not operator only works on bool values, got: {operand_value}"
-                    )
-                return Value(
-                    type=ValueType.PRIMITIVE,
-                    value=not operand_value.value,
-                    primitive_type=PrimitiveType.BOOL,
-                )
+                return not operand_value
             elif expression.operator == "-":
-                return Value(
-                    type=ValueType.PRIMITIVE,
-                    value=-operand_value.value,
-                    primitive_type=operand_value.primitive_type,
-                )
+                return -operand_value
             else:
                 raise InternalCompilerError(
                     f"Unknown unary operator: {expression.operator}"
                 )
         elif isinstance(expression, StructInitialization):
-            return self.struct_initialization(expression)
+            return self.struct_value(
+                expression.struct_name,
+                (
+                    (field_init.offset, self.expression(field_init.value))
+                    for field_init in expression.field_inits
+                ),
+            )
         elif isinstance(expression, EnumVariantInitialization):
-            return self.enum_variant_initialization(expression)
+            return self.variant_value(
+                expression.enum_name,
+                expression.variant_name,
+                (
+                    (field_init.offset, self.expression(field_init.value))
+                    for field_init in expression.field_inits
+                ),
+            )
         else:
             raise InternalCompilerError("Unknown expression")
 
@@ -433,15 +361,16 @@ class Interpreter:
         else:
             raise Exception(f"Unknown function called: {func_call.function_name}")
 
-        evaluated_params = self.evaluate_call_parameters(function, func_call)
+        pinned = len(self.pinned)
+        evaluated_params = self.evaluate_call_parameters(func_call)
 
         if isinstance(function, BuiltinFunction):
-            return function.function_ptr(evaluated_params, context=func_call.context)
+            return_value = self.builtin_call(func_call, evaluated_params)
         else:
-            old_scope_stack = self.scope_stack
-            self.scope_stack = ScopeStack()
-            for i, param_type in enumerate(function.function_params):
-                self.scope_stack.set_variable(param_type.name, evaluated_params[i])
+            old_frame = self.frame
+            # the parameters are in the first slots
+            self.frame = evaluated_params
+            self.frame.extend([None] * (function.frame_size - len(evaluated_params)))
 
             return_value = None
             for statement in function.statements:
@@ -456,209 +385,72 @@ class Interpreter:
                             f"invalid execution change type in function: {change_type}"
                         )
 
-            self.scope_stack = old_scope_stack
-            return return_value
-
-    def method_call(self, value: Value, method_call: FunctionCall) -> Value:
-        if value.is_array:
-            methods = get_builtin_array_methods()
-        elif value.type == ValueType.PRIMITIVE:
-            methods = get_builtin_primitive_methods()[value.primitive_type]
-        elif value.type == ValueType.ENUM:
-            raise Exception("Method calls not supported for enum types")
-        else:
-            raise Exception(f"Method calls not supported for type: {value.type}")
-
-        if method_call.function_name not in methods:
-            raise Exception(f"Unknown method: {method_call.function_name}")
-
-        method = methods[method_call.function_name]
-        evaluated_params = self.evaluate_call_parameters(method, method_call)
-        evaluated_params.insert(
-            0, value
-        )  # Add the object itself as the first parameter
-
-        return method.function_ptr(evaluated_params, context=method_call.context)
-
-    def enum_compare(
-        self, operand1_value: Value, operand2_value: Value, operator: str
-    ) -> Value:
-        if operand1_value.type_name != operand2_value.type_name:
-            raise Exception("Cannot compare enums of different types")
-
-        # Extract variant names for comparison
-        # Simple enums: value is a string (variant name)
-        # Tagged enums: value is a dict with "variant" and "data"
-        variant1 = (
-            operand1_value.value["variant"]
-            if isinstance(operand1_value.value, dict)
-            else operand1_value.value
-        )
-        variant2 = (
-            operand2_value.value["variant"]
-            if isinstance(operand2_value.value, dict)
-            else operand2_value.value
-        )
-
-        if operator == "==":
-            result = variant1 == variant2
-        elif operator == "!=":
-            result = variant1 != variant2
-        else:
-            raise Exception(f"Invalid operator for enum comparison: {operator}")
-        return Value(
-            type=ValueType.PRIMITIVE,
-            value=result,
-            primitive_type=PrimitiveType.BOOL,
-        )
+            self.frame = old_frame
+        del self.pinned[pinned:]
+        return return_value
 
-    def evaluate_call_parameters(self, function, func_call):
+    def evaluate_call_parameters(self, func_call: FunctionCall) -> List[Any]:
+        bound_arguments = func_call.bound_arguments
+        if bound_arguments is None:
+            raise InternalCompilerError("Function call was not validated")
         evaluated_params = []
-        bound_arguments = bind_call_arguments(
-            func_call, function.function_params, func_call.function_name
-        )
         for argument_expr, param in bound_arguments:
-            is_ref_param = param.reference
-            if is_ref_param and not isinstance(argument_expr, VariableAccess):
-                raise ContextException(
-                    "Reference parameters can only be variables", argument_expr.context
-                )
-            evaluated_param = self.expression(argument_expr)
-            if not is_ref_param:
-                evaluated_param = copy.deepcopy(evaluated_param)
+            if param.reference:
+                # the validation pass only binds variables to references
+                assert isinstance(argument_expr, VariableAccess)
+                container, key = self.locate_variable(argument_expr)
+                evaluated_param = self.reference_argument(container, key)
+            else:
+                evaluated_param = self.expression(argument_expr)
+                if isinstance(evaluated_param, Value):
+                    evaluated_param = self.lazy_copy(evaluated_param)
             evaluated_params.append(evaluated_param)
         return evaluated_params
 
-    def default_variable_value(self, variable_type):
-        base_type = variable_type.variable_type
-        if base_type == VariableTypeEnum.PRIMITIVE:
-            primitive_type = variable_type.primitive_type
-            if primitive_type in INTEGER_TYPES:
-                return Value(
-                    type=ValueType.PRIMITIVE, value=0, primitive_type=primitive_type
-                )
-            elif primitive_type == PrimitiveType.F32:
-                return Value(
-                    type=ValueType.PRIMITIVE, value=0.0, primitive_type=primitive_type
-                )
-            elif primitive_type == PrimitiveType.STRING:
-                return Value(
-                    type=ValueType.PRIMITIVE, value="", primitive_type=primitive_type
-                )
-            elif primitive_type == PrimitiveType.BOOL:
-                return Value(
-                    type=ValueType.PRIMITIVE, value=False, primitive_type=primitive_type
-                )
-            else:
-                raise InternalCompilerError("primitive type not handled")
-        elif base_type == VariableTypeEnum.ARRAY:
-            if variable_type.array_type.variable_type == VariableTypeEnum.PRIMITIVE:
-                return Value(
-                    type=ValueType.PRIMITIVE,
-                    value=[],
-                    primitive_type=variable_type.array_type.primitive_type,
-                    is_array=True,
-                )
-            elif variable_type.array_type.variable_type == VariableTypeEnum.STRUCT:
-                return Value(
-                    type=ValueType.STRUCT,
-                    value=[],
-                    type_name=variable_type.array_type.type_name,
-                    is_array=True,
-                )
-            elif variable_type.array_type.variable_type == VariableTypeEnum.ENUM:
-                return Value(
-                    type=ValueType.ENUM,
-                    value=[],
-                    type_name=variable_type.array_type.type_name,
-                    is_array=True,
-                )
-            else:
-                raise NotImplementedError(
-                    "array type not implemented"
-                )  # multidimensional arrays
-        elif base_type == VariableTypeEnum.STRUCT:
-            struct_def = self.global_scope.structs[variable_type.type_name]
-            struct_data = {}
-            for member in struct_def.members:
-                if member.default_value is not None:
-                    struct_data[member.name] = self.expression(member.default_value)
-                else:
-                    struct_data[member.name] = self.default_variable_value(
-                        member.param_type
-                    )
-            return Value(
-                type=ValueType.STRUCT,
-                value=struct_data,
-                type_name=variable_type.type_name,
-            )
-        else:
-            raise InternalCompilerError("Unknown variable type")
-
-    def value_from_constant(self, constant: Constant) -> Value:
+    def value_from_constant(self, constant: Constant) -> Any:
         if not constant.type:
             raise InternalCompilerError("Expression type not set")
-        if constant.type.primitive_type == PrimitiveType.CHAR:
-            return Value(
-                type=ValueType.PRIMITIVE,
-                value=constant.value,
-                primitive_type=constant.type.primitive_type,
-            )
-        return Value(
-            type=ValueType.PRIMITIVE,
-            value=constant.value,
-            primitive_type=constant.type.primitive_type,
-        )
-
-    def struct_initialization(self, expression: StructInitialization):
-        # Get the struct definition
-        struct_def = self.global_scope.structs[expression.struct_name]
-
-        # Start with default values for all fields
-        struct_data = {}
-        for member in struct_def.members:
-            if member.default_value is not None:
-                struct_data[member.name] = self.expression(member.default_value)
-            else:
-                struct_data[member.name] = self.default_variable_value(
-                    member.param_type
-                )
-
-        # Override with explicitly initialized fields
-        for field_init in expression.field_inits:
-            field_value = self.expression(field_init.value)
-            struct_data[field_init.field_name] = field_value
-
-        return Value(
-            type=ValueType.STRUCT,
-            value=struct_data,
-            type_name=expression.struct_name,
-        )
-
-    def enum_variant_initialization(self, expression: EnumVariantInitialization):
-        # Get the enum and variant definition
-        enum_def = self.global_scope.enums[expression.enum_name]
-        variant_entry = enum_def.entries[expression.variant_name]
-
-        # Start with default values for all fields
-        variant_data = {}
-        for field in variant_entry.fields:
-            if field.default_value is not None:
-                variant_data[field.name] = self.expression(field.default_value)
-            else:
-                variant_data[field.name] = self.default_variable_value(field.param_type)
-
-        # Override with explicitly initialized fields
-        for field_init in expression.field_inits:
-            field_value = self.expression(field_init.value)
-            variant_data[field_init.field_name] = field_value
-
-        # Return enum value with discriminant and payload
-        # Store as dict with "variant" (discriminant) and "data" (payload)
-        enum_value = {"variant": expression.variant_name, "data": variant_data}
-
-        return Value(
-            type=ValueType.ENUM,
-            value=enum_value,
-            type_name=expression.enum_name,
-        )
+        return constant.value
+
+
+ENGINES = ("tree", "closure", "vm", "python", "native")
+
+
+def get_interpreter(
+    engine: str = "tree",
+    max_call_depth: Optional[int] = None,
+    columnar_structs: bool = False,
+):
+    """ "tree" walks the AST, "closure" runs the program compiled into Python
+    closures by xlang.closure_interpreter, "vm" runs the bytecode of
+    xlang.bytecode on the stack machine of xlang.vm, "python" runs the program
+    transpiled to Python by xlang.transpiler. They share the semantics of
+    the tree engine: a variable, member or field gets a copy of a primitive,
+    string or enum and shares a struct or array, see tests/lit/aliasing.xl.
+    The unit tests compare their output on the lit tests.
+    "native" builds the program with the C backend of xlang.c_backend, which
+    only supports a subset of the language and has fixed-width integers.
+
+    The "vm" engine does not recurse on the Python stack for xlang calls, its
+    call depth is limited by max_call_depth, if given. The other engines are
+    limited by the Python recursion limit and do not accept max_call_depth.
+
+    columnar_structs stores arrays of structs with number members column by
+    column in the "tree" engine, see xlang.runtime. The other engines do not
+    accept it."""
+    if max_call_depth is not None and engine != "vm":
+        raise ValueError(f"max_call_depth is not supported by the {engine} engine")
+    if columnar_structs and engine != "tree":
+        raise ValueError(f"columnar_structs is not supported by the {engine} engine")
+    if engine == "tree":
+        return Interpreter(columnar_structs)
+    elif engine == "closure":
+        return ClosureInterpreter()
+    elif engine == "vm":
+        return VirtualMachine(max_call_depth)
+    elif engine == "python":
+        return PythonEngine()
+    elif engine == "native":
+        return NativeEngine()
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
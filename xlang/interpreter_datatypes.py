@@ -1,12 +1,27 @@
+import weakref
 from enum import Enum, auto
-from typing import Optional, Any
-from pydantic import BaseModel
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field
 
-from xlang.exceptions import InternalCompilerError
 from xlang.xl_ast import (
     PrimitiveType,
 )
 
+# array.array type codes of the NumberArrays of the tree interpreter, arrays
+# of other primitives are lists. f32 elements are doubles, like the
+# Python floats the interpreters compute with.
+ARRAY_TYPECODES = {
+    PrimitiveType.I64: "q",
+    PrimitiveType.I32: "i",
+    PrimitiveType.I16: "h",
+    PrimitiveType.I8: "b",
+    PrimitiveType.U64: "Q",
+    PrimitiveType.U32: "I",
+    PrimitiveType.U16: "H",
+    PrimitiveType.U8: "B",
+    PrimitiveType.F32: "d",
+}
+
 
 class ValueType(Enum):
     PRIMITIVE = auto()
@@ -20,24 +35,147 @@ class Value(BaseModel):
     primitive_type: Optional[PrimitiveType] = None
     is_array: bool = False
     type_name: Optional[str] = None  # for structs and enums
+    # set by the tree interpreter for copy-on-write, see Share
+    share: Any = Field(default=None, repr=False, exclude=True)
+
+
+class Share:
+    """The Values that hold the same struct, array or enum payload because one
+    was assigned to the other, writes through one of them are seen by all.
+
+    Lazy copies of the Values hold the payload too, with a Share of their own.
+    holders has the live Shares of the payload, while there is more than one
+    the payload is copied before it is written."""
+
+    __slots__ = ("values", "holders", "__weakref__")
+
+    def __init__(self, value: Value, holders: Optional[weakref.WeakSet] = None):
+        self.values = [weakref.ref(value)]
+        if holders is None:
+            holders = weakref.WeakSet()
+        holders.add(self)
+        self.holders = holders
+
+
+class Reference:
+    """Location of a primitive passed to a reference parameter, primitives
+    are plain Python values. Structs, arrays and enums are passed as their
+    Value instead."""
+
+    __slots__ = ("container", "key")
+
+    def __init__(self, container, key):
+        self.container = container
+        self.key = key
+
+
+class NumberArray:
+    """Payload of an array of numbers, the numbers are kept in an array.array
+    buffer. Integers are not wrapped, storing one outside of the range of the
+    buffer's type turns the buffer into a list of the numbers."""
+
+    __slots__ = ("buffer",)
+
+    def __init__(self, buffer: Any):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, index: int) -> Any:
+        return self.buffer[index]
+
+    def __setitem__(self, index: int, number: Any):
+        try:
+            self.buffer[index] = number
+        except OverflowError:
+            self.buffer = list(self.buffer)
+            self.buffer[index] = number
+
+    def __iter__(self):
+        return iter(self.buffer)
+
+    def append(self, number: Any):
+        try:
+            self.buffer.append(number)
+        except OverflowError:
+            self.buffer = list(self.buffer)
+            self.buffer.append(number)
+
+    def copy(self) -> "NumberArray":
+        return NumberArray(self.buffer[:])
+
+
+class StructColumns:
+    """Payload of an array of structs in columnar layout, one NumberArray
+    per struct member, indexed by the member offsets. The elements are read
+    and written as StructRow views of the columns, they are never assigned
+    as a whole, see xlang.runtime."""
+
+    __slots__ = ("columns", "type_name")
+
+    def __init__(self, columns: List[Any], type_name: str):
+        self.columns = columns
+        self.type_name = type_name
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def __getitem__(self, index: int) -> Value:
+        return Value(
+            type=ValueType.STRUCT,
+            value=StructRow(self.columns, index),
+            type_name=self.type_name,
+        )
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def append(self, value: Value):
+        for column, member in zip(self.columns, value.value):
+            column.append(member)
+
+    def copy(self) -> "StructColumns":
+        return StructColumns([column.copy() for column in self.columns], self.type_name)
+
+
+class StructRow:
+    """Members of one element of a StructColumns payload, used as the payload
+    of the struct Value of the element. Writes go to the columns."""
+
+    __slots__ = ("columns", "index")
+
+    def __init__(self, columns: List[Any], index: int):
+        self.columns = columns
+        self.index = index
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __getitem__(self, offset: int) -> Any:
+        return self.columns[offset][self.index]
+
+    def __setitem__(self, offset: int, member: Any):
+        self.columns[offset][self.index] = member
+
+    def __iter__(self):
+        return (column[self.index] for column in self.columns)
 
 
-class ScopeStack:
-    def __init__(self):
-        self.stack = [{}]
+class StringBuilder:
+    """A string in a variable, member or element that was appended to. The
+    parts are joined when the string is read, so building a string one
+    character at a time takes linear time."""
 
-    def set_variable(self, name: str, value: Value):
-        self.stack[-1][name] = value
+    __slots__ = ("parts",)
 
-    def get_variable(self, name: str) -> Value:
-        for stack in reversed(self.stack):
-            if name in stack:
-                return stack[name]
-        # this should have been detected by the validation pass
-        raise InternalCompilerError(f"Unknown variable: {name}")
+    def __init__(self, string: str):
+        self.parts = [string]
 
-    def push_scope(self):
-        self.stack.append({})
+    def append(self, string: str):
+        self.parts.append(string)
 
-    def pop_scope(self):
-        self.stack.pop()
+    def __str__(self) -> str:
+        if len(self.parts) > 1:
+            self.parts = ["".join(self.parts)]
+        return self.parts[0]
@@ -1,5 +1,12 @@
+import functools
+import getpass
+import hashlib
 import os
+import sys
+import tempfile
+from typing import Optional
 
+import lark
 from lark import Lark
 from lark.exceptions import UnexpectedCharacters, UnexpectedToken, VisitError
 from xlang.exceptions import (
@@ -8,26 +15,96 @@ from xlang.exceptions import (
     UnexpectedTokenException,
 )
 
+from xlang.rd_parser import RDParser
 from xlang.transformer import ASTTransformer
 
+GRAMMAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grammar.lark")
+
+
+@functools.lru_cache(maxsize=None)
+def load_grammar() -> str:
+    with open(GRAMMAR_PATH) as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def build_lark_parser(build_tree: bool = True) -> Lark:
+    # The LALR tables are serialized to a cache file by lark, which stores a
+    # hash of the grammar, the parser options and the lark version in it. Only
+    # the first process after a grammar change pays for the grammar analysis.
+    # The transformer is not part of lark's hash, so both parsers need their
+    # own cache file or the cached options leak the transformer between them.
+
+    # The transformer callbacks run on every reduction of the LALR parser, so
+    # the xl_ast nodes are built directly without an intermediate lark.Tree.
+    transformer = None if build_tree else ASTTransformer()
+    cache_path = lark_cache_path("tree" if build_tree else "ast")
+    if cache_path is not None:
+        try:
+            return Lark(
+                load_grammar(),
+                parser="lalr",
+                cache=cache_path,
+                transformer=transformer,
+            )
+        except OSError:
+            # lark does not guard writing the cache file
+            pass
+    return Lark(load_grammar(), parser="lalr", transformer=transformer)
+
+
+def lark_cache_path(name: str) -> Optional[str]:
+    """Path of the cache file of the named parser, None if there is no usable
+    cache directory.
+
+    The files are in a directory of the temp directory that only the current
+    user can write, lark unpickles them. The name has a hash of the grammar,
+    the lark and the Python version, so checkouts with different grammars do
+    not overwrite each other's tables.
+    """
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    cache_dir = os.path.join(tempfile.gettempdir(), f"xlang-lark-{user}")
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        status = os.stat(cache_dir)
+    except OSError:
+        return None
+    if hasattr(os, "getuid") and (
+        status.st_uid != os.getuid() or status.st_mode & 0o022
+    ):
+        # created by another user
+        return None
+    key = f"{load_grammar()}{name}{lark.__version__}{sys.version_info[:2]}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}_{digest}.tmp")
+
 
 class Parser:
-    def __init__(self):
-        grammar_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), "grammar.lark"
-        )
-        with open(grammar_path) as f:
-            grammar = f.read()
-        self.lark_parser = Lark(grammar, parser="lalr")
+    def __init__(self, build_tree: bool = False):
+        self.build_tree = build_tree
+        self.lark_parser = build_lark_parser(build_tree)
         self.transformer = ASTTransformer()
 
     def parse(self, source_code):
         try:
             tree = self.lark_parser.parse(source_code)
         except UnexpectedToken as ex:
-            raise UnexpectedTokenException(ex)
+            if not self.build_tree:
+                # Lark computes the accepted tokens by replaying the parser,
+                # which would run the AST callbacks on placeholder tokens.
+                # Parse again without callbacks to report the syntax error.
+                try:
+                    build_lark_parser(True).parse(source_code)
+                except UnexpectedToken as tree_ex:
+                    ex = tree_ex
+            raise UnexpectedTokenException.from_lark(ex)
         except UnexpectedCharacters as ex:
-            raise UnexpectedCharacterException(ex)
+            raise UnexpectedCharacterException.from_lark(ex)
+
+        if not self.build_tree:
+            # ContextExceptions raised by the transformer callbacks are not
+            # wrapped into a VisitError when transforming during the parse.
+            return tree
 
         # transform into our own ast
         try:
@@ -37,3 +114,25 @@ class Parser:
                 raise ex.orig_exc
             else:
                 raise ex
+
+
+FRONTENDS = ("lark", "rd", "lazy")
+
+
+@functools.lru_cache(maxsize=None)
+def get_parser(frontend: str = "lark"):
+    """Process-wide parser instance, the parsers keep no state between parses.
+
+    "lark" is the grammar.lark based parser, "rd" the hand-written recursive
+    descent parser from xlang.rd_parser. Both produce the same AST. "lazy" is
+    the recursive descent parser without function bodies, validation_pass
+    parses the bodies of the functions reachable from main.
+    """
+    if frontend == "lark":
+        return Parser()
+    elif frontend == "rd":
+        return RDParser()
+    elif frontend == "lazy":
+        return RDParser(lazy=True)
+    else:
+        raise ValueError(f"Unknown frontend: {frontend}")
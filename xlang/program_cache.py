@@ -0,0 +1,145 @@
+import functools
+import hashlib
+import os
+import pickle
+from typing import Any, BinaryIO, Callable, Optional
+
+import xlang
+from xlang.xl_ast import GlobalScope
+
+CACHE_DIR_NAME = "__xlcache__"
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_fingerprint() -> str:
+    """Hash of the xlang version, grammar.lark and the compiler modules.
+
+    The cached ASTs are pickled instances of the xl_ast classes, so a change
+    to any module has to invalidate them, not only a version bump.
+    """
+    digest = hashlib.sha256()
+    digest.update(xlang.__version__.encode())
+    package_dir = os.path.dirname(os.path.abspath(xlang.__file__))
+    for file_name in sorted(os.listdir(package_dir)):
+        if file_name.endswith((".py", ".lark")):
+            with open(os.path.join(package_dir, file_name), "rb") as f:
+                digest.update(file_name.encode())
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(source_code: str, options: str = "") -> str:
+    digest = hashlib.sha256(compiler_fingerprint().encode())
+    digest.update(options.encode() + b"\0")
+    digest.update(source_code.encode())
+    return digest.hexdigest()
+
+
+def key_line(path: str, source_code: str, options: str) -> bytes:
+    # the key is a comment in the generated Python files
+    prefix = "# " if path.endswith(".py") else ""
+    return f"{prefix}{cache_key(source_code, options)}\n".encode()
+
+
+class ProgramCache:
+    """Stores validated GlobalScopes next to the source file, like __pycache__.
+
+    Every chunk of a file gets its own cache file. The key of the cached
+    program is stored in the first line of the file and compared on load,
+    so a changed chunk or compiler overwrites the stale entry. options are
+    part of the key too, for compiler options that change the cached program.
+    The Python code generated by xlang.transpiler is cached the same way.
+    """
+
+    def __init__(self, source_path: str):
+        self.cache_dir = os.path.join(
+            os.path.dirname(os.path.abspath(source_path)), CACHE_DIR_NAME
+        )
+        self.base_name = os.path.basename(source_path)
+
+    def cache_path(self, chunk_index: int, extension: str = "pickle") -> str:
+        return os.path.join(
+            self.cache_dir, f"{self.base_name}.{chunk_index}.{extension}"
+        )
+
+    def load(
+        self, source_code: str, chunk_index: int = 0, options: str = ""
+    ) -> Optional[GlobalScope]:
+        return self._load(
+            self.cache_path(chunk_index), source_code, options, pickle.load
+        )
+
+    def store(
+        self,
+        source_code: str,
+        global_scope: GlobalScope,
+        chunk_index: int = 0,
+        options: str = "",
+    ):
+        self._store(
+            self.cache_path(chunk_index),
+            source_code,
+            options,
+            lambda f: pickle.dump(global_scope, f, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+
+    def load_python(
+        self, source_code: str, chunk_index: int = 0, options: str = ""
+    ) -> Optional[str]:
+        """Python code generated by xlang.transpiler for the chunk."""
+        return self._load(
+            self.cache_path(chunk_index, "py"),
+            source_code,
+            options,
+            lambda f: f.read().decode(),
+        )
+
+    def store_python(
+        self,
+        source_code: str,
+        python_code: str,
+        chunk_index: int = 0,
+        options: str = "",
+    ):
+        self._store(
+            self.cache_path(chunk_index, "py"),
+            source_code,
+            options,
+            lambda f: f.write(python_code.encode()),
+        )
+
+    def _load(
+        self,
+        path: str,
+        source_code: str,
+        options: str,
+        read: Callable[[BinaryIO], Any],
+    ) -> Any:
+        try:
+            with open(path, "rb") as f:
+                key = key_line(path, source_code, options)
+                if f.readline() != key:
+                    return None
+                return read(f)
+        except Exception:
+            # A missing, corrupt or incompatible cache file is a cache miss.
+            return None
+
+    def _store(
+        self,
+        path: str,
+        source_code: str,
+        options: str,
+        write: Callable[[BinaryIO], Any],
+    ):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(key_line(path, source_code, options))
+                write(f)
+            os.replace(tmp_path, path)
+        except (OSError, RecursionError):
+            # Like __pycache__, failing to write the cache is not an error.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
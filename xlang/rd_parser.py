@@ -0,0 +1,821 @@
+import re
+from typing import Any, List, NoReturn, Optional, Tuple, Union
+
+from xlang.exceptions import (
+    InternalCompilerError,
+    UnexpectedCharacterException,
+    UnexpectedTokenException,
+)
+from xlang.xl_ast import (
+    BaseExpression,
+    Break,
+    CompareOperation,
+    Constant,
+    ConstantType,
+    Continue,
+    Elif,
+    Else,
+    EnumEntry,
+    EnumType,
+    EnumVariantInitialization,
+    Function,
+    FunctionArgument,
+    FunctionCall,
+    FunctionParameter,
+    GlobalScope,
+    IdentifierAndType,
+    If,
+    Loop,
+    Match,
+    MatchArm,
+    MathOperation,
+    Return,
+    Statement,
+    StructFieldInit,
+    StructInitialization,
+    StructType,
+    UnaryOperation,
+    UnparsedBody,
+    VariableAccess,
+    VariableAssign,
+    VariableDeclaration,
+    VariableDefinition,
+    VariableType,
+    VariableTypeEnum,
+    VariantPattern,
+)
+from xlang.utils import (
+    build_enum_entries,
+    build_global_scope,
+    decode_escape_sequences,
+)
+
+# Token types, the names match the terminals in grammar.lark. Keywords are
+# lexed as IDENTIFIER and recognized by the parser where the grammar expects
+# them, like the contextual lexer of lark does.
+IDENTIFIER = "IDENTIFIER"
+INTEGER = "INTEGER"
+FLOAT = "FLOAT"
+STRING_LITERAL = "STRING_LITERAL"
+CHAR_LITERAL = "CHAR_LITERAL"
+OPERATOR = "OPERATOR"
+END = "$END"
+# Unparsed function body of the lazy frontend, from "{" to after the closing "}".
+BODY = "BODY"
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<WS>[ \t\f\r\n]+)
+    | (?P<COMMENT>//[^\n]*|/\*(?s:.)*?\*/)
+    | (?P<FLOAT>(?:[1-9][0-9]*|0)\.[0-9]+)
+    | (?P<INTEGER>[1-9][0-9]*|0)
+    | (?P<IDENTIFIER>[a-zA-Z_][a-zA-Z_0-9]*)
+    | (?P<STRING_LITERAL>"(?:[^"\\]|\\[tnr"\\0])*")
+    | (?P<CHAR_LITERAL>'(?:[^'\\]|\\[tnr'\\0])')
+    | (?P<OPERATOR>=>|==|!=|>=|<=|[-+*/%<>=(){}\[\],:;.])
+    | (?P<MISMATCH>.)
+    """,
+    re.VERBOSE,
+)
+
+# Braces and everything that can contain braces without opening a block.
+BLOCK_RE = re.compile(
+    r"""
+    [{}]
+    | "(?:[^"\\]|\\.)*"
+    | '(?:[^'\\]|\\.)'
+    | //[^\n]*
+    | /\*(?s:.)*?\*/
+    """,
+    re.VERBOSE,
+)
+
+# Keywords that must be followed by inline whitespace, see _WS_INLINE in the grammar.
+WS_INLINE_KEYWORDS = ("func", "struct", "enum", "var", "const", "_")
+
+COMPARE_OPERATORS = ("==", "!=", ">=", ">", "<", "<=")
+
+
+class Token:
+    __slots__ = ("type", "value", "start_pos", "end_pos")
+
+    def __init__(self, type, value, start_pos, end_pos):
+        self.type = type
+        self.value = value
+        self.start_pos = start_pos
+        self.end_pos = end_pos
+
+    def __repr__(self):
+        return f"Token({self.type}, {self.value!r})"
+
+
+def tokenize(
+    source_code: str, pos: int = 0, endpos: Optional[int] = None
+) -> List[Token]:
+    tokens: List[Token] = []
+    append = tokens.append
+    if endpos is None:
+        endpos = len(source_code)
+    for m in TOKEN_RE.finditer(source_code, pos, endpos):
+        kind = m.lastgroup
+        if kind == "WS" or kind == "COMMENT":
+            continue
+        if kind == "MISMATCH":
+            raise UnexpectedCharacterException(f'Cannot parse "{m.group()}"', m.start())
+        append(Token(kind, m.group(), m.start(), m.end()))
+    return pad_tokens(tokens)
+
+
+def tokenize_declarations(source_code: str) -> List[Token]:
+    """Like tokenize, but every function body is a single BODY token.
+
+    The body is skipped by matching braces, its tokens are only created when
+    the body is parsed by load_function_body.
+    """
+    tokens: List[Token] = []
+    append = tokens.append
+    depth = 0
+    in_signature = False
+    pos = 0
+    while True:
+        for m in TOKEN_RE.finditer(source_code, pos):
+            kind = m.lastgroup
+            if kind == "WS" or kind == "COMMENT":
+                continue
+            if kind == "MISMATCH":
+                raise UnexpectedCharacterException(
+                    f'Cannot parse "{m.group()}"', m.start()
+                )
+            value = m.group()
+            if value == "{":
+                if depth == 0 and in_signature:
+                    in_signature = False
+                    body_end = find_block_end(source_code, m.start())
+                    if body_end is not None:
+                        append(Token(BODY, value, m.start(), body_end))
+                        pos = body_end
+                        break
+                depth += 1
+            elif value == "}":
+                depth -= 1
+            elif value == "func" and depth == 0:
+                in_signature = True
+            append(Token(kind, value, m.start(), m.end()))
+        else:
+            return pad_tokens(tokens)
+
+
+def find_block_end(source_code: str, start: int) -> Optional[int]:
+    """Offset after the brace closing the block opened at start, None if the
+    block is not closed."""
+    depth = 0
+    for m in BLOCK_RE.finditer(source_code, start):
+        value = m.group()
+        if value == "{":
+            depth += 1
+        elif value == "}":
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    return None
+
+
+def pad_tokens(tokens: List[Token]) -> List[Token]:
+    # Like lark, the end token borrows the position of the last token. The
+    # parser looks ahead at most four tokens, pad with end tokens for that.
+    if tokens:
+        last = tokens[-1]
+        end = Token(END, "", last.start_pos, last.end_pos)
+    else:
+        end = Token(END, "", 0, 0)
+    tokens.extend([end] * 4)
+    return tokens
+
+
+def load_function_body(function: Function):
+    """Parses the body of a function from the lazy frontend, if not parsed yet."""
+    if function.unparsed_body is not None:
+        function.statements = RDParser().function_body(function.unparsed_body)
+        function.unparsed_body = None
+
+
+def load_function_bodies(global_scope: GlobalScope):
+    for function in global_scope.functions.values():
+        load_function_body(function)
+
+
+def unknown_type():
+    return VariableType(variable_type=VariableTypeEnum.UNKNOWN)
+
+
+class RDParser:
+    """Hand-written recursive descent parser for the language in grammar.lark.
+
+    Builds the same xl_ast nodes with the same parse contexts as the lark
+    frontend (Parser + ASTTransformer), without lark's lexer or transformer.
+
+    With lazy=True, function bodies are not parsed. They are stored as an
+    UnparsedBody and parsed by load_function_body when they are needed.
+    """
+
+    def __init__(self, lazy: bool = False):
+        self.lazy = lazy
+
+    def parse(self, source_code: str) -> GlobalScope:
+        self.source_code = source_code
+        if self.lazy:
+            self.tokens = tokenize_declarations(source_code)
+        else:
+            self.tokens = tokenize(source_code)
+        self.pos = 0
+        entries = []
+        # top-level declarations with their source span, used by xlang.incremental
+        self.declarations: List[Tuple[Any, int, int]] = []
+        while self.tokens[self.pos].type != END:
+            start_pos = self.tokens[self.pos].start_pos
+            entry = self.top_level_entry()
+            entries.append(entry)
+            self.declarations.append(
+                (entry, start_pos, self.tokens[self.pos - 1].end_pos)
+            )
+        return build_global_scope(entries)
+
+    # token helpers
+
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[self.pos + offset]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.pos]
+        if token.type == END:
+            self.error([])
+        self.pos += 1
+        return token
+
+    def at(self, value: str, offset: int = 0) -> bool:
+        # Literal token values contain their quotes or are numbers, so the
+        # value alone identifies operators and keywords.
+        return self.tokens[self.pos + offset].value == value
+
+    def accept(self, value: str) -> Optional[Token]:
+        if self.at(value):
+            return self.advance()
+        return None
+
+    def expect(self, value: str) -> Token:
+        if self.at(value):
+            return self.advance()
+        self.error([value])
+
+    def expect_identifier(self) -> Token:
+        token = self.tokens[self.pos]
+        if token.type != IDENTIFIER:
+            self.error([IDENTIFIER])
+        self.pos += 1
+        return token
+
+    def expect_keyword(self, keyword: str) -> Token:
+        token = self.expect(keyword)
+        if keyword in WS_INLINE_KEYWORDS:
+            next_char = self.source_code[token.end_pos : token.end_pos + 1]
+            if next_char not in (" ", "\t"):
+                self.error(["_WS_INLINE"])
+        return token
+
+    def error(self, expected: List[str]) -> NoReturn:
+        token = self.tokens[self.pos]
+        raise UnexpectedTokenException(
+            f'Unexpected token "{token.value}"',
+            token.start_pos,
+            expected,
+        )
+
+    # declarations
+
+    def top_level_entry(self):
+        token = self.peek()
+        if token.type == IDENTIFIER:
+            if token.value == "func":
+                return self.function_def()
+            elif token.value == "struct":
+                return self.struct_def()
+            elif token.value == "enum":
+                return self.enum_def()
+        self.error(["enum", "func", "struct"])
+
+    def function_def(self) -> Function:
+        self.expect_keyword("func")
+        name = self.expect_identifier()
+        self.expect("(")
+        function_params = []
+        if not self.at(")"):
+            function_params.append(self.function_param())
+            while self.accept(","):
+                function_params.append(self.function_param())
+        self.expect(")")
+        return_type = None
+        if self.accept(":"):
+            return_type = self.type()
+        unparsed_body = None
+        body = self.peek()
+        if body.type == BODY:
+            self.pos += 1
+            statements = []
+            unparsed_body = UnparsedBody(
+                source_code=self.source_code,
+                start_pos=body.start_pos,
+                end_pos=body.end_pos,
+            )
+        else:
+            statements = self.code_block()
+        return Function(
+            name=name.value,
+            return_type=return_type,
+            function_params=function_params,
+            statements=statements,
+            context=name.start_pos,
+            unparsed_body=unparsed_body,
+        )
+
+    def function_body(self, body: UnparsedBody) -> List[Statement]:
+        self.source_code = body.source_code
+        self.tokens = tokenize(body.source_code, body.start_pos, body.end_pos)
+        self.pos = 0
+        statements = self.code_block()
+        if self.peek().type != END:
+            self.error([END])
+        return statements
+
+    def function_param(self) -> FunctionParameter:
+        positional_only = False
+        if self.at("_"):
+            self.expect_keyword("_")
+            positional_only = True
+        identifier = self.expect_identifier()
+        self.expect(":")
+        reference = self.accept("*") is not None
+        param_type = self.type()
+        default_value = None
+        if self.accept("="):
+            default_value = self.default_constant()
+        return FunctionParameter(
+            name=identifier.value,
+            param_type=param_type,
+            context=identifier.start_pos,
+            reference=reference,
+            positional_only=positional_only,
+            default_value=default_value,
+        )
+
+    def default_constant(self) -> BaseExpression:
+        token = self.peek()
+        if token.type == IDENTIFIER and token.value not in ("true", "false"):
+            return self.var_access()
+        if token.type in (INTEGER, FLOAT, STRING_LITERAL, CHAR_LITERAL, IDENTIFIER):
+            return self.literal()
+        self.error(
+            [IDENTIFIER, INTEGER, FLOAT, STRING_LITERAL, CHAR_LITERAL, "true", "false"]
+        )
+
+    def type(self) -> VariableType:
+        if self.accept("["):
+            name = self.expect_identifier()
+            self.expect("]")
+            return VariableType(
+                variable_type=VariableTypeEnum.ARRAY,
+                array_type=VariableType(
+                    variable_type=VariableTypeEnum.UNKNOWN, type_name=name.value
+                ),
+            )
+        name = self.expect_identifier()
+        return VariableType(
+            variable_type=VariableTypeEnum.UNKNOWN, type_name=name.value
+        )
+
+    def field_entries(self) -> List[IdentifierAndType]:
+        self.expect("{")
+        entries = [self.field_entry()]
+        while not self.at("}"):
+            entries.append(self.field_entry())
+        self.expect("}")
+        return entries
+
+    def field_entry(self) -> IdentifierAndType:
+        identifier = self.expect_identifier()
+        self.expect(":")
+        param_type = self.type()
+        default_value = None
+        if self.accept("="):
+            default_value = self.default_constant()
+        self.accept(",")
+        return IdentifierAndType(
+            name=identifier.value,
+            param_type=param_type,
+            context=identifier.start_pos,
+            default_value=default_value,
+        )
+
+    def struct_def(self) -> StructType:
+        self.expect_keyword("struct")
+        name = self.expect_identifier()
+        members = self.field_entries()
+        return StructType(name=name.value, members=members, context=name.start_pos)
+
+    def enum_def(self) -> EnumType:
+        self.expect_keyword("enum")
+        name = self.expect_identifier()
+        self.expect("{")
+        entries = [self.enum_entry()]
+        while not self.at("}"):
+            entries.append(self.enum_entry())
+        self.expect("}")
+        return EnumType(
+            name=name.value,
+            entries=build_enum_entries(entries),
+            context=name.start_pos,
+        )
+
+    def enum_entry(self) -> EnumEntry:
+        identifier = self.expect_identifier()
+        fields = []
+        if self.at("{"):
+            fields = self.field_entries()
+        self.accept(",")
+        return EnumEntry(
+            name=identifier.value,
+            context=identifier.start_pos,
+            fields=fields,
+        )
+
+    # statements
+
+    def code_block(self) -> List[Statement]:
+        self.expect("{")
+        statements = []
+        while not self.at("}"):
+            statements.append(self.statement())
+        self.advance()
+        return statements
+
+    def statement(self) -> Statement:
+        token = self.peek()
+        if token.type != IDENTIFIER:
+            self.error([IDENTIFIER])
+        keyword = token.value
+        if keyword == "loop":
+            self.advance()
+            return Loop(context=token.start_pos, statements=self.code_block())
+        elif keyword == "if":
+            return self.if_statement()
+        elif keyword == "match":
+            return self.match_statement()
+        elif keyword == "var" or keyword == "const":
+            return self.variable_def()
+        elif keyword == "break" or keyword == "continue" or keyword == "return":
+            statement = self.control()
+            self.expect(";")
+            return statement
+        elif self.at("(", 1):
+            function_call = self.function_call()
+            self.expect(";")
+            return function_call
+
+        variable_access = self.var_access()
+        if self.accept("="):
+            value = self.not_expr()
+            self.expect(";")
+            return VariableAssign(
+                context=variable_access.context,
+                variable_access=variable_access,
+                value=value,
+            )
+        self.expect(";")
+        return variable_access
+
+    def if_statement(self) -> If:
+        self.advance()
+        self.expect("(")
+        condition = self.not_expr()
+        self.expect(")")
+        statements = self.code_block()
+        elif_statements = []
+        while self.at("elif"):
+            self.advance()
+            self.expect("(")
+            elif_condition = self.not_expr()
+            self.expect(")")
+            elif_statements.append(
+                Elif(
+                    context=elif_condition.context,
+                    condition=elif_condition,
+                    statements=self.code_block(),
+                )
+            )
+        else_statement = None
+        if self.at("else"):
+            keyword = self.advance()
+            else_statement = Else(
+                context=keyword.start_pos,
+                statements=self.code_block(),
+            )
+        return If(
+            context=condition.context,
+            condition=condition,
+            statements=statements,
+            elif_statements=elif_statements,
+            else_statement=else_statement,
+        )
+
+    def match_statement(self) -> Match:
+        self.advance()
+        self.expect("(")
+        scrutinee = self.not_expr()
+        self.expect(")")
+        self.expect("{")
+        arms = [self.match_arm()]
+        while not self.at("}"):
+            arms.append(self.match_arm())
+        self.advance()
+        return Match(context=scrutinee.context, scrutinee=scrutinee, arms=arms)
+
+    def match_arm(self) -> MatchArm:
+        identifier = self.expect_identifier()
+        bindings = []
+        has_braces = False
+        if self.accept("{"):
+            has_braces = True
+            if not self.at("}"):
+                bindings.append(self.expect_identifier().value)
+                while self.accept(","):
+                    bindings.append(self.expect_identifier().value)
+            self.expect("}")
+        elif not self.at("=>"):
+            self.error(["{", "=>"])
+        is_wildcard = identifier.value == "_" and not has_braces
+        pattern = VariantPattern(
+            variant_name=None if is_wildcard else identifier.value,
+            is_wildcard=is_wildcard,
+            bindings=bindings,
+            context=identifier.start_pos,
+        )
+        self.expect("=>")
+        return MatchArm(
+            pattern=pattern, statements=self.code_block(), context=pattern.context
+        )
+
+    def variable_def(self) -> Statement:
+        keyword = self.expect_keyword(self.peek().value)
+        name = self.expect_identifier()
+        self.expect(":")
+        var_type = self.type()
+        if keyword.value == "var" and self.accept(";"):
+            return VariableDeclaration(
+                context=name.start_pos,
+                name=name.value,
+                variable_type=var_type,
+            )
+        self.expect("=")
+        value = self.not_expr()
+        self.expect(";")
+        return VariableDefinition(
+            context=name.start_pos,
+            name=name.value,
+            variable_type=var_type,
+            value=value,
+            const=keyword.value == "const",
+        )
+
+    def control(self) -> Statement:
+        keyword = self.advance()
+        context = keyword.start_pos
+        if keyword.value == "break":
+            return Break(context=context)
+        elif keyword.value == "continue":
+            return Continue(context=context)
+        elif keyword.value == "return":
+            value = None
+            if not self.at(";"):
+                value = self.not_expr()
+            return Return(context=context, value=value)
+        else:
+            raise InternalCompilerError("Unknown control keyword")
+
+    # expressions
+
+    def not_expr(self) -> BaseExpression:
+        if self.at("not"):
+            operator = self.advance()
+            operand = self.not_expr()
+            return UnaryOperation(
+                type=unknown_type(),
+                context=operator.start_pos,
+                operand=operand,
+                operator=operator.value,
+            )
+        return self.compare_expr()
+
+    def compare_expr(self) -> BaseExpression:
+        expression = self.add_sub_expr()
+        while True:
+            token = self.tokens[self.pos]
+            if token.type != OPERATOR or token.value not in COMPARE_OPERATORS:
+                return expression
+            self.pos += 1
+            expression = CompareOperation(
+                type=unknown_type(),
+                context=expression.context,
+                operand1=expression,
+                operand2=self.add_sub_expr(),
+                operator=token.value,
+            )
+
+    def add_sub_expr(self) -> BaseExpression:
+        expression = self.mul_div_expr()
+        while True:
+            token = self.tokens[self.pos]
+            if token.type != OPERATOR or token.value not in ("+", "-"):
+                return expression
+            self.pos += 1
+            expression = MathOperation(
+                type=unknown_type(),
+                context=expression.context,
+                operand1=expression,
+                operand2=self.mul_div_expr(),
+                operator=token.value,
+            )
+
+    def mul_div_expr(self) -> BaseExpression:
+        expression = self.unary_expr()
+        while True:
+            token = self.tokens[self.pos]
+            if token.type != OPERATOR or token.value not in ("*", "/", "%"):
+                return expression
+            self.pos += 1
+            expression = MathOperation(
+                type=unknown_type(),
+                context=expression.context,
+                operand1=expression,
+                operand2=self.unary_expr(),
+                operator=token.value,
+            )
+
+    def unary_expr(self) -> BaseExpression:
+        if not self.at("-"):
+            return self.primary_expression()
+        operator = self.advance()
+        operand = self.unary_expr()
+        # Smart constant folding for negative literals, like ASTTransformer
+        if isinstance(operand, Constant) and operand.constant_type in (
+            ConstantType.INTEGER,
+            ConstantType.FLOAT,
+        ):
+            return Constant(
+                type=unknown_type(),
+                context=operator.start_pos,
+                constant_type=operand.constant_type,
+                value=-operand.value,
+            )
+        return UnaryOperation(
+            type=unknown_type(),
+            context=operator.start_pos,
+            operand=operand,
+            operator=operator.value,
+        )
+
+    def primary_expression(self) -> BaseExpression:
+        token = self.peek()
+        if token.type == IDENTIFIER:
+            if token.value == "true" or token.value == "false":
+                return self.literal()
+            if self.at("(", 1):
+                if self.peek(2).type == IDENTIFIER and self.at(":", 3):
+                    return self.struct_init()
+                return self.function_call()
+            if self.at(".", 1) and self.peek(2).type == IDENTIFIER and self.at("{", 3):
+                return self.enum_variant_init()
+            return self.var_access()
+        elif token.type == OPERATOR and token.value == "(":
+            self.advance()
+            expression = self.not_expr()
+            self.expect(")")
+            return expression
+        elif token.type in (INTEGER, FLOAT, STRING_LITERAL, CHAR_LITERAL):
+            return self.literal()
+        self.error([IDENTIFIER, INTEGER, FLOAT, STRING_LITERAL, CHAR_LITERAL, "("])
+
+    def literal(self) -> Constant:
+        token = self.advance()
+        value: Union[int, float, str]
+        if token.type == INTEGER:
+            constant_type = ConstantType.INTEGER
+            value = int(token.value)
+        elif token.type == FLOAT:
+            constant_type = ConstantType.FLOAT
+            value = float(token.value)
+        elif token.type == STRING_LITERAL:
+            constant_type = ConstantType.STRING
+            value = decode_escape_sequences(token.value[1:-1])
+        elif token.type == CHAR_LITERAL:
+            constant_type = ConstantType.CHAR
+            value = decode_escape_sequences(token.value[1:-1])
+        elif token.value == "true" or token.value == "false":
+            constant_type = ConstantType.BOOL
+            value = token.value == "true"
+        else:
+            self.pos -= 1
+            self.error([INTEGER, FLOAT, STRING_LITERAL, CHAR_LITERAL])
+        return Constant(
+            type=unknown_type(),
+            context=token.start_pos,
+            constant_type=constant_type,
+            value=value,
+        )
+
+    def function_call(self) -> FunctionCall:
+        name = self.expect_identifier()
+        self.expect("(")
+        params = []
+        if not self.at(")"):
+            params.append(self.call_arg())
+            while self.accept(","):
+                params.append(self.call_arg())
+        self.expect(")")
+        return FunctionCall(
+            type=None,
+            function_name=name.value,
+            params=params,
+            context=name.start_pos,
+        )
+
+    def call_arg(self) -> FunctionArgument:
+        if self.peek().type == IDENTIFIER and self.at("=", 1):
+            name = self.advance()
+            self.advance()
+            return FunctionArgument(
+                name=name.value,
+                value=self.not_expr(),
+                context=name.start_pos,
+            )
+        expression = self.not_expr()
+        return FunctionArgument(value=expression, context=expression.context)
+
+    def struct_field_inits(self, closing: str) -> List[StructFieldInit]:
+        field_inits = []
+        if not self.at(closing):
+            field_inits.append(self.struct_field_init())
+            while self.accept(","):
+                field_inits.append(self.struct_field_init())
+        self.expect(closing)
+        return field_inits
+
+    def struct_field_init(self) -> StructFieldInit:
+        field_name = self.expect_identifier()
+        self.expect(":")
+        return StructFieldInit(
+            field_name=field_name.value,
+            value=self.not_expr(),
+            context=field_name.start_pos,
+        )
+
+    def struct_init(self) -> StructInitialization:
+        struct_name = self.advance()
+        self.advance()
+        return StructInitialization(
+            type=unknown_type(),
+            context=struct_name.start_pos,
+            struct_name=struct_name.value,
+            field_inits=self.struct_field_inits(")"),
+        )
+
+    def enum_variant_init(self) -> EnumVariantInitialization:
+        enum_name = self.advance()
+        self.advance()
+        variant_name = self.advance()
+        self.advance()
+        return EnumVariantInitialization(
+            type=unknown_type(),
+            context=enum_name.start_pos,
+            enum_name=enum_name.value,
+            variant_name=variant_name.value,
+            field_inits=self.struct_field_inits("}"),
+        )
+
+    def var_access(self) -> VariableAccess:
+        variable = self.expect_identifier()
+        array_access, variable_access, method_call = None, None, None
+        if self.accept("["):
+            array_access = self.not_expr()
+            self.expect("]")
+        if self.accept("."):
+            if self.peek().type == IDENTIFIER and self.at("(", 1):
+                method_call = self.function_call()
+            else:
+                variable_access = self.var_access()
+        return VariableAccess(
+            type=unknown_type(),
+            context=variable.start_pos,
+            variable_name=variable.value,
+            array_access=array_access,
+            method_call=method_call,
+            variable_access=variable_access,
+        )
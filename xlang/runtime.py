@@ -0,0 +1,570 @@
+"""Values and operations shared by the engines that run the validated AST in
+Python: the tree-walking interpreter, the closure compiler and the virtual
+machine.
+
+Primitives are plain Python values, the validation pass stored the static
+type of every expression. Structs, arrays and enums are Values, they are
+updated in place when assigned. Variables defined from a struct or array
+share its Value, enums are copied, see stored. The members of a struct are a
+list indexed by the offsets the validation pass assigned. An enum is the
+discriminant of its entry, or a tuple of the discriminant and the fields if
+it was initialized with fields. Arrays of numbers are NumberArrays.
+Strings that are appended to become StringBuilders where they are stored,
+they are joined when they are read.
+Arguments get lazy copies of them, the payload is copied when it is
+written, see lazy_copy.
+
+With columnar_structs, arrays of structs that only have number members
+are StructColumns, one buffer per member. Their elements are views of the
+columns. A struct assigned as a whole shares its payload with the variable,
+member or element it is assigned to, which the columns can not do, so
+arrays of the structs the program assigns keep the list layout.
+"""
+
+import weakref
+from array import array
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from xlang.callgraph import CallGraph, iter_nodes
+from xlang.exceptions import (
+    ContextException,
+    InternalCompilerError,
+    InterpreterAssertionError,
+)
+from xlang.interpreter_datatypes import (
+    ARRAY_TYPECODES,
+    NumberArray,
+    Reference,
+    Share,
+    StringBuilder,
+    StructColumns,
+    StructRow,
+    Value,
+    ValueType,
+)
+from xlang.xl_ast import (
+    INTEGER_TYPES,
+    BaseExpression,
+    Constant,
+    EnumEntry,
+    FunctionCall,
+    GlobalScope,
+    PrimitiveType,
+    VariableAccess,
+    VariableAssign,
+    VariableType,
+    VariableTypeEnum,
+)
+from xlang.xl_builtins import get_builtin_array_methods, get_builtin_primitive_methods
+
+
+def default_primitive_value(variable_type: VariableType) -> Any:
+    primitive_type = variable_type.primitive_type
+    if primitive_type in INTEGER_TYPES:
+        return 0
+    elif primitive_type == PrimitiveType.F32:
+        return 0.0
+    elif primitive_type == PrimitiveType.STRING:
+        return ""
+    elif primitive_type == PrimitiveType.BOOL:
+        return False
+    else:
+        raise InternalCompilerError("primitive type not handled")
+
+
+class Runtime:
+    """Operations on the values of a running program, the engines decide how
+    the AST is evaluated."""
+
+    global_scope: GlobalScope
+
+    def __init__(self, columnar_structs: bool = False):
+        self.columnar_structs = columnar_structs
+        # see assigned_structs
+        self.assigned_struct_names: Optional[Set[Optional[str]]] = None
+        # payloads written through the Reference arguments of running calls
+        self.pinned: List[Any] = []
+
+    def assign(self, container, key, value):
+        variable = container[key]
+        if isinstance(variable, Value):
+            self.join_share(variable, value)
+            if variable.type == ValueType.ENUM:
+                variable.type = ValueType.ENUM
+                variable.type_name = value.type_name
+                variable.value = value.value
+            else:
+                variable.__dict__.update(value.__dict__)
+        else:
+            container[key] = value
+
+    def checked_index(self, value: Any, index: int) -> int:
+        if isinstance(value, Value) and value.is_array:
+            if index < 0 or index >= len(value.value):
+                raise Exception("Array index out of bounds")
+        elif isinstance(value, str):
+            if index < 0 or index >= len(value):
+                raise Exception("String index out of bounds")
+        else:
+            raise Exception("Indexing not supported for this type")
+        return index
+
+    def index_location(self, value: Any, index: int):
+        """The container and key of an array element or string character.
+        Characters are copied into a list, assigning them has no effect."""
+        if isinstance(value, StringBuilder):
+            value = str(value)
+        index = self.checked_index(value, index)
+        if isinstance(value, str):
+            return [value[index]], 0
+        self.unshare(value)
+        return value.value, index
+
+    def index_lookup(self, value: Any, index: int) -> Any:
+        if isinstance(value, StringBuilder):
+            value = str(value)
+        index = self.checked_index(value, index)
+        if isinstance(value, str):
+            return value[index]
+        return value.value[index]
+
+    def is_columnar(self, value: Any) -> bool:
+        return isinstance(value, Value) and isinstance(value.value, StructColumns)
+
+    def reference_argument(self, container, key) -> Any:
+        """The argument passed to a reference parameter for the variable,
+        member or element at container[key]."""
+        value = container[key]
+        if not isinstance(value, Value):
+            # primitives are immutable, the callee assigns the location
+            value = Reference(container, key)
+            self.pinned.append(container)
+        return value
+
+    def builtin_call(self, func_call: FunctionCall, evaluated_params: List[Any]):
+        """print and assert, the builtins of xlang.xl_builtins work on Values."""
+        (value,) = evaluated_params
+        if func_call.function_name == "print":
+            value_type = func_call.params[0].value.type
+            if value is True or value is False:
+                print("true" if value else "false")
+            elif not isinstance(value, Value):
+                print(value)
+            elif value.type == ValueType.ENUM and not value.is_array:
+                print(self.variant_entry(value).name)
+            else:
+                if value_type is None:
+                    raise InternalCompilerError("Expression type not set")
+                print(str(self.boxed(value, value_type).value))
+        elif func_call.function_name == "assert":
+            if value is not True:
+                raise InterpreterAssertionError("assertion failed", func_call.context)
+        else:
+            raise Exception(f"Unknown function called: {func_call.function_name}")
+
+    def boxed(self, value: Any, variable_type: VariableType) -> Any:
+        """The value with its primitives in Values, as printed for structs,
+        arrays and enums."""
+        base_type = variable_type.variable_type
+        if base_type == VariableTypeEnum.PRIMITIVE:
+            return Value(
+                type=ValueType.PRIMITIVE,
+                value=str(value) if isinstance(value, StringBuilder) else value,
+                primitive_type=variable_type.primitive_type,
+            )
+        elif base_type == VariableTypeEnum.ARRAY:
+            assert variable_type.array_type
+            return Value(
+                type=value.type,
+                value=[
+                    self.boxed(element, variable_type.array_type)
+                    for element in value.value
+                ],
+                primitive_type=value.primitive_type,
+                is_array=True,
+                type_name=value.type_name,
+            )
+        elif base_type == VariableTypeEnum.STRUCT:
+            assert variable_type.type_name
+            struct_def = self.global_scope.structs[variable_type.type_name]
+            return Value(
+                type=ValueType.STRUCT,
+                value={
+                    member.name: self.boxed(member_value, member.param_type)
+                    for member, member_value in zip(struct_def.members, value.value)
+                },
+                type_name=value.type_name,
+            )
+        elif base_type == VariableTypeEnum.ENUM:
+            entry = self.variant_entry(value)
+            if not isinstance(value.value, tuple):
+                enum_value: Any = entry.name
+            else:
+                enum_value = {
+                    "variant": entry.name,
+                    "data": {
+                        field.name: self.boxed(field_value, field.param_type)
+                        for field, field_value in zip(entry.fields, value.value[1:])
+                    },
+                }
+            return Value(
+                type=ValueType.ENUM, value=enum_value, type_name=value.type_name
+            )
+        return value
+
+    def variant_entry(self, value: Value) -> EnumEntry:
+        discriminant = value.value
+        if isinstance(discriminant, tuple):
+            discriminant = discriminant[0]
+        assert value.type_name
+        entries = self.global_scope.enums[value.type_name].entries
+        return list(entries.values())[discriminant]
+
+    def call_method(
+        self, value: Any, method_call: FunctionCall, evaluated_params: List[Any]
+    ) -> Any:
+        """Calls a builtin method on value, except append on strings, see
+        string_append."""
+        receiver_type = method_call.receiver_type
+        if receiver_type is None:
+            raise InternalCompilerError("Method call was not validated")
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            methods = get_builtin_array_methods()
+        elif receiver_type.variable_type == VariableTypeEnum.PRIMITIVE:
+            methods = get_builtin_primitive_methods()[receiver_type.primitive_type]
+        elif receiver_type.variable_type == VariableTypeEnum.ENUM:
+            raise Exception("Method calls not supported for enum types")
+        else:
+            raise Exception(
+                f"Method calls not supported for type: {receiver_type.variable_type}"
+            )
+
+        name = method_call.function_name
+        if name not in methods:
+            raise Exception(f"Unknown method: {name}")
+
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            if name == "append":
+                self.unshare(value)
+                value.value.append(evaluated_params[0])
+                return None
+            elif name == "length":
+                return len(value.value)
+        elif name == "toLowerCase":
+            return value.lower()
+        elif name == "toUpperCase":
+            return value.upper()
+        elif name == "length":
+            return len(value)
+        elif name == "int":
+            return ord(value)
+        raise Exception(f"Unknown method: {name}")
+
+    def string_append(self, container, key, value: Any, method_call: FunctionCall):
+        """Appends value to the string at container[key], strings are
+        immutable, the receiver is replaced by a StringBuilder."""
+        value_type = method_call.params[0].value.type
+        if value_type is None or value_type.primitive_type not in (
+            PrimitiveType.CHAR,
+            PrimitiveType.STRING,
+        ):
+            raise ContextException(
+                "append() can only accept char or string arguments",
+                method_call.context,
+            )
+        string = container[key]
+        if isinstance(string, StringBuilder):
+            string.append(value)
+        else:
+            builder = container[key] = StringBuilder(string)
+            builder.append(value)
+
+    def enum_compare(
+        self, operand1_value: Value, operand2_value: Value, operator: str
+    ) -> bool:
+        if operand1_value.type_name != operand2_value.type_name:
+            raise Exception("Cannot compare enums of different types")
+
+        # Simple enums are their discriminant, tagged enums a tuple of the
+        # discriminant and the fields
+        variant1 = operand1_value.value
+        if isinstance(variant1, tuple):
+            variant1 = variant1[0]
+        variant2 = operand2_value.value
+        if isinstance(variant2, tuple):
+            variant2 = variant2[0]
+
+        if operator == "==":
+            return variant1 == variant2
+        elif operator == "!=":
+            return variant1 != variant2
+        else:
+            raise Exception(f"Invalid operator for enum comparison: {operator}")
+
+    def stored(self, value: Any) -> Any:
+        """value as it is stored in a variable, member or field. Enums are
+        values like primitives, they get a Value of their own. Structs and
+        arrays are shared with the variable they come from."""
+        if (
+            isinstance(value, Value)
+            and value.type == ValueType.ENUM
+            and not value.is_array
+        ):
+            return Value(
+                type=ValueType.ENUM, value=value.value, type_name=value.type_name
+            )
+        return value
+
+    def lazy_copy(self, value: Value) -> Value:
+        """A copy of a struct, array or enum passed by value.
+
+        A payload without structs, arrays or enums in it is shared with the
+        copy until one of them writes it, see unshare. Otherwise the payload is
+        copied with lazy copies of its members, the Values in a payload are
+        never shared. Payloads a running call writes through a Reference are
+        copied right away."""
+        payload = value.value
+        copy = value.model_copy()
+        if (
+            value.type == ValueType.ENUM
+            and not value.is_array
+            and not self.has_aggregates(value)
+        ):
+            # its payload is immutable
+            copy.share = None
+        elif (
+            isinstance(payload, StructRow)
+            or self.has_aggregates(value)
+            or self.is_pinned(payload)
+        ):
+            copy.value = self.copied_payload(value)
+            copy.share = None
+        else:
+            if value.share is None:
+                value.share = Share(value)
+            copy.share = Share(copy, value.share.holders)
+        return copy
+
+    def has_aggregates(self, value: Value) -> bool:
+        payload = value.value
+        if isinstance(payload, StructColumns):
+            return False
+        if value.is_array:
+            # the elements of an array have the same type
+            return len(payload) > 0 and isinstance(payload[0], Value)
+        if isinstance(payload, int):
+            # a simple enum
+            return False
+        return any(isinstance(member, Value) for member in payload)
+
+    def is_pinned(self, payload: Any) -> bool:
+        if isinstance(payload, StructColumns):
+            # references to members of the elements point into the columns
+            return any(
+                column is pinned for column in payload.columns for pinned in self.pinned
+            )
+        return any(payload is pinned for pinned in self.pinned)
+
+    def copied_payload(self, value: Value) -> Any:
+        payload = value.value
+        if isinstance(payload, (NumberArray, StructColumns)):
+            return payload.copy()
+        if isinstance(payload, StructRow):
+            # an element of a columnar array, its members are numbers
+            return list(payload)
+        if isinstance(payload, list):
+            return [self.copied_element(element) for element in payload]
+        # an enum payload, the discriminant is not a Value
+        return tuple(
+            self.lazy_copy(field) if isinstance(field, Value) else field
+            for field in payload
+        )
+
+    def copied_element(self, element: Any) -> Any:
+        if isinstance(element, Value):
+            return self.lazy_copy(element)
+        if isinstance(element, StringBuilder):
+            # the copies must not append to the same parts
+            return str(element)
+        return element
+
+    def unshare(self, value: Value):
+        """Copies the payload of a struct or array before it is written, if a
+        lazy copy still holds it. The Values sharing it get the copy too."""
+        share = value.share
+        if share is None or len(share.holders) == 1:
+            return
+        payload = self.copied_payload(value)
+        share.holders.discard(share)
+        share.holders = weakref.WeakSet([share])
+        for reference in share.values:
+            shared_value = reference()
+            if shared_value is not None:
+                shared_value.value = payload
+
+    def join_share(self, variable: Value, value: Value):
+        """variable is assigned value, they hold the same payload from now on."""
+        if variable is value:
+            return
+        if variable.share is not None:
+            variable.share.values = self.live_values(variable.share, variable)
+        if value.share is None:
+            value.share = Share(value)
+        share = value.share
+        share.values = self.live_values(share, variable)
+        share.values.append(weakref.ref(variable))
+        variable.share = share
+
+    def live_values(self, share: Share, removed: Value):
+        return [
+            reference
+            for reference in share.values
+            if reference() is not None and reference() is not removed
+        ]
+
+    def default_variable_value(self, variable_type):
+        base_type = variable_type.variable_type
+        if base_type == VariableTypeEnum.PRIMITIVE:
+            return default_primitive_value(variable_type)
+        elif base_type == VariableTypeEnum.ARRAY:
+            if variable_type.array_type.variable_type == VariableTypeEnum.PRIMITIVE:
+                primitive_type = variable_type.array_type.primitive_type
+                # numbers are kept in a contiguous buffer
+                typecode = ARRAY_TYPECODES.get(primitive_type)
+                return Value(
+                    type=ValueType.PRIMITIVE,
+                    value=[] if typecode is None else NumberArray(array(typecode)),
+                    primitive_type=primitive_type,
+                    is_array=True,
+                )
+            elif variable_type.array_type.variable_type == VariableTypeEnum.STRUCT:
+                type_name = variable_type.array_type.type_name
+                columns = self.struct_columns(type_name)
+                return Value(
+                    type=ValueType.STRUCT,
+                    value=[] if columns is None else columns,
+                    type_name=type_name,
+                    is_array=True,
+                )
+            elif variable_type.array_type.variable_type == VariableTypeEnum.ENUM:
+                return Value(
+                    type=ValueType.ENUM,
+                    value=[],
+                    type_name=variable_type.array_type.type_name,
+                    is_array=True,
+                )
+            else:
+                raise NotImplementedError(
+                    "array type not implemented"
+                )  # multidimensional arrays
+        elif base_type == VariableTypeEnum.STRUCT:
+            return Value(
+                type=ValueType.STRUCT,
+                value=self.default_struct_data(variable_type.type_name),
+                type_name=variable_type.type_name,
+            )
+        else:
+            raise InternalCompilerError("Unknown variable type")
+
+    def struct_columns(self, struct_name: str) -> Optional[StructColumns]:
+        """Empty columns for an array of the struct, if columnar_structs is set,
+        all members of the struct are numbers and it is never assigned as a
+        whole."""
+        if not self.columnar_structs or struct_name in self.assigned_structs():
+            return None
+        members = self.global_scope.structs[struct_name].members
+        if not members:
+            return None
+        columns = []
+        for member in members:
+            primitive_type = member.param_type.primitive_type
+            if primitive_type is None or primitive_type not in ARRAY_TYPECODES:
+                return None
+            columns.append(NumberArray(array(ARRAY_TYPECODES[primitive_type])))
+        return StructColumns(columns, struct_name)
+
+    def assigned_structs(self) -> Set[Optional[str]]:
+        """Names of the structs that the functions reachable from main assign
+        as a whole, to a variable, member or element."""
+        if self.assigned_struct_names is None:
+            functions = self.global_scope.functions
+            self.assigned_struct_names = {
+                node.value.type.type_name
+                for name in CallGraph(self.global_scope).reachable()
+                for node in iter_nodes(functions[name].statements)
+                if isinstance(node, VariableAssign)
+                and node.value.type is not None
+                and node.value.type.variable_type == VariableTypeEnum.STRUCT
+            }
+        return self.assigned_struct_names
+
+    def default_value(self, default_value: BaseExpression) -> Any:
+        """The value of the default value of a member, field or parameter, the
+        validation pass only allows constants and enum accesses."""
+        if isinstance(default_value, Constant):
+            return default_value.value
+        if (
+            isinstance(default_value, VariableAccess)
+            and default_value.variable_access is not None
+        ):
+            return self.enum_value(
+                default_value.variable_name,
+                default_value.variable_access.variable_name,
+            )
+        raise InternalCompilerError("Invalid default value")
+
+    def enum_value(self, enum_name: str, entry_name: str) -> Value:
+        enum_def = self.global_scope.enums[enum_name]
+        return Value(
+            type=ValueType.ENUM,
+            value=enum_def.entries[entry_name].discriminant,
+            type_name=enum_name,
+        )
+
+    def default_struct_data(self, struct_name: str) -> List[Any]:
+        """The members of a new struct value, in the order of the offsets the
+        validation pass assigned."""
+        struct_def = self.global_scope.structs[struct_name]
+        struct_data = []
+        for member in struct_def.members:
+            if member.default_value is not None:
+                struct_data.append(self.default_value(member.default_value))
+            else:
+                struct_data.append(self.default_variable_value(member.param_type))
+        return struct_data
+
+    def struct_value(
+        self, struct_name: str, field_values: Iterable[Tuple[Optional[int], Any]]
+    ) -> Value:
+        """A new struct with the initialized fields, by offset, and the default
+        values of the other members."""
+        struct_data = self.default_struct_data(struct_name)
+        for offset, field_value in field_values:
+            if offset is None:
+                raise InternalCompilerError("Field initialization was not validated")
+            struct_data[offset] = self.stored(field_value)
+        return Value(type=ValueType.STRUCT, value=struct_data, type_name=struct_name)
+
+    def variant_value(
+        self,
+        enum_name: str,
+        variant_name: str,
+        field_values: Iterable[Tuple[Optional[int], Any]],
+    ) -> Value:
+        """A new enum of the variant with the initialized fields, by offset,
+        and the default values of the other fields."""
+        variant_entry = self.global_scope.enums[enum_name].entries[variant_name]
+        # the fields follow the discriminant
+        variant_data: List[Any] = [variant_entry.discriminant]
+        for field in variant_entry.fields:
+            if field.default_value is not None:
+                variant_data.append(self.default_value(field.default_value))
+            else:
+                variant_data.append(self.default_variable_value(field.param_type))
+        for offset, field_value in field_values:
+            if offset is None:
+                raise InternalCompilerError("Field initialization was not validated")
+            variant_data[offset + 1] = self.stored(field_value)
+        return Value(
+            type=ValueType.ENUM, value=tuple(variant_data), type_name=enum_name
+        )
@@ -1,12 +1,6 @@
 from lark import Transformer, v_args
 
-from xlang.exceptions import (
-    FunctionAlreadyDefinedException,
-    InternalCompilerError,
-    StructAlreadyDefinedException,
-    EnumAlreadyDefinedException,
-    ContextException,
-)
+from xlang.exceptions import InternalCompilerError
 from xlang.xl_ast import (
     ArrayAccess,
     Break,
@@ -20,14 +14,12 @@ from xlang.xl_ast import (
     FunctionArgument,
     FunctionCall,
     FunctionParameter,
-    GlobalScope,
     IdentifierAndType,
     If,
     Loop,
     Match,
     MatchArm,
     MathOperation,
-    ParseContext,
     Return,
     StructType,
     StructFieldInit,
@@ -44,6 +36,11 @@ from xlang.xl_ast import (
     EnumType,
     EnumEntry,
 )
+from xlang.utils import (
+    build_enum_entries,
+    build_global_scope,
+    decode_escape_sequences,
+)
 
 
 class ASTTransformer(Transformer):
@@ -51,7 +48,7 @@ class ASTTransformer(Transformer):
     def integer_constant(self, value):
         return Constant(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(value),
+            context=value.start_pos,
             constant_type=ConstantType.INTEGER,
             value=int(value.value),
         )
@@ -60,83 +57,36 @@ class ASTTransformer(Transformer):
     def float_constant(self, value):
         return Constant(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(value),
+            context=value.start_pos,
             constant_type=ConstantType.FLOAT,
             value=float(value.value),
         )
 
     @v_args(inline=True)
     def string_literal(self, value):
-        string_content = value.value[1:-1]  # Remove quotes
-
-        # Handle escape sequences
-        result = ""
-        i = 0
-        while i < len(string_content):
-            if string_content[i] == "\\" and i + 1 < len(string_content):
-                escape_char = string_content[i + 1]
-                if escape_char == "t":
-                    result += "\t"
-                elif escape_char == "n":
-                    result += "\n"
-                elif escape_char == "r":
-                    result += "\r"
-                elif escape_char == '"':
-                    result += '"'
-                elif escape_char == "\\":
-                    result += "\\"
-                elif escape_char == "0":
-                    result += "\0"
-                else:
-                    raise InternalCompilerError("Unhandled escape sequence")
-                i += 2  # Skip both the backslash and escape character
-            else:
-                result += string_content[i]
-                i += 1
-
         return Constant(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(value),
+            context=value.start_pos,
             constant_type=ConstantType.STRING,
-            value=result,
+            value=decode_escape_sequences(value.value[1:-1]),  # Remove quotes
         )
 
     @v_args(inline=True)
     def boolean_literal(self, value):
         return Constant(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(value),
+            context=value.start_pos,
             constant_type=ConstantType.BOOL,
             value=value.value == "true",
         )
 
     @v_args(inline=True)
     def char_literal(self, value):
-        char_content = value.value[1:-1]  # Remove quotes
-
-        # Handle escape sequences
-        if len(char_content) == 2 and char_content[0] == "\\":
-            escape_char = char_content[1]
-            if escape_char == "t":
-                char_content = "\t"
-            elif escape_char == "n":
-                char_content = "\n"
-            elif escape_char == "r":
-                char_content = "\r"
-            elif escape_char == "'":
-                char_content = "'"
-            elif escape_char == "\\":
-                char_content = "\\"
-            elif escape_char == "0":
-                char_content = "\0"
-            else:
-                raise InternalCompilerError("Unhandled escape sequence")
-
         return Constant(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(value),
+            context=value.start_pos,
             constant_type=ConstantType.CHAR,
-            value=char_content,
+            value=decode_escape_sequences(value.value[1:-1]),  # Remove quotes
         )
 
     def function_call(self, param):
@@ -145,7 +95,7 @@ class ASTTransformer(Transformer):
             type=None,
             function_name=param[0].value,
             params=call_args,
-            context=ParseContext.from_token(param[0]),
+            context=param[0].start_pos,
         )
 
     def positional_call_arg(self, params):
@@ -160,7 +110,7 @@ class ASTTransformer(Transformer):
         return FunctionArgument(
             name=name.value,
             value=expression,
-            context=ParseContext.from_token(name),
+            context=name.start_pos,
         )
 
     def call_args(self, params):
@@ -204,7 +154,7 @@ class ASTTransformer(Transformer):
         return FunctionParameter(
             name=identifier.value,
             param_type=param_type,
-            context=ParseContext.from_token(identifier),
+            context=identifier.start_pos,
             reference=reference,
             positional_only=positional_only,
             default_value=default_value,
@@ -240,7 +190,7 @@ class ASTTransformer(Transformer):
             return_type=return_type,
             function_params=function_params,
             statements=code_block.children,
-            context=ParseContext.from_token(name),
+            context=name.start_pos,
         )
 
     def type(self, params):
@@ -263,21 +213,19 @@ class ASTTransformer(Transformer):
         return IdentifierAndType(
             name=identifier.value,
             param_type=type,
-            context=ParseContext.from_token(identifier),
+            context=identifier.start_pos,
             default_value=default_value,
         )
 
     @v_args(inline=True)
     def struct_def(self, name, *entries):
         return StructType(
-            name=name.value, members=entries, context=ParseContext.from_token(name)
+            name=name.value, members=list(entries), context=name.start_pos
         )
 
     @v_args(inline=True)
     def loop(self, keyword, code_block):
-        return Loop(
-            context=ParseContext.from_token(keyword), statements=code_block.children
-        )
+        return Loop(context=keyword.start_pos, statements=code_block.children)
 
     def enum_entry(self, args):
         identifier = args[0]
@@ -289,57 +237,25 @@ class ASTTransformer(Transformer):
 
         return EnumEntry(
             name=identifier.value,
-            context=ParseContext.from_token(identifier),
+            context=identifier.start_pos,
             fields=fields,
         )
 
     @v_args(inline=True)
     def enum_def(self, name, *entries):
-        entries_dict = {}
-        for entry in entries:
-            if entry.name in entries_dict:
-                raise ContextException(
-                    f'Duplicate enum entry "{entry.name}"', entry.context
-                )
-            entries_dict[entry.name] = entry
         return EnumType(
             name=name.value,
-            entries=entries_dict,
-            context=ParseContext.from_token(name),
+            entries=build_enum_entries(entries),
+            context=name.start_pos,
         )
 
     def translation_unit(self, entries):
-        global_scope = GlobalScope()
-        for entry in entries:
-            if isinstance(entry, Function):
-                if entry.name in global_scope.functions:
-                    raise FunctionAlreadyDefinedException(
-                        f'Function with name "{entry.name}" is already defined',
-                        entry.context,
-                    )
-                global_scope.functions[entry.name] = entry
-            elif isinstance(entry, StructType):
-                if entry.name in global_scope.structs:
-                    raise StructAlreadyDefinedException(
-                        f'Struct with name "{entry.name}" is already defined',
-                        entry.context,
-                    )
-                global_scope.structs[entry.name] = entry
-            elif isinstance(entry, EnumType):
-                if entry.name in global_scope.enums:
-                    raise EnumAlreadyDefinedException(
-                        f'Enum with name "{entry.name}" is already defined',
-                        entry.context,
-                    )
-                global_scope.enums[entry.name] = entry
-            else:
-                raise InternalCompilerError("Unknown entry in global scope")
-        return global_scope
+        return build_global_scope(entries)
 
     @v_args(inline=True)
     def variable_def(self, name, var_type, value):
         return VariableDefinition(
-            context=ParseContext.from_token(name),
+            context=name.start_pos,
             name=name.value,
             variable_type=var_type,
             value=value,
@@ -349,7 +265,7 @@ class ASTTransformer(Transformer):
     @v_args(inline=True)
     def const_def(self, name, var_type, value):
         return VariableDefinition(
-            context=ParseContext.from_token(name),
+            context=name.start_pos,
             name=name.value,
             variable_type=var_type,
             value=value,
@@ -359,7 +275,7 @@ class ASTTransformer(Transformer):
     @v_args(inline=True)
     def variable_dec(self, name, var_type):
         return VariableDeclaration(
-            context=ParseContext.from_token(name),
+            context=name.start_pos,
             name=name.value,
             variable_type=var_type,
         )
@@ -410,21 +326,21 @@ class ASTTransformer(Transformer):
                 if operand.constant_type == ConstantType.INTEGER:
                     return Constant(
                         type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-                        context=ParseContext.from_token(operator),
+                        context=operator.start_pos,
                         constant_type=ConstantType.INTEGER,
                         value=-operand.value,
                     )
                 elif operand.constant_type == ConstantType.FLOAT:
                     return Constant(
                         type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-                        context=ParseContext.from_token(operator),
+                        context=operator.start_pos,
                         constant_type=ConstantType.FLOAT,
                         value=-operand.value,
                     )
             # For non-constants, create UnaryOperation
             return UnaryOperation(
                 type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-                context=ParseContext.from_token(operator),
+                context=operator.start_pos,
                 operand=operand,
                 operator=operator.value,
             )
@@ -435,7 +351,7 @@ class ASTTransformer(Transformer):
     def not_expr(self, operator, operand):
         return UnaryOperation(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(operator),
+            context=operator.start_pos,
             operand=operand,
             operator=operator.value,
         )
@@ -449,14 +365,14 @@ class ASTTransformer(Transformer):
                     condition=compare_expr,
                     statements=code_block.children,
                     else_statement=elif_else[-1],
-                    elif_statements=elif_else[:-1],
+                    elif_statements=list(elif_else[:-1]),
                 )
             else:
                 return If(
                     context=compare_expr.context,
                     condition=compare_expr,
                     statements=code_block.children,
-                    elif_statements=elif_else,
+                    elif_statements=list(elif_else),
                 )
         else:
             return If(
@@ -475,9 +391,7 @@ class ASTTransformer(Transformer):
 
     @v_args(inline=True)
     def else_statement(self, keyword, code_block):
-        return Else(
-            context=ParseContext.from_token(keyword), statements=code_block.children
-        )
+        return Else(context=keyword.start_pos, statements=code_block.children)
 
     def pattern_bindings(self, tokens):
         return [tok.value for tok in tokens]
@@ -498,7 +412,7 @@ class ASTTransformer(Transformer):
             variant_name=None if is_wildcard else name,
             is_wildcard=is_wildcard,
             bindings=bindings,
-            context=ParseContext.from_token(identifier_token),
+            context=identifier_token.start_pos,
         )
 
     @v_args(inline=True)
@@ -521,11 +435,11 @@ class ASTTransformer(Transformer):
     @v_args(inline=True)
     def control(self, keyword, return_value=None):
         if keyword == "break":
-            return Break(context=ParseContext.from_token(keyword))
+            return Break(context=keyword.start_pos)
         elif keyword == "continue":
-            return Continue(context=ParseContext.from_token(keyword))
+            return Continue(context=keyword.start_pos)
         elif keyword == "return":
-            return Return(context=ParseContext.from_token(keyword), value=return_value)
+            return Return(context=keyword.start_pos, value=return_value)
         else:
             raise InternalCompilerError("Unknown control keyword")
 
@@ -563,7 +477,7 @@ class ASTTransformer(Transformer):
 
         return VariableAccess(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(variable),
+            context=variable.start_pos,
             variable_name=variable.value,
             array_access=array_access,
             method_call=method_call,
@@ -575,7 +489,7 @@ class ASTTransformer(Transformer):
         return StructFieldInit(
             field_name=field_name.value,
             value=value,
-            context=ParseContext.from_token(field_name),
+            context=field_name.start_pos,
         )
 
     def struct_init(self, params):
@@ -583,7 +497,7 @@ class ASTTransformer(Transformer):
         field_inits = params[1:]
         return StructInitialization(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(struct_name),
+            context=struct_name.start_pos,
             struct_name=struct_name.value,
             field_inits=field_inits,
         )
@@ -594,7 +508,7 @@ class ASTTransformer(Transformer):
         field_inits = params[2:]
         return EnumVariantInitialization(
             type=VariableType(variable_type=VariableTypeEnum.UNKNOWN),
-            context=ParseContext.from_token(enum_name),
+            context=enum_name.start_pos,
             enum_name=enum_name.value,
             variant_name=variant_name.value,
             field_inits=field_inits,
@@ -0,0 +1,1038 @@
+"""Execution engine that transpiles the program to Python source and runs it.
+
+Every xlang function reachable from main becomes one Python function, every
+struct a class with __slots__. Primitives are plain Python ints, floats, strs
+and bools, arrays are lists and enum values are tuples of the variant name and
+the field values in declaration order. Operators on primitives become Python
+operators, the types were checked by the validation pass. Primitives and
+enum values are immutable, so a variable defined from one is a copy, while
+structs and arrays are shared between variables like in the interpreters.
+
+Local variables are Python locals named after the variable and its frame
+slot. Variables passed to reference parameters are held in a Reference, so
+the callee can assign them.
+
+The generated module ends with the parse contexts of its lines. Errors raised
+by the running program are reported as ContextExceptions at the statement
+that raised them. The generated source only depends on the validated program,
+ProgramCache stores it next to the source file.
+"""
+
+import copy
+import keyword
+import linecache
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from xlang.callgraph import CallGraph, iter_nodes
+from xlang.exceptions import (
+    ContextException,
+    InternalCompilerError,
+    InterpreterAssertionError,
+)
+from xlang.interpreter_datatypes import Value, ValueType
+from xlang.program_cache import ProgramCache
+from xlang.utils import bind_call_arguments
+from xlang.xl_ast import (
+    INTEGER_TYPES,
+    BaseExpression,
+    BaseFunction,
+    Break,
+    CompareOperation,
+    Constant,
+    Continue,
+    EnumVariantInitialization,
+    Function,
+    FunctionCall,
+    GlobalScope,
+    If,
+    Loop,
+    MathOperation,
+    Match,
+    MatchArm,
+    ParseContext,
+    PrimitiveType,
+    Return,
+    Statement,
+    StructInitialization,
+    StructType,
+    UnaryOperation,
+    VariableAccess,
+    VariableAssign,
+    VariableDeclaration,
+    VariableDefinition,
+    VariableType,
+    VariableTypeEnum,
+    _variable_type,
+)
+from xlang.xl_builtins import (
+    BUILTIN_FUNCTIONS,
+    builtin_print,
+    get_builtin_array_methods,
+    get_builtin_primitive_methods,
+)
+
+# file name of the generated code in tracebacks
+FILE_NAME = "<xlang>"
+
+MATH_OPERATORS = {"+": "+", "-": "-", "*": "*", "/": "//", "%": "%"}
+
+COMPARE_OPERATORS = ("==", "!=", ">=", ">", "<", "<=")
+
+
+class Reference:
+    """A variable passed to a reference parameter."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class MemberReference:
+    """A struct member passed to a reference parameter."""
+
+    __slots__ = ("struct", "member")
+
+    def __init__(self, struct, member: str):
+        self.struct = struct
+        self.member = member
+
+    @property
+    def value(self):
+        return getattr(self.struct, self.member)
+
+    @value.setter
+    def value(self, value):
+        setattr(self.struct, self.member, value)
+
+
+class ElementReference:
+    """An array element passed to a reference parameter."""
+
+    __slots__ = ("array", "index")
+
+    def __init__(self, array: list, index: int):
+        array_index(array, index)
+        self.array = array
+        self.index = index
+
+    @property
+    def value(self):
+        return self.array[self.index]
+
+    @value.setter
+    def value(self, value):
+        self.array[self.index] = value
+
+
+def array_index(array: list, index: int) -> int:
+    if index < 0 or index >= len(array):
+        raise Exception("Array index out of bounds")
+    return index
+
+
+def string_index(string: str, index: int) -> int:
+    if index < 0 or index >= len(string):
+        raise Exception("String index out of bounds")
+    return index
+
+
+def index(value, index: int, check):
+    return value[check(value, index)]
+
+
+def raise_exception(exception: Exception):
+    raise exception
+
+
+def assert_true(value: bool, context: ParseContext):
+    if value is not True:
+        raise InterpreterAssertionError("assertion failed", context)
+
+
+def to_value(global_scope: GlobalScope, value: Any, variable_type: VariableType):
+    """The Value of xlang.interpreter for a value of the generated code."""
+    if variable_type.variable_type == VariableTypeEnum.PRIMITIVE:
+        return Value(
+            type=ValueType.PRIMITIVE,
+            value=value,
+            primitive_type=variable_type.primitive_type,
+        )
+    elif variable_type.variable_type == VariableTypeEnum.ARRAY:
+        array_type = variable_type.array_type
+        assert array_type
+        elements = [to_value(global_scope, element, array_type) for element in value]
+        if array_type.variable_type == VariableTypeEnum.PRIMITIVE:
+            return Value(
+                type=ValueType.PRIMITIVE,
+                value=elements,
+                primitive_type=array_type.primitive_type,
+                is_array=True,
+            )
+        value_type = (
+            ValueType.STRUCT
+            if array_type.variable_type == VariableTypeEnum.STRUCT
+            else ValueType.ENUM
+        )
+        return Value(
+            type=value_type,
+            value=elements,
+            type_name=array_type.type_name,
+            is_array=True,
+        )
+    elif variable_type.variable_type == VariableTypeEnum.STRUCT:
+        assert variable_type.type_name
+        struct_type = global_scope.structs[variable_type.type_name]
+        return Value(
+            type=ValueType.STRUCT,
+            value={
+                member.name: to_value(
+                    global_scope,
+                    getattr(value, attribute_name(member.name)),
+                    member.param_type,
+                )
+                for member in struct_type.members
+            },
+            type_name=variable_type.type_name,
+        )
+    elif variable_type.variable_type == VariableTypeEnum.ENUM:
+        assert variable_type.type_name
+        variant_name = value[0]
+        if len(value) == 1:
+            enum_value: Any = variant_name
+        else:
+            fields = (
+                global_scope.enums[variable_type.type_name].entries[variant_name].fields
+            )
+            enum_value = {
+                "variant": variant_name,
+                "data": {
+                    field.name: to_value(global_scope, field_value, field.param_type)
+                    for field, field_value in zip(fields, value[1:])
+                },
+            }
+        return Value(
+            type=ValueType.ENUM, value=enum_value, type_name=variable_type.type_name
+        )
+    raise InternalCompilerError("Unknown variable type")
+
+
+def attribute_name(name: str) -> str:
+    """Python attribute of a struct member."""
+    return f"{name}_" if keyword.iskeyword(name) else name
+
+
+def local_name(name: str, slot: Optional[int]) -> str:
+    # slots are unique among the variables in scope, names are not
+    return f"v_{name}_{slot}"
+
+
+def is_simple(expression: str) -> bool:
+    """Names, attribute accesses and integer constants can be evaluated twice."""
+    return expression.replace(".", "").replace("_", "").isalnum() or (
+        expression.lstrip("-").isdigit()
+    )
+
+
+class Transpiler:
+    """Generates the Python module of a validated program."""
+
+    def __init__(self, global_scope: GlobalScope):
+        self.global_scope = global_scope
+        self.lines: List[str] = []
+        # parse context of each generated line
+        self.contexts: List[ParseContext] = []
+        self.context: ParseContext = -1
+        self.indent = 0
+        # module level constants for the variable types used by print
+        self.type_constants: Dict[VariableType, str] = {}
+        # per function: locals held in a Reference, types of the locals
+        self.references: Set[str] = set()
+        self.local_types: Dict[str, VariableType] = {}
+        self.temporaries = 0
+
+    def line(self, text: str):
+        self.lines.append("    " * self.indent + text)
+        self.contexts.append(self.context)
+
+    def module(self) -> str:
+        self.line("# xlang program transpiled to Python")
+        for struct_type in self.global_scope.structs.values():
+            self.struct_class(struct_type)
+        for function_name in CallGraph(self.global_scope).reachable():
+            function = self.global_scope.functions[function_name]
+            assert isinstance(function, Function)
+            self.function(function)
+        self.context = -1
+        for variable_type, name in self.type_constants.items():
+            self.line(f"{name} = {self.type_source(variable_type)}")
+        self.line(f"_LINE_CONTEXTS = {tuple(self.contexts + [-1])!r}")
+        return "\n".join(self.lines) + "\n"
+
+    def struct_class(self, struct_type: StructType):
+        self.context = struct_type.context
+        attributes = [attribute_name(member.name) for member in struct_type.members]
+        self.line(f"class struct_{struct_type.name}:")
+        self.indent += 1
+        self.line(f"__slots__ = {tuple(attributes)!r}")
+        self.line("")
+        self.line(f"def __init__({', '.join(['self'] + attributes)}):")
+        self.indent += 1
+        for attribute in attributes:
+            self.line(f"self.{attribute} = {attribute}")
+        if not attributes:
+            self.line("pass")
+        self.indent -= 2
+        self.line("")
+        self.line("")
+        self.line(f"def default_{struct_type.name}():")
+        self.indent += 1
+        self.line(
+            f"return struct_{struct_type.name}({self.member_values(struct_type.members, [])})"
+        )
+        self.indent -= 1
+        self.line("")
+        self.line("")
+
+    def function(self, function: Function):
+        self.references = self.reference_locals(function)
+        self.local_types = {}
+        self.temporaries = 0
+        self.context = function.context
+        parameters = []
+        # bind_call_arguments binds the positional parameters first
+        ordered_params = sorted(
+            enumerate(function.function_params),
+            key=lambda param: not param[1].positional_only,
+        )
+        for slot, param in ordered_params:
+            name = local_name(param.name, slot)
+            parameters.append(name)
+            self.local_types[name] = param.param_type
+            if param.reference:
+                self.references.add(name)
+        self.line(f"def xl_{function.name}({', '.join(parameters)}):")
+        self.indent += 1
+        for slot, param in ordered_params:
+            name = local_name(param.name, slot)
+            if not param.reference and name in self.references:
+                self.line(f"{name} = _Reference({name})")
+        self.statements(function.statements)
+        if not function.statements:
+            self.line("pass")
+        self.indent -= 1
+        self.line("")
+        self.line("")
+
+    def reference_locals(self, function: Function) -> Set[str]:
+        """Locals passed to reference parameters in the function."""
+        references = set()
+        for node in iter_nodes(function.statements):
+            if (
+                not isinstance(node, FunctionCall)
+                or node.function_name not in self.global_scope.functions
+            ):
+                continue
+            callee = self.global_scope.functions[node.function_name]
+            try:
+                bound_arguments = bind_call_arguments(
+                    node, callee.function_params, node.function_name
+                )
+            except ContextException:
+                continue
+            for argument, param in bound_arguments:
+                if (
+                    param.reference
+                    and isinstance(argument, VariableAccess)
+                    and argument.slot is not None
+                    and argument.array_access is None
+                    and argument.variable_access is None
+                    and argument.method_call is None
+                ):
+                    references.add(local_name(argument.variable_name, argument.slot))
+        return references
+
+    def block(self, statements: List[Statement]):
+        self.indent += 1
+        self.statements(statements)
+        if not statements:
+            self.line("pass")
+        self.indent -= 1
+
+    def statements(self, statements: List[Statement]):
+        for statement in statements:
+            self.statement(statement)
+
+    def statement(self, statement: Statement):
+        self.context = statement.context
+        if isinstance(statement, VariableDeclaration):
+            self.define(
+                statement.name,
+                statement.slot,
+                statement.variable_type,
+                self.default_value(statement.variable_type),
+            )
+        elif isinstance(statement, VariableDefinition):
+            self.define(
+                statement.name,
+                statement.slot,
+                statement.variable_type,
+                self.expression(statement.value),
+            )
+        elif isinstance(statement, VariableAssign):
+            value = self.expression(statement.value)
+            self.assign(statement.variable_access, value)
+        elif isinstance(statement, FunctionCall):
+            self.line(self.function_call(statement))
+        elif isinstance(statement, VariableAccess):
+            method_call = statement.method_call
+            if (
+                method_call is not None
+                and method_call.function_name == "append"
+                and method_call.receiver_type is not None
+                and method_call.receiver_type.variable_type
+                == VariableTypeEnum.PRIMITIVE
+            ):
+                self.string_append(statement, method_call)
+            else:
+                self.line(self.variable_access(statement))
+        elif isinstance(statement, Loop):
+            self.line("while True:")
+            self.block(statement.statements)
+        elif isinstance(statement, If):
+            self.line(f"if {self.expression(statement.condition)}:")
+            self.block(statement.statements)
+            for elif_statement in statement.elif_statements:
+                self.context = elif_statement.context
+                self.line(f"elif {self.expression(elif_statement.condition)}:")
+                self.block(elif_statement.statements)
+            if statement.else_statement:
+                self.context = statement.else_statement.context
+                self.line("else:")
+                self.block(statement.else_statement.statements)
+        elif isinstance(statement, Match):
+            self.match_statement(statement)
+        elif isinstance(statement, Return):
+            if statement.value:
+                self.line(f"return {self.expression(statement.value)}")
+            else:
+                self.line("return None")
+        elif isinstance(statement, Continue):
+            self.line("continue")
+        elif isinstance(statement, Break):
+            self.line("break")
+        else:
+            raise InternalCompilerError("unhandled statement")
+
+    def define(
+        self, name: str, slot: Optional[int], variable_type: VariableType, value: str
+    ):
+        variable = local_name(name, slot)
+        self.local_types[variable] = variable_type
+        if variable in self.references:
+            value = f"_Reference({value})"
+        self.line(f"{variable} = {value}")
+
+    def match_statement(self, statement: Match):
+        scrutinee = f"_match_{self.temporaries}"
+        self.temporaries += 1
+        self.line(f"{scrutinee} = {self.expression(statement.scrutinee)}")
+        enum_type = statement.scrutinee.type
+        assert enum_type is not None and enum_type.type_name is not None
+        entries = self.global_scope.enums[enum_type.type_name].entries
+        # variant arms are chosen before the wildcard arm, like Interpreter
+        wildcard_arm = None
+        arms: Dict[str, MatchArm] = {}
+        for arm in statement.arms:
+            variant_name = arm.pattern.variant_name
+            if arm.pattern.is_wildcard:
+                if wildcard_arm is None:
+                    wildcard_arm = arm
+            elif variant_name is not None and variant_name not in arms:
+                arms[variant_name] = arm
+        keyword_name = "if"
+        for variant_name, arm in arms.items():
+            self.context = arm.context
+            self.line(f"{keyword_name} {scrutinee}[0] == {variant_name!r}:")
+            keyword_name = "elif"
+            self.indent += 1
+            field_names = [field.name for field in entries[variant_name].fields]
+            for binding, slot in zip(arm.pattern.bindings, arm.pattern.binding_slots):
+                field_index = field_names.index(binding)
+                self.define(
+                    binding,
+                    slot,
+                    entries[variant_name].fields[field_index].param_type,
+                    f"{scrutinee}[{field_index + 1}]",
+                )
+            self.indent -= 1
+            self.block(arm.statements)
+        if wildcard_arm is not None:
+            self.context = wildcard_arm.context
+            if arms:
+                self.line("else:")
+                self.block(wildcard_arm.statements)
+            else:
+                self.statements(wildcard_arm.statements)
+        elif arms:
+            self.line("else:")
+            self.indent += 1
+            self.line(
+                "raise InternalCompilerError('No match arm was selected; should "
+                "have been caught by exhaustiveness check')"
+            )
+            self.indent -= 1
+
+    def expression(self, expression: BaseExpression) -> str:
+        if isinstance(expression, FunctionCall):
+            return self.function_call(expression)
+        elif isinstance(expression, VariableAccess):
+            return self.variable_access(expression)
+        elif isinstance(expression, Constant):
+            return repr(expression.value)
+        elif isinstance(expression, MathOperation):
+            if expression.operator not in MATH_OPERATORS:
+                raise InternalCompilerError("Unknown operator")
+            operand1 = self.expression(expression.operand1)
+            operand2 = self.expression(expression.operand2)
+            return f"({operand1} {MATH_OPERATORS[expression.operator]} {operand2})"
+        elif isinstance(expression, CompareOperation):
+            operand1 = self.expression(expression.operand1)
+            operand2 = self.expression(expression.operand2)
+            operand_type = expression.operand1.type
+            if operand_type and operand_type.variable_type == VariableTypeEnum.ENUM:
+                if expression.operator not in ("==", "!="):
+                    return self.raise_expression(
+                        f"Exception('Invalid operator for enum comparison: "
+                        f"{expression.operator}')"
+                    )
+                # enums are compared by their variant
+                operand1 = f"{operand1}[0]"
+                operand2 = f"{operand2}[0]"
+            if expression.operator not in COMPARE_OPERATORS:
+                raise InternalCompilerError("Unknown operator")
+            return f"({operand1} {expression.operator} {operand2})"
+        elif isinstance(expression, UnaryOperation):
+            operand = self.expression(expression.operand)
+            if expression.operator == "not":
+                return f"(not {operand})"
+            elif expression.operator == "-":
+                return f"(-{operand})"
+            raise InternalCompilerError(
+                f"Unknown unary operator: {expression.operator}"
+            )
+        elif isinstance(expression, StructInitialization):
+            members = self.global_scope.structs[expression.struct_name].members
+            values = self.member_values(members, expression.field_inits)
+            return f"struct_{expression.struct_name}({values})"
+        elif isinstance(expression, EnumVariantInitialization):
+            return self.enum_variant_initialization(expression)
+        raise InternalCompilerError("Unknown expression")
+
+    def raise_expression(self, exception: str) -> str:
+        return f"_raise({exception})"
+
+    def member_values(self, members, field_inits) -> str:
+        """Keyword arguments of a struct constructor. The initialized members
+        come first and are evaluated in source order."""
+        values = [
+            f"{attribute_name(field_init.field_name)}="
+            f"{self.expression(field_init.value)}"
+            for field_init in field_inits
+        ]
+        initialized = {field_init.field_name for field_init in field_inits}
+        for member in members:
+            if member.name not in initialized:
+                values.append(
+                    f"{attribute_name(member.name)}={self.member_default(member)}"
+                )
+        return ", ".join(values)
+
+    def member_default(self, member) -> str:
+        if member.default_value is not None:
+            return self.expression(member.default_value)
+        return self.default_value(member.param_type)
+
+    def enum_variant_initialization(self, expression: EnumVariantInitialization) -> str:
+        entry = self.global_scope.enums[expression.enum_name].entries[
+            expression.variant_name
+        ]
+        field_names = [field.name for field in entry.fields]
+        init_names = [field_init.field_name for field_init in expression.field_inits]
+        if init_names != sorted(init_names, key=field_names.index):
+            # keep the evaluation order of the source with temporaries
+            temporaries = {}
+            assignments = []
+            for field_init in expression.field_inits:
+                temporary = f"_field_{self.temporaries}"
+                self.temporaries += 1
+                temporaries[field_init.field_name] = temporary
+                assignments.append(
+                    f"({temporary} := {self.expression(field_init.value)})"
+                )
+            values = [
+                (
+                    temporaries[field.name]
+                    if field.name in temporaries
+                    else self.member_default(field)
+                )
+                for field in entry.fields
+            ]
+            return f"({', '.join(assignments)}, ({expression.variant_name!r}, {', '.join(values)}))[-1]"
+        inits = {
+            field_init.field_name: field_init.value
+            for field_init in expression.field_inits
+        }
+        values = [repr(expression.variant_name)]
+        for field in entry.fields:
+            if field.name in inits:
+                values.append(self.expression(inits[field.name]))
+            else:
+                values.append(self.member_default(field))
+        return f"({', '.join(values)},)"
+
+    def default_value(self, variable_type: VariableType) -> str:
+        base_type = variable_type.variable_type
+        if base_type == VariableTypeEnum.PRIMITIVE:
+            primitive_type = variable_type.primitive_type
+            if primitive_type in INTEGER_TYPES:
+                return "0"
+            elif primitive_type == PrimitiveType.F32:
+                return "0.0"
+            elif primitive_type == PrimitiveType.STRING:
+                return "''"
+            elif primitive_type == PrimitiveType.BOOL:
+                return "False"
+            return self.raise_expression(
+                "InternalCompilerError('primitive type not handled')"
+            )
+        elif base_type == VariableTypeEnum.ARRAY:
+            array_type = variable_type.array_type
+            assert array_type
+            if array_type.variable_type in (
+                VariableTypeEnum.PRIMITIVE,
+                VariableTypeEnum.STRUCT,
+                VariableTypeEnum.ENUM,
+            ):
+                return "[]"
+            return self.raise_expression(
+                "NotImplementedError('array type not implemented')"
+            )
+        elif base_type == VariableTypeEnum.STRUCT:
+            return f"default_{variable_type.type_name}()"
+        return self.raise_expression("InternalCompilerError('Unknown variable type')")
+
+    def access_steps(
+        self, variable_access: VariableAccess
+    ) -> Tuple[str, VariableType, List[Tuple[str, Any, VariableType]]]:
+        """The root local of an access chain with its type, and the member and
+        index accesses on it with the type they are applied to. Accesses are
+        in the order of the validation pass, indexing before members."""
+        variable = local_name(variable_access.variable_name, variable_access.slot)
+        variable_type = self.local_types[variable]
+        if variable in self.references:
+            root = f"{variable}.value"
+        else:
+            root = variable
+        steps: List[Tuple[str, Any, VariableType]] = []
+        current_type = variable_type
+        node: Optional[VariableAccess] = variable_access
+        is_root = True
+        while node is not None:
+            if not is_root:
+                steps.append(("member", node.variable_name, current_type))
+                assert current_type.type_name
+                struct_type = self.global_scope.structs[current_type.type_name]
+                current_type = next(
+                    member.param_type
+                    for member in struct_type.members
+                    if member.name == node.variable_name
+                )
+            if node.array_access is not None:
+                steps.append(("index", node.array_access, current_type))
+                if current_type.variable_type == VariableTypeEnum.ARRAY:
+                    assert current_type.array_type
+                    current_type = current_type.array_type
+                else:
+                    current_type = _variable_type(
+                        VariableTypeEnum.PRIMITIVE, None, PrimitiveType.CHAR, None
+                    )
+            node = node.variable_access
+            is_root = False
+        return root, variable_type, steps
+
+    def apply_step(self, value: str, step: Tuple[str, Any, VariableType]) -> str:
+        kind, argument, value_type = step
+        if kind == "member":
+            return f"{value}.{attribute_name(argument)}"
+        index = self.expression(argument)
+        check = (
+            "_array_index"
+            if value_type.variable_type == VariableTypeEnum.ARRAY
+            else "_string_index"
+        )
+        if is_simple(value) and is_simple(index):
+            return (
+                f"({value}[{index}] if 0 <= {index} < len({value}) "
+                f"else {value}[{check}({value}, {index})])"
+            )
+        return f"_index({value}, {index}, {check})"
+
+    def variable_access(self, variable_access: VariableAccess) -> str:
+        if variable_access.slot is None:
+            return self.enum_access(variable_access)
+        value, _, steps = self.access_steps(variable_access)
+        for step in steps:
+            value = self.apply_step(value, step)
+        if variable_access.method_call is not None:
+            value = self.method_call(value, variable_access.method_call)
+        return value
+
+    def enum_access(self, variable_access: VariableAccess) -> str:
+        enum_name = variable_access.variable_name
+        context = variable_access.context
+        if enum_name not in self.global_scope.enums:
+            # no slot and not an enum, the validation pass did not run
+            return self.raise_expression(
+                f"ContextException({f'Unknown variable: {enum_name}'!r}, {context})"
+            )
+        if variable_access.variable_access is None:
+            return self.raise_expression(
+                f"ContextException('Enum access must specify a member', {context})"
+            )
+        entries = self.global_scope.enums[enum_name].entries
+        entry = entries[variable_access.variable_access.variable_name]
+        return f"({entry.name!r},)"
+
+    def target(self, variable_access: VariableAccess) -> Tuple[str, str, str]:
+        """The container, the attribute or index, and the kind of the last
+        access of an assigned access chain. The container is evaluated once."""
+        variable = local_name(variable_access.variable_name, variable_access.slot)
+        value, _, steps = self.access_steps(variable_access)
+        if not steps:
+            if variable in self.references:
+                return variable, "value", "member"
+            return "", variable, "variable"
+        for step in steps[:-1]:
+            value = self.apply_step(value, step)
+        kind, argument, value_type = steps[-1]
+        if kind == "member":
+            return value, attribute_name(argument), "member"
+        if value_type.variable_type != VariableTypeEnum.ARRAY:
+            return value, self.expression(argument), "string"
+        return value, self.expression(argument), "index"
+
+    def assign(self, variable_access: VariableAccess, value: str):
+        container, key, kind = self.target(variable_access)
+        if kind == "variable":
+            self.line(f"{key} = {value}")
+            return
+        if not is_simple(container):
+            temporary = f"_container_{self.temporaries}"
+            self.temporaries += 1
+            assigned = f"_value_{self.temporaries}"
+            self.temporaries += 1
+            # the value is evaluated first, like in Interpreter
+            self.line(f"{assigned} = {value}")
+            self.line(f"{temporary} = {container}")
+            container, value = temporary, assigned
+        if kind == "member":
+            self.line(f"{container}.{key} = {value}")
+        elif kind == "index":
+            self.line(f"{container}[_array_index({container}, {key})] = {value}")
+        else:
+            # assigning a character of a string has no effect, like in Interpreter
+            self.line(f"{value}, _string_index({container}, {key})")
+
+    def string_append(self, variable_access: VariableAccess, method_call: FunctionCall):
+        method = self.builtin_method(method_call)
+        arguments = self.call_arguments(method, method_call)
+        if isinstance(arguments, str):
+            self.line(arguments)
+            return
+        (argument_expression, argument), *_ = arguments
+        argument_type = argument_expression.type
+        if argument_type is None or argument_type.primitive_type not in (
+            PrimitiveType.CHAR,
+            PrimitiveType.STRING,
+        ):
+            self.line(
+                self.raise_expression(
+                    "ContextException('append() can only accept char or string "
+                    f"arguments', {method_call.context})"
+                )
+            )
+            return
+        # the string is the receiver, assigning it updates the variable
+        receiver = VariableAccess(
+            context=variable_access.context,
+            type=None,
+            variable_name=variable_access.variable_name,
+            array_access=variable_access.array_access,
+            variable_access=variable_access.variable_access,
+            slot=variable_access.slot,
+        )
+        self.assign(receiver, f"{self.variable_access(receiver)} + {argument}")
+
+    def call_arguments(
+        self,
+        function: BaseFunction,
+        function_call: FunctionCall,
+        copy_arguments: bool = True,
+    ) -> Union[str, List[Tuple[BaseExpression, str]]]:
+        """The bound arguments with their code, or the code raising the
+        binding error. Builtins that do not modify their arguments get them
+        without copy_arguments."""
+        try:
+            bound_arguments = bind_call_arguments(
+                function_call, function.function_params, function_call.function_name
+            )
+        except ContextException as ex:
+            return self.raise_expression(f"ContextException({str(ex)!r}, {ex.context})")
+        arguments: List[Tuple[BaseExpression, str]] = []
+        for argument_expr, param in bound_arguments:
+            if param.reference:
+                if not isinstance(argument_expr, VariableAccess):
+                    return self.raise_expression(
+                        "ContextException('Reference parameters can only be "
+                        f"variables', {argument_expr.context})"
+                    )
+                arguments.append((argument_expr, self.reference(argument_expr)))
+            elif copy_arguments:
+                arguments.append(
+                    (
+                        argument_expr,
+                        self.copied(self.expression(argument_expr), argument_expr.type),
+                    )
+                )
+            else:
+                arguments.append((argument_expr, self.expression(argument_expr)))
+        return arguments
+
+    def reference(self, variable_access: VariableAccess) -> str:
+        if variable_access.slot is None:
+            return self.enum_access(variable_access)
+        container, key, kind = self.target(variable_access)
+        if kind == "variable":
+            # reference_locals made the variable a Reference
+            raise InternalCompilerError(f"{key} is not a Reference")
+        elif kind == "member":
+            if key == "value" and container == local_name(
+                variable_access.variable_name, variable_access.slot
+            ):
+                return container
+            return f"_MemberReference({container}, {key!r})"
+        elif kind == "index":
+            return f"_ElementReference({container}, {key})"
+        # characters are copies, like in Interpreter
+        return f"_Reference({self.variable_access(variable_access)})"
+
+    def copied(self, value: str, variable_type: Optional[VariableType]) -> str:
+        """Arguments are passed by value, aggregates are copied."""
+        if variable_type is None or not self.is_mutable(variable_type, set()):
+            return value
+        if (
+            variable_type.variable_type == VariableTypeEnum.ARRAY
+            and variable_type.array_type is not None
+            and not self.is_mutable(variable_type.array_type, set())
+        ):
+            return f"{value}[:]"
+        return f"_deepcopy({value})"
+
+    def is_mutable(self, variable_type: VariableType, seen: Set[str]) -> bool:
+        if variable_type.variable_type in (
+            VariableTypeEnum.ARRAY,
+            VariableTypeEnum.STRUCT,
+        ):
+            return True
+        elif variable_type.variable_type == VariableTypeEnum.ENUM:
+            # enum values are tuples, mutable if a field is
+            enum_name = variable_type.type_name
+            assert enum_name
+            if enum_name in seen:
+                return False
+            seen.add(enum_name)
+            return any(
+                self.is_mutable(field.param_type, seen)
+                for entry in self.global_scope.enums[enum_name].entries.values()
+                for field in entry.fields
+            )
+        return False
+
+    def function_call(self, function_call: FunctionCall) -> str:
+        function_name = function_call.function_name
+        function: BaseFunction
+        if function_name in self.global_scope.functions:
+            function = self.global_scope.functions[function_name]
+        elif function_name in BUILTIN_FUNCTIONS:
+            function = BUILTIN_FUNCTIONS[function_name]
+        else:
+            return self.raise_expression(
+                f"Exception({f'Unknown function called: {function_name}'!r})"
+            )
+        arguments = self.call_arguments(
+            function, function_call, copy_arguments=function_name != "print"
+        )
+        if isinstance(arguments, str):
+            return arguments
+        values = [value for _, value in arguments]
+        if function_name in self.global_scope.functions:
+            return f"xl_{function_name}({', '.join(values)})"
+        elif function_name == "print":
+            return self.print_call(arguments[0][0], arguments[0][1])
+        elif function_name == "assert":
+            return f"_assert({values[0]}, {function_call.context})"
+        raise InternalCompilerError(f"Builtin function not supported: {function_name}")
+
+    def print_call(self, expression: BaseExpression, value: str) -> str:
+        value_type = expression.type
+        assert value_type is not None
+        if value_type.variable_type == VariableTypeEnum.PRIMITIVE:
+            if value_type.primitive_type == PrimitiveType.BOOL:
+                return f"print('true' if {value} else 'false')"
+            return f"print({value})"
+        elif value_type.variable_type == VariableTypeEnum.ENUM:
+            return f"print({value}[0])"
+        if value_type not in self.type_constants:
+            self.type_constants[value_type] = f"_TYPE_{len(self.type_constants)}"
+        return f"_print_value({value}, {self.type_constants[value_type]})"
+
+    def type_source(self, variable_type: VariableType) -> str:
+        array_type = (
+            self.type_source(variable_type.array_type)
+            if variable_type.array_type is not None
+            else "None"
+        )
+        primitive_type = (
+            f"PrimitiveType.{variable_type.primitive_type.name}"
+            if variable_type.primitive_type is not None
+            else "None"
+        )
+        return (
+            f"_variable_type(VariableTypeEnum.{variable_type.variable_type.name}, "
+            f"{variable_type.type_name!r}, {primitive_type}, {array_type})"
+        )
+
+    def builtin_method(self, method_call: FunctionCall) -> BaseFunction:
+        receiver_type = method_call.receiver_type
+        if receiver_type is None:
+            raise InternalCompilerError("Method call was not validated")
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            methods = get_builtin_array_methods()
+        else:
+            methods = get_builtin_primitive_methods()[receiver_type.primitive_type]
+        return methods[method_call.function_name]
+
+    def method_call(self, receiver: str, method_call: FunctionCall) -> str:
+        method = self.builtin_method(method_call)
+        arguments = self.call_arguments(method, method_call)
+        if isinstance(arguments, str):
+            return arguments
+        receiver_type = method_call.receiver_type
+        assert receiver_type is not None
+        name = method_call.function_name
+        if receiver_type.variable_type == VariableTypeEnum.ARRAY:
+            if name == "append":
+                return f"{receiver}.append({arguments[0][1]})"
+            elif name == "length":
+                return f"len({receiver})"
+        elif receiver_type.primitive_type == PrimitiveType.STRING:
+            if name == "toLowerCase":
+                return f"{receiver}.lower()"
+            elif name == "toUpperCase":
+                return f"{receiver}.upper()"
+            elif name == "length":
+                return f"len({receiver})"
+        elif receiver_type.primitive_type == PrimitiveType.CHAR and name == "int":
+            return f"ord({receiver})"
+        raise InternalCompilerError(f"Builtin method not supported: {name}")
+
+
+class PythonEngine:
+    """Runs a program transpiled to Python, see Transpiler."""
+
+    def __init__(self):
+        self.cache: Optional[Tuple[ProgramCache, str, int, str]] = None
+
+    def use_cache(
+        self, cache: ProgramCache, source_code: str, chunk_index: int, options: str
+    ):
+        """Load and store the generated code in cache, for the given xlang
+        source code and compiler options."""
+        self.cache = (cache, source_code, chunk_index, options)
+
+    def transpile(self, ast: GlobalScope) -> str:
+        if self.cache is None:
+            return Transpiler(ast).module()
+        cache, source_code, chunk_index, options = self.cache
+        python_source = cache.load_python(source_code, chunk_index, options)
+        if python_source is None:
+            python_source = Transpiler(ast).module()
+            cache.store_python(source_code, python_source, chunk_index, options)
+        return python_source
+
+    def run(self, ast: GlobalScope):
+        self.global_scope = ast
+        if "main" not in ast.functions:
+            raise Exception("No main function found")
+        python_source = self.transpile(ast)
+        # tracebacks show the generated code
+        linecache.cache[FILE_NAME] = (
+            len(python_source),
+            None,
+            python_source.splitlines(True),
+            FILE_NAME,
+        )
+        namespace = self.namespace(ast)
+        exec(compile(python_source, FILE_NAME, "exec"), namespace)
+        try:
+            namespace["xl_main"]()
+        except ContextException:
+            raise
+        except Exception as ex:
+            raise self.runtime_error(ex, namespace["_LINE_CONTEXTS"]) from ex
+
+    def namespace(self, ast: GlobalScope) -> Dict[str, Any]:
+        return {
+            "_Reference": Reference,
+            "_MemberReference": MemberReference,
+            "_ElementReference": ElementReference,
+            "_array_index": array_index,
+            "_string_index": string_index,
+            "_index": index,
+            "_raise": raise_exception,
+            "_assert": assert_true,
+            "_deepcopy": copy.deepcopy,
+            "_print_value": lambda value, variable_type: builtin_print(
+                [to_value(ast, value, variable_type)]
+            ),
+            "_variable_type": _variable_type,
+            "VariableTypeEnum": VariableTypeEnum,
+            "PrimitiveType": PrimitiveType,
+            "ContextException": ContextException,
+            "InternalCompilerError": InternalCompilerError,
+        }
+
+    def runtime_error(
+        self, ex: Exception, line_contexts: Tuple[ParseContext, ...]
+    ) -> Exception:
+        """The exception as a ContextException at the innermost statement of
+        the generated code in its traceback."""
+        traceback = ex.__traceback__
+        frame = None
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == FILE_NAME:
+                frame = traceback
+            traceback = traceback.tb_next
+        if frame is None:
+            return ex
+        context_exception = ContextException(
+            str(ex) or type(ex).__name__, line_contexts[frame.tb_lineno - 1]
+        )
+        function_name = frame.tb_frame.f_code.co_name
+        if function_name.startswith("xl_"):
+            function = self.global_scope.functions[function_name[3:]]
+            assert isinstance(function, Function)
+            context_exception.function_name = function.name
+            context_exception.function_parse_context = function.context
+        return context_exception
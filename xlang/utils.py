@@ -1,7 +1,88 @@
-from typing import List
+import re
+from typing import Dict, List
 
-from xlang.exceptions import ContextException
-from xlang.xl_ast import BaseExpression, FunctionCall, FunctionParameter
+from xlang.exceptions import (
+    ContextException,
+    EnumAlreadyDefinedException,
+    FunctionAlreadyDefinedException,
+    InternalCompilerError,
+    StructAlreadyDefinedException,
+)
+from xlang.xl_ast import (
+    BaseExpression,
+    EnumEntry,
+    EnumType,
+    Function,
+    FunctionCall,
+    FunctionParameter,
+    GlobalScope,
+    StructType,
+)
+
+ESCAPE_SEQUENCES = {
+    "t": "\t",
+    "n": "\n",
+    "r": "\r",
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+    "0": "\0",
+}
+ESCAPE_SEQUENCE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+
+def _decode_escape_sequence(match: re.Match) -> str:
+    escape_char = match.group(1)
+    if escape_char not in ESCAPE_SEQUENCES:
+        raise InternalCompilerError("Unhandled escape sequence")
+    return ESCAPE_SEQUENCES[escape_char]
+
+
+def decode_escape_sequences(content: str) -> str:
+    """Decodes the content of a string or char literal, without the quotes."""
+    if "\\" not in content:
+        return content
+    return ESCAPE_SEQUENCE_RE.sub(_decode_escape_sequence, content)
+
+
+def build_enum_entries(entries: List[EnumEntry]) -> Dict[str, EnumEntry]:
+    entries_dict: Dict[str, EnumEntry] = {}
+    for entry in entries:
+        if entry.name in entries_dict:
+            raise ContextException(
+                f'Duplicate enum entry "{entry.name}"', entry.context
+            )
+        entries_dict[entry.name] = entry
+    return entries_dict
+
+
+def build_global_scope(entries) -> GlobalScope:
+    global_scope = GlobalScope()
+    for entry in entries:
+        if isinstance(entry, Function):
+            if entry.name in global_scope.functions:
+                raise FunctionAlreadyDefinedException(
+                    f'Function with name "{entry.name}" is already defined',
+                    entry.context,
+                )
+            global_scope.functions[entry.name] = entry
+        elif isinstance(entry, StructType):
+            if entry.name in global_scope.structs:
+                raise StructAlreadyDefinedException(
+                    f'Struct with name "{entry.name}" is already defined',
+                    entry.context,
+                )
+            global_scope.structs[entry.name] = entry
+        elif isinstance(entry, EnumType):
+            if entry.name in global_scope.enums:
+                raise EnumAlreadyDefinedException(
+                    f'Enum with name "{entry.name}" is already defined',
+                    entry.context,
+                )
+            global_scope.enums[entry.name] = entry
+        else:
+            raise InternalCompilerError("Unknown entry in global scope")
+    return global_scope
 
 
 def bind_call_arguments(
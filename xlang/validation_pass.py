@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Collection, List, Optional, Tuple
 
 from xlang.xl_ast import (
     BaseFunction,
@@ -35,43 +35,65 @@ from xlang.xl_builtins import (
     get_builtin_array_methods,
     get_builtin_primitive_methods,
 )
-from xlang.xl_types import typeify, is_type_compatible, primitive_type_from_constant
+from xlang.xl_types import (
+    is_type_compatible,
+    primitive,
+    primitive_type_from_constant,
+    typeify,
+)
 from xlang.exceptions import (
     ContextException,
     InternalCompilerError,
     TypeMismatchException,
 )
+from xlang.callgraph import CallGraph
+from xlang.rd_parser import load_function_bodies
 from xlang.utils import bind_call_arguments
 
 
 class ScopeStack:
+    """Variables of the nested scopes of a function.
+
+    Every variable gets a slot in the call frame of the function. The slots of
+    a scope are reused by the scopes that follow it, frame_size is the number
+    of slots needed by the whole function.
+    """
+
     def __init__(self):
         self.stack = [{}]
+        self.slot_count = 0
+        self.frame_size = 0
 
     def def_variable(
         self, name: str, variable_type: VariableType, const: bool, context: ParseContext
-    ):
+    ) -> int:
         if name in self.stack[-1]:
             raise ContextException(f"Variable {name} already defined", context)
-        self.stack[-1][name] = (variable_type, const)
+        slot = self.slot_count
+        self.slot_count += 1
+        self.frame_size = max(self.frame_size, self.slot_count)
+        self.stack[-1][name] = (variable_type, const, slot)
+        return slot
 
-    def get_variable_type(self, name: str) -> Optional[VariableType]:
+    def get_variable(self, name: str) -> Optional[Tuple[VariableType, bool, int]]:
         for stack in reversed(self.stack):
             if name in stack:
-                return stack[name][0]
+                return stack[name]
         return None  # variable not found
 
+    def get_variable_type(self, name: str) -> Optional[VariableType]:
+        variable = self.get_variable(name)
+        return variable[0] if variable else None
+
     def is_const(self, name: str) -> Optional[bool]:
-        for stack in reversed(self.stack):
-            if name in stack:
-                return stack[name][1]
-        return None
+        variable = self.get_variable(name)
+        return variable[1] if variable else None
 
     def push_scope(self):
         self.stack.append({})
 
     def pop_scope(self):
-        self.stack.pop()
+        self.slot_count -= len(self.stack.pop())
 
 
 class Typeifier:
@@ -95,20 +117,22 @@ class Typeifier:
             statement.variable_type = typeify(
                 statement.variable_type, self.global_scope, statement.context
             )
-            self.scope_stack.def_variable(
+            statement.slot = self.scope_stack.def_variable(
                 statement.name, statement.variable_type, False, statement.context
             )
         elif isinstance(statement, VariableDefinition):
             statement.variable_type = typeify(
                 statement.variable_type, self.global_scope, statement.context
             )
-            self.scope_stack.def_variable(
+            # The value is evaluated before the variable exists, it can refer to
+            # a variable with the same name in an outer scope.
+            value_type = self.expression(statement.value)
+            statement.slot = self.scope_stack.def_variable(
                 statement.name,
                 statement.variable_type,
                 statement.const,
                 statement.context,
             )
-            value_type = self.expression(statement.value)
             if not is_type_compatible(statement.variable_type, value_type):
                 raise TypeMismatchException(
                     "Incompatible value type", statement.context
@@ -205,9 +229,10 @@ class Typeifier:
             raise InternalCompilerError("Unhandled statement")
 
     def variable_access(self, variable_access: VariableAccess):
-        variable_type = self.scope_stack.get_variable_type(
-            variable_access.variable_name
-        )
+        variable = self.scope_stack.get_variable(variable_access.variable_name)
+        variable_type = None
+        if variable:
+            variable_type, _, variable_access.slot = variable
         if not variable_type:
             variable_type = get_enum_type(variable_access, self.global_scope)
             if variable_type:
@@ -307,10 +332,7 @@ class Typeifier:
                         f"Unknown math operator: {expression.operator}"
                     )
 
-                return VariableType(
-                    variable_type=VariableTypeEnum.PRIMITIVE,
-                    primitive_type=PrimitiveType.F32,
-                )
+                return primitive(PrimitiveType.F32)
             else:
                 # Mixed types that can't be folded, fall back to normal type checking
                 if is_type_compatible(operand1_type, operand2_type):
@@ -348,6 +370,7 @@ class Typeifier:
                 f"Unknown struct field: {struct_access.variable_name}",
                 struct_access.context,
             )
+        struct_access.offset = struct_type.offsets[member.name]
 
         if struct_access.array_access is not None:
             expression_type = self.array_access(
@@ -387,10 +410,7 @@ class Typeifier:
                     "String index must be an integer",
                     array_access.context,
                 )
-            return VariableType(
-                variable_type=VariableTypeEnum.PRIMITIVE,
-                primitive_type=PrimitiveType.CHAR,
-            )
+            return primitive(PrimitiveType.CHAR)
         else:
             raise TypeMismatchException(
                 "Indexing not supported for this type",
@@ -415,10 +435,7 @@ class Typeifier:
                 raise TypeMismatchException(
                     "Operands cannot be compared", expression.context
                 )
-            expression.type = VariableType(
-                variable_type=VariableTypeEnum.PRIMITIVE,
-                primitive_type=PrimitiveType.BOOL,
-            )
+            expression.type = primitive(PrimitiveType.BOOL)
         elif isinstance(expression, UnaryOperation):
             operand_type = self.expression(expression.operand)
             if expression.operator == "not":
@@ -429,10 +446,7 @@ class Typeifier:
                     raise TypeMismatchException(
                         "not operator only works on bool values", expression.context
                     )
-                expression.type = VariableType(
-                    variable_type=VariableTypeEnum.PRIMITIVE,
-                    primitive_type=PrimitiveType.BOOL,
-                )
+                expression.type = primitive(PrimitiveType.BOOL)
             elif expression.operator == "-":
                 if operand_type.variable_type != VariableTypeEnum.PRIMITIVE:
                     raise TypeMismatchException(
@@ -524,6 +538,8 @@ class Typeifier:
                     f"Invalid function parameter type. Expected {param_type.param_type}, but got {expression_type}",
                     param_expr.context,
                 )
+        # the interpreter does not bind the arguments again
+        expression.bound_arguments = bound_arguments
 
     def method_call(self, method_call: FunctionCall, variable_type: VariableType):
         method_name = method_call.function_name
@@ -564,6 +580,7 @@ class Typeifier:
             )
 
         self.check_call_arguments(method_call, method.function_params)
+        method_call.receiver_type = variable_type
         return method.return_type
 
     def struct_initialization(self, expression: StructInitialization):
@@ -601,6 +618,7 @@ class Typeifier:
                 )
 
             initialized_fields.add(field_name)
+            field_init.offset = struct_type.offsets[field_name]
 
             # Type check the field value
             field_type = struct_fields[field_name].param_type
@@ -678,6 +696,7 @@ class Typeifier:
                 )
 
             initialized_fields.add(field_name)
+            field_init.offset = variant_entry.offsets[field_name]
 
             # Type check the field value
             field_type = variant_fields[field_name].param_type
@@ -716,7 +735,9 @@ class Typeifier:
 
         seen_variants: set = set()
         wildcard_arm = None
-        for arm in statement.arms:
+        # the wildcard arm takes the variants no other arm names
+        arm_table: List[Optional[int]] = [None] * len(variant_entries)
+        for arm_index, arm in enumerate(statement.arms):
             pattern = arm.pattern
             if pattern.is_wildcard:
                 if wildcard_arm is not None:
@@ -726,6 +747,7 @@ class Typeifier:
                         "Wildcard pattern cannot have bindings", pattern.context
                     )
                 wildcard_arm = arm
+                wildcard_index = arm_index
                 self.scope_stack.push_scope()
                 self.statements(arm.statements)
                 self.scope_stack.pop_scope()
@@ -746,6 +768,8 @@ class Typeifier:
             seen_variants.add(variant_name)
 
             variant_entry = variant_entries[variant_name]
+            assert variant_entry.discriminant is not None
+            arm_table[variant_entry.discriminant] = arm_index
             variant_field_names = {f.name: f for f in variant_entry.fields}
 
             seen_bindings: set = set()
@@ -763,11 +787,18 @@ class Typeifier:
                     )
 
             self.scope_stack.push_scope()
-            for binding in pattern.bindings:
-                field = variant_field_names[binding]
+            pattern.binding_offsets = [
+                variant_entry.offsets[binding] for binding in pattern.bindings
+            ]
+            pattern.binding_slots = [
                 self.scope_stack.def_variable(
-                    binding, field.param_type, True, pattern.context
+                    binding,
+                    variant_field_names[binding].param_type,
+                    True,
+                    pattern.context,
                 )
+                for binding in pattern.bindings
+            ]
             self.statements(arm.statements)
             self.scope_stack.pop_scope()
 
@@ -785,29 +816,20 @@ class Typeifier:
                     f"Non-exhaustive match: missing variants: {missing_list}",
                     statement.context,
                 )
+        statement.arm_table = [
+            wildcard_index if index is None else index for index in arm_table
+        ]
 
 
 def get_constant_type(constant: Constant) -> VariableType:
     if constant.constant_type == ConstantType.STRING:
-        return VariableType(
-            variable_type=VariableTypeEnum.PRIMITIVE,
-            primitive_type=PrimitiveType.STRING,
-        )
+        return primitive(PrimitiveType.STRING)
     elif constant.constant_type == ConstantType.FLOAT:
-        return VariableType(
-            variable_type=VariableTypeEnum.PRIMITIVE,
-            primitive_type=PrimitiveType.F32,
-        )
+        return primitive(PrimitiveType.F32)
     elif constant.constant_type == ConstantType.BOOL:
-        return VariableType(
-            variable_type=VariableTypeEnum.PRIMITIVE,
-            primitive_type=PrimitiveType.BOOL,
-        )
+        return primitive(PrimitiveType.BOOL)
     elif constant.constant_type == ConstantType.CHAR:
-        return VariableType(
-            variable_type=VariableTypeEnum.PRIMITIVE,
-            primitive_type=PrimitiveType.CHAR,
-        )
+        return primitive(PrimitiveType.CHAR)
     elif constant.constant_type == ConstantType.INTEGER:
         return primitive_type_from_constant(constant.value, constant.context)
     else:
@@ -926,9 +948,25 @@ def validate_function_parameters(
             )
 
 
-def validation_pass(global_scope: GlobalScope):
+def validation_pass(
+    global_scope: GlobalScope,
+    reachable_only: Optional[bool] = None,
+    validated: Collection[str] = (),
+):
+    """Typeifies the global scope and validates the function bodies.
+
+    With reachable_only, only the bodies of the functions reachable from main
+    are validated. It defaults to True for programs from the lazy frontend,
+    their unreachable function bodies are never parsed. The bodies of the
+    functions in validated are already validated and are skipped, see
+    xlang.incremental.
+    """
     for enum in global_scope.enums.values():
-        for entry in enum.entries.values():
+        for discriminant, entry in enumerate(enum.entries.values()):
+            entry.discriminant = discriminant
+            entry.offsets = {
+                field.name: offset for offset, field in enumerate(entry.fields)
+            }
             # Check for duplicate field names within the entry
             if entry.fields:
                 field_names = [f.name for f in entry.fields]
@@ -943,6 +981,12 @@ def validation_pass(global_scope: GlobalScope):
                     field.param_type, global_scope, field.context
                 )
 
+    # default values can initialize other structs, all offsets come first
+    for struct in global_scope.structs.values():
+        struct.offsets = {
+            member.name: offset for offset, member in enumerate(struct.members)
+        }
+
     for struct in global_scope.structs.values():
         for member in struct.members:
             member.param_type = typeify(member.param_type, global_scope, member.context)
@@ -968,12 +1012,29 @@ def validation_pass(global_scope: GlobalScope):
             )
         validate_function_parameters(function, global_scope)
 
-    for function in global_scope.functions.values():
-        assert isinstance(function, Function)
-        try:
-            typeifier = Typeifier(global_scope, function)
-            typeifier.statements(function.statements)
-        except ContextException as ex:
-            ex.function_name = function.name
-            ex.function_parse_context = function.context
-            raise ex
+    if reachable_only is None:
+        reachable_only = any(
+            function.unparsed_body is not None
+            for function in global_scope.functions.values()
+        )
+    if reachable_only:
+        function_names = CallGraph(global_scope).reachable()
+    else:
+        load_function_bodies(global_scope)
+        function_names = list(global_scope.functions)
+    function_names = [name for name in function_names if name not in validated]
+
+    for function_name in function_names:
+        validate_function(global_scope, global_scope.functions[function_name])
+
+
+def validate_function(global_scope: GlobalScope, function: Function):
+    assert isinstance(function, Function)
+    try:
+        typeifier = Typeifier(global_scope, function)
+        typeifier.statements(function.statements)
+        function.frame_size = typeifier.scope_stack.frame_size
+    except ContextException as ex:
+        ex.function_name = function.name
+        ex.function_parse_context = function.context
+        raise ex
@@ -0,0 +1,272 @@
+"""Stack-based virtual machine that runs the bytecode from xlang.bytecode.
+
+Calls of program functions do not recurse on the Python stack. The dispatch
+loop of execute keeps the frames of the calling functions on its own call
+stack, so the call depth is only limited by memory or by max_call_depth. Tail
+calls replace the frame of the calling function. Functions are compiled on
+their first call. The values are the ones of the tree-walking interpreter,
+see xlang.runtime.
+"""
+
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from xlang.bytecode import Code, Opcode, compile_function
+from xlang.exceptions import ContextException, InternalCompilerError
+from xlang.interpreter_datatypes import Reference, StringBuilder
+from xlang.runtime import Runtime
+from xlang.xl_ast import Function, GlobalScope
+
+CONST = Opcode.CONST.value
+LOAD = Opcode.LOAD.value
+STORE = Opcode.STORE.value
+LOAD_REF = Opcode.LOAD_REF.value
+DEFAULT = Opcode.DEFAULT.value
+POP = Opcode.POP.value
+ENUM_VALUE = Opcode.ENUM_VALUE.value
+MEMBER = Opcode.MEMBER.value
+INDEX = Opcode.INDEX.value
+STRING = Opcode.STRING.value
+COPY = Opcode.COPY.value
+LAZY_COPY = Opcode.LAZY_COPY.value
+LOCATE = Opcode.LOCATE.value
+LOCATE_REF = Opcode.LOCATE_REF.value
+LOCATE_MEMBER = Opcode.LOCATE_MEMBER.value
+LOCATE_INDEX = Opcode.LOCATE_INDEX.value
+STORE_ITEM = Opcode.STORE_ITEM.value
+ASSIGN = Opcode.ASSIGN.value
+REFERENCE = Opcode.REFERENCE.value
+MATH = Opcode.MATH.value
+COMPARE = Opcode.COMPARE.value
+ENUM_COMPARE = Opcode.ENUM_COMPARE.value
+NOT = Opcode.NOT.value
+NEGATE = Opcode.NEGATE.value
+STRUCT_INIT = Opcode.STRUCT_INIT.value
+ENUM_INIT = Opcode.ENUM_INIT.value
+CALL = Opcode.CALL.value
+TAIL_CALL = Opcode.TAIL_CALL.value
+CALL_BUILTIN = Opcode.CALL_BUILTIN.value
+CALL_METHOD = Opcode.CALL_METHOD.value
+STRING_APPEND = Opcode.STRING_APPEND.value
+RETURN = Opcode.RETURN.value
+RETURN_NONE = Opcode.RETURN_NONE.value
+JUMP = Opcode.JUMP.value
+JUMP_IF_FALSE = Opcode.JUMP_IF_FALSE.value
+MATCH = Opcode.MATCH.value
+BIND = Opcode.BIND.value
+RAISE = Opcode.RAISE.value
+
+
+class VirtualMachine(Runtime):
+    def __init__(self, max_call_depth: Optional[int] = None):
+        super().__init__()
+        # number of active calls, including main, None for no limit
+        self.max_call_depth = max_call_depth
+
+    def run(self, ast: GlobalScope):
+        self.global_scope = ast
+        if "main" not in ast.functions:
+            raise Exception("No main function found")
+        main_function = ast.functions["main"]
+
+        assert isinstance(main_function, Function)
+        # compiled functions by name, see code
+        self.codes: Dict[str, Code] = {}
+        self.pinned = []
+        self.call(self.code("main"), [])
+
+    def code(self, function_name: str) -> Code:
+        code = self.codes.get(function_name)
+        if code is None:
+            function = self.global_scope.functions[function_name]
+            assert isinstance(function, Function)
+            code = compile_function(self.global_scope, function)
+            self.codes[function_name] = code
+        return code
+
+    def call(self, code: Code, arguments: List[Any]) -> Any:
+        return self.execute(code, self.frame(code, arguments))
+
+    def frame(self, code: Code, arguments: List[Any]) -> List[Any]:
+        # the parameters are in the first slots
+        if code.frame_size > len(arguments):
+            arguments.extend([None] * (code.frame_size - len(arguments)))
+        return arguments
+
+    def execute(self, code: Code, frame: List[Any]) -> Any:
+        """Runs code until it returns, with the functions it calls. The value
+        stack is shared by all calls, the operands of a calling function stay
+        below the ones of the called function."""
+        opcodes = code.opcodes
+        arguments = code.arguments
+        stack: List[Any] = []
+        push = stack.append
+        pop = stack.pop
+        pinned = self.pinned
+        position = 0
+        # code, frame and return position of the calling functions, with the
+        # number of pinned locations before the call
+        calls: List[Tuple[Code, List[Any], int, int]] = []
+        if self.max_call_depth is None:
+            max_calls = sys.maxsize
+        else:
+            max_calls = self.max_call_depth - 1
+        while True:
+            opcode = opcodes[position]
+            argument = arguments[position]
+            position += 1
+            if opcode == LOAD:
+                push(frame[argument])
+            elif opcode == CONST:
+                push(argument)
+            elif opcode == STORE:
+                frame[argument] = pop()
+            elif opcode == JUMP_IF_FALSE:
+                if pop() is not True:
+                    position = argument
+            elif opcode == MATH or opcode == COMPARE:
+                operand2_value = pop()
+                push(argument[0](pop(), operand2_value))
+            elif opcode == JUMP:
+                position = argument
+            elif opcode == LOAD_REF:
+                value = frame[argument]
+                if isinstance(value, Reference):
+                    value = value.container[value.key]
+                push(value)
+            elif opcode == MEMBER:
+                push(pop().value[argument])
+            elif opcode == INDEX:
+                index = pop()
+                push(self.index_lookup(pop(), index))
+            elif opcode == POP:
+                pop()
+            elif opcode == CALL or opcode == TAIL_CALL:
+                function_name, argument_count, pinned_arguments = argument
+                call_arguments = stack[len(stack) - argument_count :]
+                del stack[len(stack) - argument_count :]
+                if opcode == CALL:
+                    if len(calls) >= max_calls:
+                        error = ContextException(
+                            f"Maximum call depth of {self.max_call_depth} exceeded",
+                            code.contexts[position - 1],
+                        )
+                        error.function_name = code.name
+                        raise error
+                    calls.append(
+                        (code, frame, position, len(pinned) - pinned_arguments)
+                    )
+                code = self.code(function_name)
+                frame = self.frame(code, call_arguments)
+                opcodes = code.opcodes
+                arguments = code.arguments
+                position = 0
+            elif opcode == RETURN or opcode == RETURN_NONE:
+                return_value = pop() if opcode == RETURN else None
+                if not calls:
+                    return return_value
+                code, frame, position, pin_count = calls.pop()
+                del pinned[pin_count:]
+                opcodes = code.opcodes
+                arguments = code.arguments
+                push(return_value)
+            elif opcode == STRING:
+                if isinstance(stack[-1], StringBuilder):
+                    push(str(pop()))
+            elif opcode == LOCATE:
+                push(frame)
+                push(argument)
+            elif opcode == LOCATE_REF:
+                value = frame[argument]
+                if isinstance(value, Reference):
+                    push(value.container)
+                    push(value.key)
+                else:
+                    push(frame)
+                    push(argument)
+            elif opcode == LOCATE_INDEX:
+                index = pop()
+                key = pop()
+                container, key = self.index_location(pop()[key], index)
+                push(container)
+                push(key)
+            elif opcode == LOCATE_MEMBER:
+                key = pop()
+                struct = pop()[key]
+                self.unshare(struct)
+                push(struct.value)
+                push(argument)
+            elif opcode == STORE_ITEM:
+                key = pop()
+                container = pop()
+                container[key] = pop()
+            elif opcode == ASSIGN:
+                key = pop()
+                container = pop()
+                self.assign(container, key, pop())
+            elif opcode == REFERENCE:
+                key = pop()
+                push(self.reference_argument(pop(), key))
+            elif opcode == LAZY_COPY:
+                push(self.lazy_copy(pop()))
+            elif opcode == COPY:
+                push(self.stored(pop()))
+            elif opcode == CALL_BUILTIN or opcode == CALL_METHOD:
+                function_call, argument_count = argument
+                call_arguments = stack[len(stack) - argument_count :]
+                del stack[len(stack) - argument_count :]
+                if opcode == CALL_BUILTIN:
+                    push(self.builtin_call(function_call, call_arguments))
+                else:
+                    push(self.call_method(pop(), function_call, call_arguments))
+            elif opcode == STRING_APPEND:
+                value = pop()
+                key = pop()
+                self.string_append(pop(), key, value, argument)
+                push(None)
+            elif opcode == DEFAULT:
+                push(self.default_variable_value(argument))
+            elif opcode == NOT:
+                push(not pop())
+            elif opcode == NEGATE:
+                push(-pop())
+            elif opcode == ENUM_COMPARE:
+                operand2_value = pop()
+                push(self.enum_compare(pop(), operand2_value, argument))
+            elif opcode == ENUM_VALUE:
+                push(self.enum_value(*argument))
+            elif opcode == STRUCT_INIT:
+                struct_name, offsets, _ = argument
+                push(self.struct_value(struct_name, self.field_values(stack, offsets)))
+            elif opcode == ENUM_INIT:
+                enum_name, variant_name, offsets, _ = argument
+                push(
+                    self.variant_value(
+                        enum_name, variant_name, self.field_values(stack, offsets)
+                    )
+                )
+            elif opcode == MATCH:
+                payload = stack[-1].value
+                if isinstance(payload, tuple):
+                    stack[-1] = payload
+                    position = argument[payload[0]]
+                else:
+                    position = argument[payload]
+            elif opcode == BIND:
+                offset, slot = argument
+                # the fields follow the discriminant
+                frame[slot] = stack[-1][offset + 1]
+            elif opcode == RAISE:
+                raise argument
+            else:
+                raise InternalCompilerError(f"Unknown opcode: {opcode}")
+
+    def field_values(
+        self, stack: List[Any], offsets: List[int]
+    ) -> List[Tuple[int, Any]]:
+        """The initialized fields on top of the stack, by offset."""
+        if not offsets:
+            return []
+        values = stack[len(stack) - len(offsets) :]
+        del stack[len(stack) - len(offsets) :]
+        return list(zip(offsets, values))
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
+from bisect import bisect_right
+from dataclasses import dataclass, field, fields, is_dataclass
 from enum import Enum, auto
-from typing import List, Dict, Optional, Callable, Any
+from typing import List, Dict, Optional, Callable, Any, Tuple
 
 
 class VariableTypeEnum(Enum):
@@ -44,76 +45,155 @@ INTEGER_TYPES = (
 NUMBER_TYPES = INTEGER_TYPES + (PrimitiveType.F32,)
 
 
-class ParseContext(BaseModel):
-    start_pos: int = 0
-    end_pos: int = 0
-    line: int = 0
-    column: int = 0
-    builtin: bool = False
-
-    @staticmethod
-    def from_builtin():
-        return ParseContext(builtin=True)
-
-    @staticmethod
-    def from_token(token: Any):
-        return ParseContext(
-            start_pos=token.start_pos,
-            end_pos=token.end_pos,
-            line=token.line,
-            column=token.column,
-        )
+# Offset of the first character of a node in the source code. Line and
+# column are only needed for error messages and are computed from a LineTable.
+ParseContext = int
 
-    @staticmethod
-    def from_exception(exception: Any):
-        return ParseContext(
-            start_pos=exception.pos_in_stream,
-            end_pos=exception.pos_in_stream,
-            line=exception.line,
-            column=exception.column,
-        )
+# Context of the builtin functions and their parameters.
+BUILTIN_CONTEXT: ParseContext = -1
+
+
+class LineTable:
+    """Start offsets of the lines of a source code, maps parse contexts to
+    line and column numbers."""
+
+    __slots__ = ("source_code", "line_starts")
+
+    def __init__(self, source_code: str):
+        self.source_code = source_code
+        line_starts = [0]
+        position = source_code.find("\n")
+        while position != -1:
+            line_starts.append(position + 1)
+            position = source_code.find("\n", position + 1)
+        self.line_starts = line_starts
+
+    def line_column(self, context: ParseContext) -> Tuple[int, int]:
+        """1-based line and column of the context, (0, 0) for builtins."""
+        if context < 0:
+            return 0, 0
+        line = bisect_right(self.line_starts, context)
+        return line, context - self.line_starts[line - 1] + 1
 
-    def __repr__(self) -> str:
-        if self.builtin:
-            return "<builtin>"
-        else:
-            return f"line: {self.line}, column: {self.column}"
+    def line(self, line: int) -> str:
+        """Text of the 1-based line number, without the line break."""
+        start = self.line_starts[line - 1]
+        if line < len(self.line_starts):
+            return self.source_code[start : self.line_starts[line] - 1]
+        return self.source_code[start:]
 
 
-class VariableType(BaseModel):
+@dataclass(slots=True, frozen=True, eq=False, init=False)
+class VariableType:
+    """Types are interned: every type has exactly one immutable object, so
+    types are compared and hashed by identity."""
+
     variable_type: VariableTypeEnum
     type_name: Optional[str] = None
     primitive_type: Optional[PrimitiveType] = None
     array_type: Optional[VariableType] = None
 
+    def __new__(
+        cls,
+        *,
+        variable_type: VariableTypeEnum,
+        type_name: Optional[str] = None,
+        primitive_type: Optional[PrimitiveType] = None,
+        array_type: Optional[VariableType] = None,
+    ) -> VariableType:
+        key = (variable_type, type_name, primitive_type, array_type)
+        variable_type_object = _VARIABLE_TYPES.get(key)
+        if variable_type_object is None:
+            variable_type_object = object.__new__(cls)
+            object.__setattr__(variable_type_object, "variable_type", variable_type)
+            object.__setattr__(variable_type_object, "type_name", type_name)
+            object.__setattr__(variable_type_object, "primitive_type", primitive_type)
+            object.__setattr__(variable_type_object, "array_type", array_type)
+            _VARIABLE_TYPES[key] = variable_type_object
+        return variable_type_object
+
+    def __reduce__(self):
+        # unpickled types are interned again
+        return (
+            _variable_type,
+            (self.variable_type, self.type_name, self.primitive_type, self.array_type),
+        )
+
+    def __copy__(self) -> VariableType:
+        return self
+
+    def __deepcopy__(self, memo) -> VariableType:
+        return self
+
+    def __str__(self) -> str:
+        # same format as before, error messages print the type with f-strings
+        return " ".join(f"{f.name}={getattr(self, f.name)!r}" for f in fields(self))
+
+
+_VARIABLE_TYPES: Dict[
+    Tuple[
+        VariableTypeEnum, Optional[str], Optional[PrimitiveType], Optional[VariableType]
+    ],
+    VariableType,
+] = {}
 
-class StructType(BaseModel):
+
+def _variable_type(
+    variable_type, type_name, primitive_type, array_type
+) -> VariableType:
+    return VariableType(
+        variable_type=variable_type,
+        type_name=type_name,
+        primitive_type=primitive_type,
+        array_type=array_type,
+    )
+
+
+@dataclass(slots=True, kw_only=True)
+class StructType:
     name: str
     members: List[IdentifierAndType]
     context: ParseContext
+    # Offset of each member in struct values, set by the validation pass.
+    offsets: Dict[str, int] = field(default_factory=dict, metadata={"dump": False})
 
 
-class EnumEntry(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class EnumEntry:
     name: str
     context: ParseContext
-    fields: List[IdentifierAndType] = Field(default_factory=list)
+    fields: List[IdentifierAndType] = field(default_factory=list)
+    # Position of the entry in its enum and offset of each field in enum
+    # values, set by the validation pass.
+    discriminant: Optional[int] = field(default=None, metadata={"dump": False})
+    offsets: Dict[str, int] = field(default_factory=dict, metadata={"dump": False})
 
 
-class EnumType(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class EnumType:
     name: str
     entries: Dict[str, EnumEntry]
     context: ParseContext
 
 
-class GlobalScope(BaseModel):
-    structs: Dict[str, StructType] = {}
-    functions: Dict[str, Function] = {}
-    enums: Dict[str, EnumType] = {}
+@dataclass(slots=True, kw_only=True)
+class GlobalScope:
+    structs: Dict[str, StructType] = field(default_factory=dict)
+    functions: Dict[str, Function] = field(default_factory=dict)
+    enums: Dict[str, EnumType] = field(default_factory=dict)
 
     def dump(self):
         def dump_base_model(scope):
             d = {"ast_type": scope.__class__.__name__}
-            d.update(cleanup_dict(scope.__dict__))
+            d.update(
+                cleanup_dict(
+                    {
+                        f.name: getattr(scope, f.name)
+                        for f in fields(scope)
+                        if f.metadata.get("dump", True)
+                    }
+                )
+            )
             return d
 
         def cleanup_dict(scope):
@@ -129,12 +209,12 @@ class GlobalScope(BaseModel):
                             new_dict[k] = v.primitive_type.name
                         else:
                             new_dict[k] = dump_base_model(v)
-                    elif isinstance(v, BaseModel):
+                    elif is_dataclass(v):
                         new_dict[k] = dump_base_model(v)
                     elif isinstance(v, list):
                         new_list = []
                         for item in v:
-                            if isinstance(item, BaseModel):
+                            if is_dataclass(item):
                                 new_list.append(dump_base_model(item))
                             else:
                                 new_list.append(item)
@@ -146,11 +226,18 @@ class GlobalScope(BaseModel):
         return dump_base_model(self)
 
 
-class BaseExpression(BaseModel):
-    type: Optional[VariableType]
+@dataclass(slots=True, kw_only=True)
+class Node:
+    # Base of expressions and statements, so that nodes which are both
+    # (VariableAccess, FunctionCall) have a single slot layout.
     context: ParseContext
 
 
+@dataclass(slots=True, kw_only=True)
+class BaseExpression(Node):
+    type: Optional[VariableType]
+
+
 class ConstantType(Enum):
     INTEGER = auto()
     FLOAT = auto()
@@ -159,160 +246,230 @@ class ConstantType(Enum):
     CHAR = auto()
 
 
+@dataclass(slots=True, kw_only=True)
 class Constant(BaseExpression):
     constant_type: ConstantType
     value: Any
 
 
+@dataclass(slots=True, kw_only=True)
 class MathOperation(BaseExpression):
     operand1: BaseExpression
     operand2: BaseExpression
     operator: str
 
 
+@dataclass(slots=True, kw_only=True)
 class CompareOperation(BaseExpression):
     operand1: BaseExpression
     operand2: BaseExpression
     operator: str
 
 
+@dataclass(slots=True, kw_only=True)
 class UnaryOperation(BaseExpression):
     operand: BaseExpression
     operator: str
 
 
+@dataclass(slots=True, kw_only=True)
 class ArrayAccess(BaseExpression):
     expression: BaseExpression
 
 
-class Statement(BaseModel):
-    context: ParseContext
+@dataclass(slots=True, kw_only=True)
+class Statement(Node):
+    pass
 
 
+@dataclass(slots=True, kw_only=True)
 class VariableAccess(Statement, BaseExpression):
     variable_name: str
     array_access: Optional[BaseExpression] = None
     variable_access: Optional[VariableAccess] = None
     method_call: Optional[FunctionCall] = None
+    # Frame slot of the variable, set by the validation pass. None for enum
+    # accesses and for the member names of a struct access.
+    slot: Optional[int] = field(default=None, metadata={"dump": False})
+    # Offset of the member for the member names of a struct access, set by
+    # the validation pass.
+    offset: Optional[int] = field(default=None, metadata={"dump": False})
 
 
-class FunctionArgument(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class FunctionArgument:
     name: Optional[str] = None
     value: BaseExpression
     context: ParseContext
 
 
+@dataclass(slots=True, kw_only=True)
 class FunctionCall(Statement, BaseExpression):
     function_name: str
     params: List[FunctionArgument]
-
-
-class StructFieldInit(BaseModel):
+    # Type of the value a method is called on, set by the validation pass.
+    receiver_type: Optional[VariableType] = field(
+        default=None, metadata={"dump": False}
+    )
+    # The argument of every parameter of the called function, the default
+    # value for omitted ones, in the order of the parameters. Set by the
+    # validation pass, see utils.bind_call_arguments.
+    bound_arguments: Optional[List[Tuple[BaseExpression, FunctionParameter]]] = field(
+        default=None, metadata={"dump": False}
+    )
+
+
+@dataclass(slots=True, kw_only=True)
+class StructFieldInit:
     field_name: str
     value: BaseExpression
     context: ParseContext
+    # Offset of the struct member or variant field, set by the validation
+    # pass.
+    offset: Optional[int] = field(default=None, metadata={"dump": False})
 
 
+@dataclass(slots=True, kw_only=True)
 class StructInitialization(BaseExpression):
     struct_name: str
     field_inits: List[StructFieldInit]
 
 
+@dataclass(slots=True, kw_only=True)
 class EnumVariantInitialization(BaseExpression):
     enum_name: str
     variant_name: str
     field_inits: List[StructFieldInit]
 
 
+@dataclass(slots=True, kw_only=True)
 class VariableDeclaration(Statement):
     name: str
     variable_type: VariableType
+    slot: Optional[int] = field(default=None, metadata={"dump": False})
 
 
+@dataclass(slots=True, kw_only=True)
 class VariableDefinition(Statement):
     name: str
     variable_type: VariableType
     value: BaseExpression
     const: bool
+    slot: Optional[int] = field(default=None, metadata={"dump": False})
 
 
+@dataclass(slots=True, kw_only=True)
 class VariableAssign(Statement):
     variable_access: VariableAccess
     value: BaseExpression
 
 
-class IdentifierAndType(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class IdentifierAndType:
     name: str
     param_type: VariableType
     context: ParseContext
     default_value: Optional[BaseExpression] = None
 
 
+@dataclass(slots=True, kw_only=True)
 class FunctionParameter(IdentifierAndType):
     reference: bool
     positional_only: bool = True
 
 
-class BaseFunction(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class BaseFunction:
     name: str
     return_type: Optional[VariableType]
     function_params: List[FunctionParameter]
 
 
+@dataclass(slots=True, kw_only=True)
+class UnparsedBody:
+    source_code: str
+    start_pos: int
+    end_pos: int
+
+
+@dataclass(slots=True, kw_only=True)
 class Function(BaseFunction):
     statements: List[Statement]
     context: ParseContext
+    # Set by the lazy frontend until the body is parsed, see rd_parser.load_function_body.
+    unparsed_body: Optional[UnparsedBody] = field(
+        default=None, metadata={"dump": False}
+    )
+    # Number of variable slots in a call frame, set by the validation pass.
+    # The parameters are in the first slots.
+    frame_size: int = field(default=0, metadata={"dump": False})
 
 
+@dataclass(slots=True, kw_only=True)
 class BuiltinFunction(BaseFunction):
     function_ptr: Callable
 
 
+@dataclass(slots=True, kw_only=True)
 class Loop(Statement):
     statements: List[Statement]
 
 
+@dataclass(slots=True, kw_only=True)
 class If(Statement):
     condition: BaseExpression
     statements: List[Statement]
-    elif_statements: List[Elif] = []
+    elif_statements: List[Elif] = field(default_factory=list)
     else_statement: Optional[Else] = None
 
 
+@dataclass(slots=True, kw_only=True)
 class Elif(Statement):
     condition: BaseExpression
     statements: List[Statement]
 
 
+@dataclass(slots=True, kw_only=True)
 class Else(Statement):
     statements: List[Statement]
 
 
+@dataclass(slots=True, kw_only=True)
 class Continue(Statement):
     pass
 
 
+@dataclass(slots=True, kw_only=True)
 class Break(Statement):
     pass
 
 
+@dataclass(slots=True, kw_only=True)
 class Return(Statement):
     value: Optional[BaseExpression] = None
 
 
-class VariantPattern(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class VariantPattern:
     variant_name: Optional[str] = None
     is_wildcard: bool = False
-    bindings: List[str] = Field(default_factory=list)
+    bindings: List[str] = field(default_factory=list)
     context: ParseContext
+    binding_slots: List[int] = field(default_factory=list, metadata={"dump": False})
+    binding_offsets: List[int] = field(default_factory=list, metadata={"dump": False})
 
 
-class MatchArm(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class MatchArm:
     pattern: VariantPattern
     statements: List[Statement]
     context: ParseContext
 
 
+@dataclass(slots=True, kw_only=True)
 class Match(Statement):
     scrutinee: BaseExpression
     arms: List[MatchArm]
+    # Index of the arm taken for each discriminant of the enum, set by the
+    # validation pass.
+    arm_table: Optional[List[int]] = field(default=None, metadata={"dump": False})
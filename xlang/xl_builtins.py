@@ -4,7 +4,7 @@ from typing import Dict, List, Optional
 from xlang.exceptions import InterpreterAssertionError, ContextException
 from xlang.xl_ast import (
     FunctionParameter,
-    ParseContext,
+    BUILTIN_CONTEXT,
     VariableType,
     VariableTypeEnum,
     PrimitiveType,
@@ -97,7 +97,7 @@ def builtin_method_primitive(
 def prim(param_name: str, primitive_type: PrimitiveType):
     return FunctionParameter(
         name=param_name,
-        context=ParseContext.from_builtin(),
+        context=BUILTIN_CONTEXT,
         param_type=VariableType(
             variable_type=VariableTypeEnum.PRIMITIVE,
             primitive_type=primitive_type,
@@ -109,7 +109,7 @@ def prim(param_name: str, primitive_type: PrimitiveType):
 def builtin_generic(param_name: str):
     return FunctionParameter(
         name=param_name,
-        context=ParseContext.from_builtin(),
+        context=BUILTIN_CONTEXT,
         param_type=VariableType(
             variable_type=VariableTypeEnum.BUILTIN_GENERIC,
         ),
@@ -148,7 +148,7 @@ def builtin_assert(value, context):
         FunctionParameter(
             name="value",
             param_type=VariableType(variable_type=VariableTypeEnum.BUILTIN_GENERIC),
-            context=ParseContext.from_builtin(),
+            context=BUILTIN_CONTEXT,
             reference=False,
         )
     ],
@@ -1,3 +1,5 @@
+from typing import Dict, Tuple
+
 from xlang.xl_ast import (
     ParseContext,
     VariableType,
@@ -13,8 +15,11 @@ def typeify(base_type: VariableType, global_scope: GlobalScope, context: ParseCo
         assert base_type.array_type
         assert base_type.array_type.type_name
         assert base_type.array_type.variable_type == VariableTypeEnum.UNKNOWN
-        base_type.array_type = get_type_from_string(
-            global_scope, base_type.array_type.type_name, context
+        base_type = VariableType(
+            variable_type=VariableTypeEnum.ARRAY,
+            array_type=get_type_from_string(
+                global_scope, base_type.array_type.type_name, context
+            ),
         )
     elif base_type.variable_type == VariableTypeEnum.UNKNOWN:
         assert base_type.type_name
@@ -24,39 +29,38 @@ def typeify(base_type: VariableType, global_scope: GlobalScope, context: ParseCo
     return base_type
 
 
-def primitive(primitive_type: PrimitiveType) -> VariableType:
-    return VariableType(
+PRIMITIVE_TYPES = {
+    primitive_type: VariableType(
         variable_type=VariableTypeEnum.PRIMITIVE, primitive_type=primitive_type
     )
+    for primitive_type in PrimitiveType
+}
+
+PRIMITIVE_TYPE_NAMES = {
+    "i64": PRIMITIVE_TYPES[PrimitiveType.I64],
+    "i32": PRIMITIVE_TYPES[PrimitiveType.I32],
+    "i16": PRIMITIVE_TYPES[PrimitiveType.I16],
+    "i8": PRIMITIVE_TYPES[PrimitiveType.I8],
+    "u64": PRIMITIVE_TYPES[PrimitiveType.U64],
+    "u32": PRIMITIVE_TYPES[PrimitiveType.U32],
+    "u16": PRIMITIVE_TYPES[PrimitiveType.U16],
+    "u8": PRIMITIVE_TYPES[PrimitiveType.U8],
+    "f32": PRIMITIVE_TYPES[PrimitiveType.F32],
+    "string": PRIMITIVE_TYPES[PrimitiveType.STRING],
+    "bool": PRIMITIVE_TYPES[PrimitiveType.BOOL],
+    "char": PRIMITIVE_TYPES[PrimitiveType.CHAR],
+}
+
+
+def primitive(primitive_type: PrimitiveType) -> VariableType:
+    return PRIMITIVE_TYPES[primitive_type]
 
 
 def get_type_from_string(
     global_scope: GlobalScope, type_name: str, context: ParseContext
 ) -> VariableType:
-    if type_name == "i64":
-        return primitive(PrimitiveType.I64)
-    elif type_name == "i32":
-        return primitive(PrimitiveType.I32)
-    elif type_name == "i16":
-        return primitive(PrimitiveType.I16)
-    elif type_name == "i8":
-        return primitive(PrimitiveType.I8)
-    elif type_name == "u64":
-        return primitive(PrimitiveType.U64)
-    elif type_name == "u32":
-        return primitive(PrimitiveType.U32)
-    elif type_name == "u16":
-        return primitive(PrimitiveType.U16)
-    elif type_name == "u8":
-        return primitive(PrimitiveType.U8)
-    elif type_name == "f32":
-        return primitive(PrimitiveType.F32)
-    elif type_name == "string":
-        return primitive(PrimitiveType.STRING)
-    elif type_name == "bool":
-        return primitive(PrimitiveType.BOOL)
-    elif type_name == "char":
-        return primitive(PrimitiveType.CHAR)
+    if type_name in PRIMITIVE_TYPE_NAMES:
+        return PRIMITIVE_TYPE_NAMES[type_name]
     elif type_name in global_scope.structs:
         return VariableType(variable_type=VariableTypeEnum.STRUCT, type_name=type_name)
     elif type_name in global_scope.enums:
@@ -137,8 +141,20 @@ PRIMITIVE_AUTO_CONVERSION = {
 }
 
 
+# (target type, source type) => compatible, types are interned
+_TYPE_COMPATIBILITY: Dict[Tuple[VariableType, VariableType], bool] = {}
+
+
 def is_type_compatible(target_type: VariableType, source_type: VariableType) -> bool:
     """can source_type be assigned to target_type?"""
+    compatible = _TYPE_COMPATIBILITY.get((target_type, source_type))
+    if compatible is None:
+        compatible = _is_type_compatible(target_type, source_type)
+        _TYPE_COMPATIBILITY[(target_type, source_type)] = compatible
+    return compatible
+
+
+def _is_type_compatible(target_type: VariableType, source_type: VariableType) -> bool:
     if target_type.variable_type == VariableTypeEnum.BUILTIN_GENERIC:
         return True
     if target_type.variable_type != source_type.variable_type:
@@ -147,10 +163,8 @@ def is_type_compatible(target_type: VariableType, source_type: VariableType) ->
         assert target_type.array_type
         assert source_type.array_type
         return is_type_compatible(target_type.array_type, source_type.array_type)
-    elif target_type.variable_type == VariableTypeEnum.STRUCT:
-        return target_type.type_name == source_type.type_name
-    elif target_type.variable_type == VariableTypeEnum.ENUM:
-        return target_type.type_name == source_type.type_name
+    elif target_type.variable_type in (VariableTypeEnum.STRUCT, VariableTypeEnum.ENUM):
+        return target_type is source_type
     elif target_type.variable_type == VariableTypeEnum.PRIMITIVE:
         if target_type.primitive_type in PRIMITIVE_AUTO_CONVERSION:
             return (
@@ -158,6 +172,6 @@ def is_type_compatible(target_type: VariableType, source_type: VariableType) ->
                 in PRIMITIVE_AUTO_CONVERSION[target_type.primitive_type]
             )
         else:
-            return target_type.primitive_type == source_type.primitive_type
+            return target_type is source_type
     else:
         raise InternalCompilerError("Unhandled type in is_type_compatible")